@@ -0,0 +1,117 @@
+"""
+Per-call cost of the !progress rank lookups, before and after the rank indexes.
+
+Builds a synthetic scan pair (no Google access needed) and times:
+  before - every rank sorts its whole population again (14 sorts per call)
+  after  - rank tables are built once per scan, each call is dictionary lookups
+
+Usage: python bench_ranks.py [players] [calls]
+"""
+import random
+import sys
+import time
+
+from snapshots import Snapshot, gain_frame
+
+GAIN_STATS = ["highest_power", "units_killed", "units_dead", "units_healed", "merits"]
+STATS_375 = ["Infantry Only", "Cavalry Only", "Marksman Only", "Magic Only",
+             "Healing (T4/T5)", "Build Time", "Destruction Time"]
+SERVERS = ["375", "17", "110", "247", "428", "620", "345", "540"]
+
+
+def make_scan(n_players, rng, base=None):
+    snap = Snapshot("bench", [])
+    snap.add_column("lord_id", [str(100000 + i) for i in range(n_players)], key=True)
+    snap.add_column("home_server", [SERVERS[i % len(SERVERS)] for i in range(n_players)])
+    for stat in GAIN_STATS:
+        start = base.col(stat) if base else [0] * n_players
+        snap.add_column(stat, [v + rng.randrange(1, 50_000_000) for v in start])
+    return snap
+
+
+def make_375(n_players, rng):
+    snap = Snapshot("bench 375", [])
+    snap.add_column("Character ID", [str(100000 + i) for i in range(n_players)], key=True)
+    snap.add_column("Historical Highest Power", [rng.randrange(1, 200_000_000) for _ in range(n_players)])
+    for stat in STATS_375:
+        snap.add_column(stat, [rng.randrange(0, 10_000_000) for _ in range(n_players)])
+    return snap
+
+
+def ranks_before(prev, latest, snap_375, lord_id, server):
+    """The pre-index !progress: one full sort per rank."""
+    prev_map = {lid: i for i, lid in enumerate(prev.col("lord_id"))}
+    ranks = []
+    for stat in GAIN_STATS:
+        gains = []
+        for i, (lid, s) in enumerate(latest.rows("lord_id", "home_server")):
+            j = prev_map.get(lid)
+            if s == server and j is not None:
+                gains.append((lid, latest.col(stat)[i] - prev.col(stat)[j]))
+        gains.sort(key=lambda x: x[1], reverse=True)
+        ranks.append(next((r for r, (lid, _) in enumerate(gains, 1) if lid == lord_id), None))
+
+    ratios = [(lid, m / p * 100) for lid, s, m, p in latest.rows("lord_id", "home_server", "merits", "highest_power")
+              if s == server and p > 0]
+    ratios.sort(key=lambda x: x[1], reverse=True)
+    ranks.append(next((r for r, (lid, _) in enumerate(ratios, 1) if lid == lord_id), None))
+
+    totals = [(lid, m) for lid, s, m in latest.rows("lord_id", "home_server", "merits") if s == server]
+    totals.sort(key=lambda x: x[1], reverse=True)
+    ranks.append(next((r for r, (lid, _) in enumerate(totals, 1) if lid == lord_id), None))
+
+    pool = [r for r in snap_375.rows("Character ID", "Historical Highest Power", *STATS_375) if r[1] >= 50_000_000]
+    for col in range(2, 2 + len(STATS_375)):
+        members = sorted(pool, key=lambda x: x[col], reverse=True)
+        ranks.append(next((r for r, row in enumerate(members, 1) if row[0] == lord_id), None))
+    return ranks
+
+
+def ranks_after(prev, latest, snap_375, lord_id, server):
+    """The indexed !progress: warm rank tables, O(1) per rank."""
+    frame = gain_frame(prev, latest)
+    ranks = [frame.rank_index(stat, server).rank(lord_id) for stat in GAIN_STATS]
+    ranks.append(latest.ratio_rank_index("merits", "highest_power", server).rank(lord_id))
+    ranks.append(latest.rank_index("merits", server).rank(lord_id))
+    for stat in STATS_375:
+        ranks.append(snap_375.rank_index(stat, floor=("Historical Highest Power", 50_000_000)).rank(lord_id))
+    return ranks
+
+
+def timed(fn, calls, *args):
+    start = time.perf_counter()
+    for _ in range(calls):
+        fn(*args)
+    return (time.perf_counter() - start) / calls * 1000
+
+
+def main():
+    n_players = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    calls = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    rng = random.Random(375)
+
+    prev = make_scan(n_players, rng)
+    latest = make_scan(n_players, rng, base=prev)
+    snap_375 = make_375(n_players // len(SERVERS), rng)
+    lord_id, server = "100000", "375"
+
+    assert ranks_before(prev, latest, snap_375, lord_id, server) == ranks_after(prev, latest, snap_375, lord_id, server)
+
+    cold_start = time.perf_counter()
+    latest.gain_frames.clear()
+    latest.rank_indexes.clear()
+    snap_375.rank_indexes.clear()
+    ranks_after(prev, latest, snap_375, lord_id, server)
+    cold = (time.perf_counter() - cold_start) * 1000
+
+    before = timed(ranks_before, calls, prev, latest, snap_375, lord_id, server)
+    after = timed(ranks_after, calls, prev, latest, snap_375, lord_id, server)
+
+    print(f"players: {n_players:,} | calls: {calls}")
+    print(f"before (sort per rank): {before:8.2f} ms/call")
+    print(f"after  (first call)   : {cold:8.2f} ms")
+    print(f"after  (warm)         : {after:8.3f} ms/call")
+
+
+if __name__ == "__main__":
+    main()
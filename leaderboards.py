@@ -0,0 +1,103 @@
+import heapq
+from typing import NamedTuple
+
+from snapshots import GainFrame, snapshot_cache
+
+# --- CONFIGURATION ---
+# Leaderboards are selected (and cached) at least this deep, so any top_n up to it is a slice.
+LEADERBOARD_DEPTH = 100
+
+
+# --- TOP-K SELECTION ---
+def select(values, names, rows, k, descending=True):
+    """
+    Positions of the k best `rows` by value with a bounded heap (O(rows · log k), no full sort).
+    Ties are broken by name, A → Z, so equal values always list in the same order.
+    """
+    if descending:
+        return heapq.nsmallest(k, rows, key=lambda i: (-values[i], names[i]))
+    return heapq.nsmallest(k, rows, key=lambda i: (values[i], names[i]))
+
+
+def eligible(source, min_power=0, power_col="power", server=None, alliance=None):
+    """Row positions passing the power floor and, if given, the home server and alliance tag prefix filters."""
+    rows = range(len(source))
+    if min_power:
+        powers = source.col(power_col)
+        rows = [i for i in rows if powers[i] >= min_power]
+    if server is not None:
+        servers = source.col("home_server")
+        rows = [i for i in rows if servers[i] == server]
+    if alliance is not None:
+        tags = source.col("alliance")
+        rows = [i for i in rows if tags[i].upper().startswith(alliance)]
+    return rows
+
+
+def leaderboard(source, stat, k, descending=True, min_power=0, power_col="power",
+                server=None, clamp=False, name_col="name", alliance=None):
+    """
+    Top (or bottom) k rows of `source` by `stat` as [(row, value)].
+    A GainFrame ranks gains, a Snapshot ranks totals. With clamp, negative values (sheet
+    corrections) count as 0. Selections are cached on the source, so a repeated board is a slice.
+    """
+    cache_key = (stat, descending, min_power, power_col, server, clamp, name_col, alliance)
+    depth, board = source.leaderboards.get(cache_key, (0, None))
+    if board is None or (k > depth and len(board) == depth):
+        values = source.gain(stat) if isinstance(source, GainFrame) else source.col(stat)
+        if clamp:
+            values = [v if v > 0 else 0 for v in values]
+        depth = max(k, LEADERBOARD_DEPTH)
+        rows = eligible(source, min_power, power_col, server, alliance)
+        board = [(i, values[i]) for i in select(values, source.col(name_col), rows, depth, descending)]
+        source.leaderboards[cache_key] = (depth, board)
+        snapshot_cache.grew(getattr(source, "latest", source))
+    return board[:k]
+
+
+def labelled(source, board):
+    """[(row, value)] -> [("[alliance] name", value)]; only the selected rows are formatted."""
+    names, alliances = source.col("name"), source.col("alliance")
+    return [(f"[{alliances[i]}] {names[i] or '?'}", value) for i, value in board]
+
+
+# --- BOARD SPECS ---
+class BoardSpec(NamedTuple):
+    """
+    One leaderboard command. `title` may use {n}; `icon` heads the message and `emoji` marks each value.
+    gain ranks latest - previous between the last two tabs, otherwise latest totals.
+    `scoped` is what the 'NVR' argument filters to: (home server, alliance tag prefix or None).
+    """
+    stat: str
+    title: str
+    icon: str
+    emoji: str = ""
+    gain: bool = True
+    descending: bool = True
+    min_power: int = 25_000_000
+    clamp: bool = False
+    scoped: tuple = ("375", None)
+    sheet: str = "season"  # "season" tabs, or the Server 375 stats sheet ("375")
+    key_col: str = "lord_id"
+    name_col: str = "name"
+    power_col: str = "power"
+    aliases: tuple = ()
+
+    def columns(self):
+        """Columns a board reads; the first is the row key."""
+        if self.sheet == "season":
+            return [self.key_col, self.name_col, "alliance", "home_server", self.power_col, self.stat]
+        return [self.key_col, self.name_col, self.power_col, self.stat]
+
+
+def run_board(spec, source, k, scoped=False):
+    """
+    [(row, value)] of a board over `source` (a GainFrame for gain boards, else a Snapshot).
+    Memoized on the source per spec, i.e. per snapshot revision, by leaderboard().
+    """
+    server, alliance = spec.scoped if scoped else (None, None)
+    return leaderboard(
+        source, spec.stat, k, descending=spec.descending, min_power=spec.min_power,
+        power_col=spec.power_col, server=server, clamp=spec.clamp, name_col=spec.name_col,
+        alliance=alliance,
+    )
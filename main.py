@@ -8,14 +8,29 @@ from discord.ext import commands
 from discord.ext import tasks
 from datetime import datetime, timedelta, UTC, timezone
 import asyncio
+import time
 import unicodedata
+from snapshots import snapshot_cache, snapshot_store, load_tabs, gain_frame, snapshot_key, ARCHIVED_SEASONS
+from leaderboards import labelled, run_board, BoardSpec
+from query import plan_query, execute, describe, QueryError, QUERY_HELP
+from rosters import load_roster, invalidate_rosters, group_by, GroupStats, scan_tabs
+from sheets import sheets_io, sheets_flight, spreadsheets, quota_wait, QuotaWaitMeter, sheets_priority, BACKGROUND
+from sources import GoogleSheetsSource, CsvSource, use_source
+
+BOOT_STARTED = time.perf_counter()  # for the startup timings printed below
 
 # Google Sheets Auth
 scope = ["https://spreadsheets.google.com/feeds", "https://www.googleapis.com/auth/drive"]
-creds_json = os.getenv("CREDENTIALS_JSON")
-creds_dict = json.loads(creds_json)
-creds = ServiceAccountCredentials.from_json_keyfile_dict(creds_dict, scope)
-client = gspread.authorize(creds)
+
+def authorize_sheets():
+    """gspread client for the CREDENTIALS_JSON service account."""
+    creds_dict = json.loads(os.getenv("CREDENTIALS_JSON"))
+    creds = ServiceAccountCredentials.from_json_keyfile_dict(creds_dict, scope)
+    return gspread.authorize(creds)
+
+# Where scan tabs are read from: Google Sheets, or a local copy (<dir>/<sheet title>/<tab>.csv) to run offline
+SNAPSHOT_SOURCE_DIR = os.getenv("SNAPSHOT_SOURCE_DIR")
+snapshot_source = use_source(CsvSource(SNAPSHOT_SOURCE_DIR) if SNAPSHOT_SOURCE_DIR else GoogleSheetsSource(authorize_sheets))
 
 EVENT_SHEET_NAME = "Event Schedule"      # The spreadsheet name
 EVENT_TAB_NAME = "events"               # The tab name
@@ -36,10 +51,28 @@ SEASON_SHEETS = {
     "sos2": "NVR - SoS2",
 }
 
+# Background prefetch: minutes between checks for a new scan, per season (others use the default)
+PREFETCH_INTERVALS = {"sos7": 5}
+PREFETCH_DEFAULT_INTERVAL = 15
+PREFETCH_SKIP = ARCHIVED_SEASONS | {"farms"}  # archived sheets never change; farms is not a scan sheet
+
+# Every season column the stat commands read; the prefetcher downloads the ones a sheet has
+PREFETCH_COLUMNS = [
+    "lord_id", "name", "alliance", "home_server", "power", "highest_power",
+    "merits", "units_killed", "units_dead", "units_healed", "mana",
+    "gold_spent", "wood_spent", "stone_spent", "mana_spent",
+    "killcount_t5", "killcount_t4", "killcount_t3", "killcount_t2", "killcount_t1",
+    "gold", "wood", "ore",
+]
+
 SERVER_375_SHEET = "Call of Dragons - Server 375 Stats"
+SERVER_375_KEY = "s375"  # cache key used for the Server 375 sheet
 
 DEFAULT_SEASON = "sos7"
 
+# Sun/Moon groups: rosters/sun_moon.json, unless the season sheet has a "Roster" tab (lord id, group)
+SUN_MOON_ROSTER = "sun_moon"
+
 # Now your bot setup
 intents = discord.Intents.default()
 intents.guilds = True
@@ -49,9 +82,58 @@ intents.reactions = True
 intents.guild_reactions = True
 intents.message_content = True  
 
-bot = commands.Bot(command_prefix="!", intents=intents)
+DISCORD_MESSAGE_LIMIT = 2000
+
+class SheetsContext(commands.Context):
+    """Command context whose first reply after a Google Sheets quota wait reports it in the footer."""
+
+    async def send(self, content=None, **kwargs):
+        meter = quota_wait.get()
+        waited = meter.take() if meter else 0
+        separate_note = None
+        if waited >= 0.1:
+            note = f"⏳ Waited {waited:.1f}s for Google Sheets quota"
+            embed = kwargs.get("embed")
+            if embed is not None:
+                footer = embed.footer.text
+                embed.set_footer(text=f"{footer} • {note}" if footer else note)
+            elif content is not None:
+                noted = f"{content}\n-# {note}"
+                if len(noted) <= DISCORD_MESSAGE_LIMIT:
+                    content = noted
+                else:
+                    separate_note = f"-# {note}"  # a full chunk has no room left for it
+        message = await super().send(content, **kwargs)
+        if separate_note is not None:
+            await super().send(separate_note)
+        if self.bot.first_response is None:
+            self.bot.first_response = time.perf_counter() - BOOT_STARTED
+            print(f"⏱️ Time to first response: {self.bot.first_response:.2f}s after start (!{self.command})")
+        return message
+
+class StatsBot(commands.Bot):
+    first_response = None  # seconds from start to the first command reply
+
+    async def get_context(self, origin, *, cls=SheetsContext):
+        return await super().get_context(origin, cls=cls)
+
+    async def setup_hook(self):
+        # Runs once, before the gateway connects (on_ready fires again after every reconnect)
+        await self.load_extension("spydetect")
+        await self.load_extension("dashboard")
+        # Auth and cache warm-up happen in the background while the gateway connects
+        self.startup_tasks = [asyncio.create_task(connect_source()), asyncio.create_task(warm_cache())]
+        update_utc_channels.start()
+        prefetch_scans.start()
+
+bot = StatsBot(command_prefix="!", intents=intents)
 bot.remove_command('help')  # Add it right here!
 
+@bot.before_invoke
+async def start_quota_meter(ctx):
+    # Every command measures its own wait for Sheets quota (see SheetsContext)
+    quota_wait.set(QuotaWaitMeter())
+
 # Global flag
 VACATION_MODE = False
 VACATION_MSG = "🗣️ not updated 🗣️ old data 🗣️ update update"
@@ -119,16 +201,6 @@ async def on_raw_reaction_add(payload):
 # Parsers / formatters
 # ============================
 
-def to_int_eu(v):
-    """Parse ints from EU/US formats: '21.734.811', '21,734,811', '21 734 811', '-', '' -> 0."""
-    try:
-        s = str(v).replace(".", "").replace(",", "").replace(" ", "").strip()
-        if s in ("", "-"):
-            return 0
-        return int(s)
-    except:
-        return 0
-
 def fmt_int_eu(n: int) -> str:
     """12345678 -> '12.345.678'."""
     return f"{n:,}".replace(",", ".")
@@ -136,6 +208,35 @@ def fmt_int_eu(n: int) -> str:
 def fmt_pct(n: float) -> str:
     return f"{n:.2f}%"
 
+# ============================
+# Snapshot loading
+# ============================
+
+async def get_375_snapshot(columns):
+    """Server 375 stats sheet (first tab), projected to `columns`; the first column is the row key."""
+    ws_375 = await open_first_worksheet(SERVER_375_SHEET)
+    snap_375, = await load_tabs(SERVER_375_KEY, [ws_375], columns)
+    return snap_375
+
+def prefetch(coro):
+    """Start a fetch in the background so it overlaps with other downloads; await the task when needed."""
+    task = asyncio.create_task(coro)
+    # Retrieve failures so an unused prefetch never logs "exception was never retrieved"
+    task.add_done_callback(lambda t: t.cancelled() or t.exception())
+    return task
+
+async def open_worksheets(sheet_name):
+    """Tabs of a spreadsheet by title (for Google, from the registry's cached listing while it is fresh)."""
+    return await snapshot_source.worksheets(sheet_name)
+
+async def open_scan_tabs(sheet_name):
+    """Scan tabs of a spreadsheet, oldest first (a roster tab is left out, see rosters.scan_tabs)."""
+    return scan_tabs(await open_worksheets(sheet_name))
+
+async def open_first_worksheet(sheet_name):
+    """First tab of a spreadsheet (same as .sheet1, without the metadata call)."""
+    return (await open_worksheets(sheet_name))[0]
+
 # ---------- card rendering ----------
 
 def player_field_name(p):
@@ -194,152 +295,214 @@ async def send_section_cards(ctx, title: str, emoji: str, color: int, items: lis
         await ctx.send(embed=embed)
         page += 1
         
-@bot.command()
-async def totaldeads(ctx, *args):
-    """
-    Rank by TOTAL deaths (current value in Column R).
-    Default: ALL players (≥25M power) in the default season.
-    Add 'NVR' to filter to NVR on Server 375.
-
-    Examples:
-      !totaldeads                    -> Top 10, ALL players, default season
-      !totaldeads 25                 -> Top 25, ALL players
-      !totaldeads sos5               -> Top 10, ALL players, season 'sos5'
-      !totaldeads sos5 30            -> Top 30, ALL players, season 'sos5'
-      !totaldeads NVR 50             -> Top 50, NVR on Server 375
-      !totaldeads all 50             -> Explicitly ALL, Top 50
-    """
-
-    async with ctx.typing():
-        
-        if ctx.channel.id not in ALLOWED_COMMAND_CHANNEL_ID:
-            # This creates a nicely formatted string of clickable channel links for the error message
-            channels_mentions = ", ".join([f"<#{channel_id}>" for channel_id in ALLOWED_COMMAND_CHANNEL_ID])
-            await ctx.send(f"❌ Commands are only allowed in {channels_mentions}.")
-            return
+# ============================
+# Leaderboards
+# ============================
 
-    # Defaults
-    top_n = 10
-    season = DEFAULT_SEASON
-    filter_NVR = False            # <-- default is ALL (no NVR filter)
-    min_power = 25_000_000
+# Every top/low command is one spec; see leaderboards.BoardSpec. Adding a board = adding an entry.
+POWER_375 = dict(
+    sheet="375", min_power=50_000_000, key_col="Character ID",
+    name_col="Character Name", power_col="Historical Highest Power",
+)
+LEADERBOARDS = {
+    "topdeads": BoardSpec("units_dead", "Top {n} Dead Units Gained", "🏆", "💀", clamp=True),
+    "totaldeads": BoardSpec("units_dead", "Total Deaths — Top {n}", "💀", "💀", gain=False, scoped=("375", "NVR")),
+    "lowdeads": BoardSpec("units_dead", "Lowest {n} Dead Gains", "🔻", "💀", descending=False, min_power=50_000_000, clamp=True),
+    "lowmerits": BoardSpec("merits", "Lowest {n} Merits Gained", "🔻", "🧠", descending=False, min_power=50_000_000, clamp=True),
+    "topheal": BoardSpec("units_healed", "Top {n} Healers (Gain)", "📊", "❤️‍🩹"),
+    "topkills": BoardSpec("units_killed", "Top {n} Kill Gains", "🏆", "⚔️"),
+    "topmana": BoardSpec("mana", "Top {n} Mana Gains", "📊", "💧"),
+    # Server 375 stats sheet
+    "topinf": BoardSpec("Infantry Only", "Infantry Merits", "⚔️", gain=False, aliases=("topinfantry",), **POWER_375),
+    "lowinf": BoardSpec("Infantry Only", "Infantry Merits", "⚔️", gain=False, descending=False, aliases=("lowinfantry",), **POWER_375),
+    "topcav": BoardSpec("Cavalry Only", "Cavalry Merits", "🐎", gain=False, aliases=("topcavalry",), **POWER_375),
+    "lowcav": BoardSpec("Cavalry Only", "Cavalry Merits", "🐎", gain=False, descending=False, aliases=("lowcavalry",), **POWER_375),
+    "toparcher": BoardSpec("Marksman Only", "Archer Merits", "🏹", gain=False, aliases=("topmarksman", "toparchers"), **POWER_375),
+    "lowarcher": BoardSpec("Marksman Only", "Archer Merits", "🏹", gain=False, descending=False, aliases=("lowmarksman", "lowarchers"), **POWER_375),
+    "topmage": BoardSpec("Magic Only", "Magic Merits", "🪄", gain=False, aliases=("topmagic", "topmages"), **POWER_375),
+    "lowmage": BoardSpec("Magic Only", "Magic Merits", "🪄", gain=False, descending=False, aliases=("lowmagic", "lowmages"), **POWER_375),
+    "toprssheal": BoardSpec("Healing (T4/T5)", "RSS Healing", "❤️", gain=False, aliases=("toprsshealing", "toprssheals"), **POWER_375),
+    "lowrssheal": BoardSpec("Healing (T4/T5)", "RSS Healing", "❤️", gain=False, descending=False, aliases=("lowrsshealing", "lowrssheals"), **POWER_375),
+    "topbuild": BoardSpec("Build Time", "Build Time", "🔨", gain=False, aliases=("topbuildtime",), **POWER_375),
+    "lowbuild": BoardSpec("Build Time", "Build Time", "🔨", gain=False, descending=False, aliases=("lowbuildtime",), **POWER_375),
+    "topdest": BoardSpec("Destruction Time", "Destruction", "🧨", gain=False, aliases=("topdestruction", "topdestruct"), **POWER_375),
+    "lowdest": BoardSpec("Destruction Time", "Destruction", "🧨", gain=False, descending=False, aliases=("lowdestruction", "lowdestruct"), **POWER_375),
+}
 
-    # Parse args flexibly
+def parse_board_args(spec, args):
+    """(top_n, season, scoped) from arguments in any order: a number, a season key, 'NVR' or 'all'."""
+    top_n, season, scoped = 10, DEFAULT_SEASON, False
     for arg in args:
         a = str(arg).strip().lower()
         if a.isdigit():
             top_n = max(1, min(100, int(a)))
-            continue
-        if a in ("NVR", "NVR375"):
-            filter_NVR = True
-            continue
-        if a in ("all", "*"):
-            filter_NVR = False
-            continue
-        if a in SEASON_SHEETS:
+        elif spec.sheet == "season" and a in ("nvr", "nvr375"):
+            scoped = True
+        elif spec.sheet == "season" and a in ("all", "*"):
+            scoped = False
+        elif spec.sheet == "season" and a in SEASON_SHEETS:
             season = a
-            continue
-        await ctx.send(f"❌ Invalid argument '{arg}'. Seasons: {', '.join(SEASON_SHEETS.keys())} | Filters: 'NVR', 'all'.")
-        return
-
-    try:
-        sheet_name = SEASON_SHEETS.get(season.lower())
-        if not sheet_name:
-            await ctx.send(f"❌ Invalid season. Available: {', '.join(SEASON_SHEETS.keys())}")
-            return
+        elif spec.sheet == "season":
+            raise ValueError(f"Invalid argument '{arg}'. Seasons: {', '.join(SEASON_SHEETS.keys())} | Filters: 'NVR', 'all'.")
+        else:
+            raise ValueError(f"Invalid argument '{arg}'. Usage: a number of players up to 100.")
+    return top_n, season, scoped
+
+async def send_chunked(ctx, header, lines):
+    """Send a header and lines in as few messages as fit Discord's 2000 character limit."""
+    chunk = header
+    chunks = []
+    for line in lines:
+        if len(chunk) + len(line) + 1 > 2000:
+            chunks.append(chunk.rstrip())
+            chunk = "(cont.)\n"
+        chunk += line + "\n"
+    if chunk.strip():
+        chunks.append(chunk.rstrip())
 
-        tabs = await asyncio.to_thread(client.open(sheet_name).worksheets)
-        if len(tabs) < 1:
-            await ctx.send("❌ No sheets found.")
+    for ch in chunks:
+        try:
+            await ctx.send(ch)
+        except discord.HTTPException as e:
+            if getattr(e, "code", None) == 50035 or getattr(e, "status", None) == 400:
+                await ctx.send("⚠️ Character limit reached — result was too long for Discord (2000 chars). Try a smaller N.")
+                return
+            if getattr(e, "status", None) == 429:
+                await ctx.send("⏳ Rate limited. Try again in a moment.")
+                return
+            await ctx.send(f"❌ Discord error: {e}")
             return
 
-        latest = tabs[-1]
-        data_latest = latest.get_all_values()
-        if not data_latest:
-            await ctx.send("❌ Sheet data is empty.")
-            return
+async def send_375_board(ctx, spec, top_n):
+    """Server 375 board as embeds of 50 players each."""
+    snap_375 = await get_375_snapshot(spec.columns())
+    names = snap_375.col(spec.name_col)
+    players = [(names[i], val) for i, val in run_board(spec, snap_375, top_n)]
+    if not players:
+        await ctx.send("❌ No matching players found.")
+        return
 
-        headers = data_latest[0]
+    chunk_size = 50
+    chunks = [players[i:i + chunk_size] for i in range(0, len(players), chunk_size)]
+    direction = "Top" if spec.descending else "Bottom"
+    color = discord.Color.gold() if spec.descending else discord.Color.red()
+    for index, chunk in enumerate(chunks):
+        start_rank = (index * chunk_size) + 1
+        end_rank = start_rank + len(chunk) - 1
+        desc = "".join(f"**{i}.** {p_name} — `{p_val:,}`\n" for i, (p_name, p_val) in enumerate(chunk, start_rank))
+        # Subtitle indicates range (e.g. "Top 100 (1-50)" and "Top 100 (51-100)")
+        chunk_title = f"{spec.icon} {spec.title} ({direction} {len(players)} — #{start_rank} to #{end_rank})"
+        embed = discord.Embed(title=chunk_title, description=desc, color=color)
+        if index == len(chunks) - 1:
+            embed.set_footer(text=f"Filtered for accounts ≥ {spec.min_power // 1_000_000}M Highest Power")
+        await ctx.send(embed=embed)
 
-        # Indices
-        id_index = headers.index("lord_id")       if "lord_id" in headers else 0
-        name_index = 1                            # Column B
-        alliance_index = 3                        # Column D
-        power_index = 12                          # Column M
-        dead_index = 17                           # Column R
-        server_idx = headers.index("home_server") if "home_server" in headers else 5  # Column F fallback
+async def send_season_board(ctx, spec, top_n, season, scoped):
+    """Season board: gains between the last two tabs, or totals of the latest tab."""
+    tabs = await open_scan_tabs(SEASON_SHEETS[season])
+    if len(tabs) < (2 if spec.gain else 1):
+        await ctx.send("❌ Not enough sheets to compare.")
+        return
+    latest = tabs[-1]
+    if spec.gain:
+        previous = tabs[-2]
+        snap_prev, snap_latest = await load_tabs(season, [previous, latest], spec.columns())
+        source = gain_frame(snap_prev, snap_latest)
+        span = f"`{previous.title}` → `{latest.title}`"
+    else:
+        snap_latest, = await load_tabs(season, [latest], spec.columns())
+        source = snap_latest
+        span = f"`{latest.title}`"
+    if not len(snap_latest):
+        await ctx.send("❌ Sheet data is empty.")
+        return
 
-        def to_int(v):
+    server, alliance = spec.scoped
+    scope = f"{alliance or 'All Alliances'} (S{server})" if scoped else "All"
+    header = f"**{spec.icon} {spec.title.format(n=top_n)} — {scope} (≥{spec.min_power // 1_000_000}M Power)**\n{span}:\n"
+    rows = labelled(source, run_board(spec, source, top_n, scoped))
+    if not rows:
+        await ctx.send(header + "_No eligible players found._")
+        return
+    sign = "+" if spec.gain else ""
+    await send_chunked(ctx, header, [f"{i}. `{name}` — {spec.emoji} {sign}{value:,}" for i, (name, value) in enumerate(rows, 1)])
+
+def leaderboard_command(name, spec):
+    async def board(ctx, *args):
+        async with ctx.typing():
+            if ctx.channel.id not in ALLOWED_COMMAND_CHANNEL_ID:
+                channels_mentions = ", ".join([f"<#{c}>" for c in ALLOWED_COMMAND_CHANNEL_ID])
+                await ctx.send(f"❌ Commands are only allowed in {channels_mentions}.")
+                return
             try:
-                return int(str(v).replace(",", "").replace("-", "").strip())
-            except:
-                return 0
-
-        def is_NVR(tag: str) -> bool:
-            return bool(tag) and tag.strip().upper().startswith("NVR")
-
-        rows = []
-        for row in data_latest[1:]:
-            if len(row) <= max(dead_index, power_index, alliance_index, server_idx, id_index):
-                continue
-
-            lord_id = (row[id_index] or "").strip()
-            if not lord_id:
-                continue
-
-            power = to_int(row[power_index])
-            if power < min_power:
-                continue
-
-            alliance = (row[alliance_index] or "").strip()
-            if filter_NVR:
-                server_val = (row[server_idx] or "").strip()
-                if not is_NVR(alliance) or str(server_val) != "375":
-                    continue
+                top_n, season, scoped = parse_board_args(spec, args)
+            except ValueError as e:
+                await ctx.send(f"❌ {e}")
+                return
+            try:
+                if spec.sheet == "375":
+                    await send_375_board(ctx, spec, top_n)
+                else:
+                    await send_season_board(ctx, spec, top_n, season, scoped)
+            except Exception as e:
+                await ctx.send(f"❌ Error: {e}")
+    board.__doc__ = f"{'Top' if spec.descending else 'Lowest'} players by {spec.stat}{' gain' if spec.gain else ''}."
+    return bot.command(name=name, aliases=list(spec.aliases))(board)
+
+for _name, _spec in LEADERBOARDS.items():
+    leaderboard_command(_name, _spec)
 
-            dead_now = to_int(row[dead_index])
-            name = (row[name_index] or "?").strip()
-            full_name = f"[{alliance}] {name}"
-            rows.append((full_name, dead_now))
+# -------------------------------------------------------------
+# AD-HOC QUERIES
+# -------------------------------------------------------------
 
-        scope = "NVR (S375)" if filter_NVR else "All"
-        if not rows:
-            await ctx.send(f"**💀 Total Deaths — Top {top_n} — {scope}**\n`{latest.title}`:\n_No eligible players found (≥25M power)._")
+@bot.command(name="query", aliases=["q"])
+async def query(ctx, *, text: str = ""):
+    """Ad-hoc leaderboard, e.g. !query low merits gain alliance=NVR2 power>80m"""
+    async with ctx.typing():
+        if ctx.channel.id not in ALLOWED_COMMAND_CHANNEL_ID:
+            channels_mentions = ", ".join([f"<#{c}>" for c in ALLOWED_COMMAND_CHANNEL_ID])
+            await ctx.send(f"❌ Commands are only allowed in {channels_mentions}.")
             return
-
-        rows.sort(key=lambda x: x[1], reverse=True)
-        top_rows = rows[:top_n]
-
-        # Build lines
-        lines = [f"{i+1}. `{name}` — 💀 {total:,}" for i, (name, total) in enumerate(top_rows)]
-
-        # Chunked send
-        header = f"**💀 Total Deaths — Top {top_n} — {scope}**\n`{latest.title}`:\n"
-        chunk = header
-        chunks = []
-        for line in lines:
-            if len(chunk) + len(line) + 1 > 2000:
-                chunks.append(chunk.rstrip())
-                chunk = "(cont.)\n"
-            chunk += line + "\n"
-        if chunk.strip():
-            chunks.append(chunk.rstrip())
-
-        for ch in chunks:
-            try:
-                await ctx.send(ch)
-            except discord.HTTPException as e:
-                if getattr(e, "code", None) == 50035 or getattr(e, "status", None) == 400:
-                    await ctx.send("⚠️ Character limit reached — result was too long for Discord (2000 chars). Try a smaller N.")
-                    return
-                if getattr(e, "status", None) == 429:
-                    await ctx.send("⏳ Rate limited. Try again in a moment.")
-                    return
-                await ctx.send(f"❌ Discord error: {e}")
+        try:
+            plan, cached = plan_query(text, frozenset(SEASON_SHEETS), DEFAULT_SEASON)
+        except QueryError as e:
+            await ctx.send(f"❌ {e}\n{QUERY_HELP}")
+            return
+        try:
+            tabs = await open_scan_tabs(SEASON_SHEETS[plan.season])
+            if len(tabs) < (2 if plan.gain else 1):
+                await ctx.send("❌ Not enough sheets to compare.")
                 return
+            latest = tabs[-1]
+            if plan.gain:
+                snap_prev, snap_latest = await load_tabs(plan.season, tabs[-2:], plan.columns())
+                source = gain_frame(snap_prev, snap_latest)
+                span = f"{tabs[-2].title} → {latest.title}"
+            else:
+                snap_latest, = await load_tabs(plan.season, [latest], plan.columns())
+                source = snap_latest
+                span = latest.title
 
-    except Exception as e:
-        await ctx.send(f"❌ Error: {e}")
+            start = time.perf_counter()
+            matched, rows = execute(plan, source)
+            elapsed = (time.perf_counter() - start) * 1000
+
+            names, tags = source.col("name"), source.col("alliance")
+            sign = "+" if plan.gain else ""
+            lines = [f"{n}. `[{tags[i]}] {names[i]}` — {sign}{value:,}" for n, (i, value) in enumerate(rows, 1)]
+            embed = discord.Embed(
+                title=f"🔎 {describe(plan)}",
+                description="\n".join(lines) or "_No players match._",
+                color=discord.Color.blue(),
+            )
+            embed.set_footer(text=(
+                f"📅 {span} • {matched:,} of {len(source):,} players matched • "
+                f"⏱️ {elapsed:.1f} ms{' (cached plan)' if cached else ''}"
+            ))
+            await ctx.send(embed=embed)
+        except Exception as e:
+            await ctx.send(f"❌ Error: {e}")
 
 # -------------------------------------------------------------
 # UTC TIME & DATE CHANNEL UPDATER
@@ -375,6 +538,108 @@ async def update_utc_channels():
 async def before_utc_update():
     await bot.wait_until_ready()
 
+# ============================
+# Background scan prefetch
+# ============================
+
+prefetch_state = {}  # season -> {"due": monotonic time of next check, "modified": Drive modifiedTime}
+ingested = {}  # season -> ids of the tabs already ingested, in sheet order
+
+async def ingest_season(season, changed=False):
+    """
+    Bring a season's cached tabs up to date. Scans are append-only, so only tabs not seen before
+    are downloaded, parsed and indexed; the new gain frame reuses the already indexed previous tab.
+    Every tab but the last is sealed in the cache, since a scan is complete once a newer one exists.
+    `changed` says the sheet was modified since the last ingest: with no new tab, the latest tab
+    was edited in place (a hand fix, or a scan still filling in), so it is downloaded again.
+    """
+    start = time.perf_counter()
+    tabs = await open_scan_tabs(SEASON_SHEETS[season])
+    if len(tabs) < 2:
+        return
+    ids = [ws.id for ws in tabs]
+    known = ingested.get(season)
+    if known is not None and ids[:len(known)] != known:
+        # Not an append (a tab was removed, renamed or moved): start over
+        print(f"⚠️ Tabs of {season} changed order; re-ingesting the season")
+        snapshot_cache.invalidate(season)
+        known = None
+    appended = tabs[len(known):] if known else tabs
+    if not appended:
+        latest_key = snapshot_key(season, tabs[-1])
+        if not changed and snapshot_cache.get(latest_key) is not None:
+            return  # no new scan and the sheet is unchanged
+        if changed:
+            # Its size (and so its key) may not have changed: forget the cached and stored copies
+            snapshot_cache.discard(latest_key)
+            snapshot_store.discard(latest_key)
+
+    # The tabs the stat commands read: first, previous, latest (older ones are already cached)
+    wanted = list({ws.id: ws for ws in (tabs[0], tabs[-2], tabs[-1])}.values())
+    # Headers (and row keys) first, so only the columns every tab actually has are requested
+    snaps = await load_tabs(season, wanted, PREFETCH_COLUMNS[:1])
+    columns = [c for c in PREFETCH_COLUMNS if all(snap.has_column(c) for snap in snaps)]
+    snaps = await load_tabs(season, wanted, columns)
+    # Gains and per-server aggregates are materialized now, not on the first !matchups
+    gain_frame(snaps[-2], snaps[-1]).server_totals()
+    for ws in tabs[:-1]:
+        key = snapshot_key(season, ws)
+        snap = snapshot_cache.seal(key)
+        if snap is not None and snap.key is not None:
+            await snapshot_store.save(key, snap)  # stored sealed: trusted on disk at any age
+    if season == DEFAULT_SEASON:
+        # The pair nearly every command reads stays in memory whatever the cache budget
+        snapshot_cache.pin([snapshot_key(season, tabs[-2]), snapshot_key(season, tabs[-1])])
+    ingested[season] = ids
+    print(
+        f"📥 Ingested {season}: {len(appended)} new tab(s) ({', '.join(ws.title for ws in appended[-3:])}), "
+        f"{len(snaps[-1]):,} rows, {len(columns)} columns in {time.perf_counter() - start:.2f}s"
+    )
+
+@tasks.loop(minutes=1)
+async def prefetch_scans():
+    # Background reads queue behind interactive commands in the quota scheduler
+    token = sheets_priority.set(BACKGROUND)
+    try:
+        now = time.monotonic()
+        due = [
+            season for season in SEASON_SHEETS
+            if season not in PREFETCH_SKIP and now >= prefetch_state.get(season, {}).get("due", 0)
+        ]
+        if not due:
+            return
+
+        # One cheap listing (Drive modifiedTime) tells which spreadsheets changed since the last check
+        modified = await snapshot_source.modified_times()
+
+        for season in due:
+            state = prefetch_state.setdefault(season, {"modified": None})
+            state["due"] = now + 60 * PREFETCH_INTERVALS.get(season, PREFETCH_DEFAULT_INTERVAL)
+            stamp = modified.get(SEASON_SHEETS[season])
+            if stamp is not None and stamp == state["modified"]:
+                # Checked and unchanged since the last ingest: keep it warm
+                touched = snapshot_cache.touch(season)
+                if touched:
+                    # Sealed tabs are trusted on disk anyway; the latest one stays fresh for the next restart
+                    snapshot_store.touch([k for k in touched if not snapshot_cache.sealed(k)])
+                    continue
+            try:
+                changed = state["modified"] is not None and stamp != state["modified"]
+                if changed:
+                    snapshot_source.invalidate(SEASON_SHEETS[season])  # a new tab may have been added
+                await ingest_season(season, changed)
+                state["modified"] = stamp
+            except Exception as e:
+                print(f"Error prefetching {season}: {e}")
+    except Exception as e:
+        print(f"Error checking for new scans: {e}")
+    finally:
+        sheets_priority.reset(token)
+
+@prefetch_scans.before_loop
+async def before_prefetch_scans():
+    await bot.wait_until_ready()
+
 @bot.command()
 async def mana(ctx, lord_id: str, season: str = DEFAULT_SEASON):
     async with ctx.typing():
@@ -391,63 +656,35 @@ async def mana(ctx, lord_id: str, season: str = DEFAULT_SEASON):
             await ctx.send(f"❌ Invalid season. Options: {', '.join(SEASON_SHEETS.keys())}")
             return
 
-        tabs = await asyncio.to_thread(client.open(sheet_name).worksheets)
+        tabs = await open_scan_tabs(sheet_name)
         if len(tabs) < 2:
             await ctx.send("❌ Need at least two snapshots to calculate gain.")
             return
 
         # CHANGE: Compare very first sheet [0] with very last sheet [-1]
         latest_sheet, oldest_sheet = tabs[-1], tabs[0]
-        data_latest = await asyncio.to_thread(latest_sheet.get_all_values)
-        data_oldest = oldest_sheet.get_all_values()
-        
-        headers = data_latest[0]
-        
-        # Helper: Get index by name to avoid hardcoding errors
-        def get_idx(name, default):
-            return headers.index(name) if name in headers else default
-
-        id_idx = get_idx("lord_id", 0)
-        name_idx = 1
-        alliance_idx = 3
-        mana_idx = 26
-        server_idx = 5 
-
-        def to_int(val):
-            if not val: return 0
-            try: return int(str(val).replace(',', '').replace('-', '').strip())
-            except: return 0
+        snap_oldest, snap_latest = await load_tabs(
+            season, [oldest_sheet, latest_sheet], ["lord_id", "name", "alliance", "home_server", "mana"]
+        )
 
-        # PERFORMANCE: Create a dictionary for the oldest data {lord_id: row_data}
-        oldest_lookup = {row[id_idx].strip(): row for row in data_oldest[1:] if len(row) > mana_idx}
+        # Season-long gains: oldest tab -> latest tab
+        frame = gain_frame(snap_oldest, snap_latest)
+        mana_gains = frame.gain("mana")
 
         # Find specific player data
-        row_latest = next((r for r in data_latest[1:] if len(r) > id_idx and r[id_idx].strip() == lord_id), None)
-        row_oldest = oldest_lookup.get(lord_id)
-
-        if not row_latest or not row_oldest:
+        pos = frame.find(lord_id)
+        if pos is None:
             await ctx.send("❌ Lord ID not found in both the start and end of this season.")
             return
 
-        # Calculate gains for ALL S375 players to determine rank
-        s375_gains = []
-        for row in data_latest[1:]:
-            l_id = row[id_idx].strip()
-            # Ensure they are S375 and exist in the oldest sheet
-            if len(row) > server_idx and str(row[server_idx]).strip() == "375":
-                old_row = oldest_lookup.get(l_id)
-                if old_row:
-                    gain = to_int(row[mana_idx]) - to_int(old_row[mana_idx])
-                    s375_gains.append((l_id, gain))
-
-        # Sort for ranking
-        s375_gains.sort(key=lambda x: x[1], reverse=True)
-        rank = next((i+1 for i, (lid, _) in enumerate(s375_gains) if lid == lord_id), None)
+        # Rank among S375 players by mana gain (index built once per frame)
+        s375_ranks = frame.rank_index("mana", "375")
+        rank = s375_ranks.rank(lord_id)
 
         # Player specific stats
-        mana_gain = to_int(row_latest[mana_idx]) - to_int(row_oldest[mana_idx])
-        name = row_latest[name_idx].strip()
-        alliance = row_latest[alliance_idx].strip()
+        name = frame.col("name")[pos].strip()
+        alliance = frame.col("alliance")[pos].strip()
+        mana_gain = mana_gains[pos]
 
 # Calculate Value ($100 per 250M mana)
         # We use round() to keep it a whole number
@@ -469,7 +706,7 @@ async def mana(ctx, lord_id: str, season: str = DEFAULT_SEASON):
         )
         
         if rank:
-            embed.add_field(name="🏅 NVR Rank", value=f"#{rank} / {len(s375_gains)}", inline=True)
+            embed.add_field(name="🏅 NVR Rank", value=f"#{rank} / {len(s375_ranks)}", inline=True)
         else:
             embed.set_footer(text="ℹ️ Player is not in NVR.")
 
@@ -478,114 +715,6 @@ async def mana(ctx, lord_id: str, season: str = DEFAULT_SEASON):
     except Exception as e:
         await ctx.send(f"❌ Error: {e}")
 
-@bot.command()
-async def topmana(ctx, *args):
-    async with ctx.typing():
-        
-        if ctx.channel.id not in ALLOWED_COMMAND_CHANNEL_ID:
-            # This creates a nicely formatted string of clickable channel links for the error message
-            channels_mentions = ", ".join([f"<#{channel_id}>" for channel_id in ALLOWED_COMMAND_CHANNEL_ID])
-            await ctx.send(f"❌ Commands are only allowed in {channels_mentions}.")
-            return
-
-    # Defaults
-    top_n = 10
-    season = DEFAULT_SEASON
-
-    # Parse args: first number = top N, any other token = season
-    for arg in args:
-        if arg.isdigit():
-            top_n = int(arg)
-        else:
-            season = arg.lower()
-
-    try:
-        season = season.lower()
-        sheet_name = SEASON_SHEETS.get(season)
-        if not sheet_name:
-            await ctx.send(f"❌ Invalid season. Available: {', '.join(SEASON_SHEETS.keys())}")
-            return
-
-        tabs = await asyncio.to_thread(client.open(sheet_name).worksheets)
-        if len(tabs) < 2:
-            await ctx.send("❌ Not enough sheets to compare.")
-            return
-
-        latest = tabs[-1]
-        previous = tabs[-2]
-
-        data_latest = latest.get_all_values()
-        data_prev = previous.get_all_values()
-        headers = data_latest[0]
-
-        id_index = headers.index("lord_id")
-        name_index = 1
-        alliance_index = 3
-        mana_idx = 26  # AA
-        power_idx = 12 # M
-
-        def to_int(val):
-            try:
-                return int(val.replace(',', '').replace('-', '').strip())
-            except:
-                return 0
-
-        prev_map = {
-            row[id_index]: {"mana": to_int(row[mana_idx])}
-            for row in data_prev[1:]
-            if len(row) > mana_idx and row[id_index]
-        }
-
-        gains = []
-        for row in data_latest[1:]:
-            if len(row) <= max(mana_idx, power_idx):
-                continue
-            lord_id = row[id_index]
-            if lord_id not in prev_map:
-                continue
-
-            alliance = row[alliance_index].strip() if len(row) > alliance_index else ""
-            name = f"[{alliance}] {row[name_index].strip()}"
-
-            mana_now = to_int(row[mana_idx])
-            mana_prev = prev_map[lord_id]["mana"]
-            gain = mana_now - mana_prev
-            power = to_int(row[power_idx])
-
-            if power >= 25_000_000:
-                gains.append((name, gain))
-
-        if not gains:
-            await ctx.send("No eligible players found (≥25M power and present in both sheets).")
-            return
-
-        gains.sort(key=lambda x: x[1], reverse=True)
-        top_rows = gains[:top_n]
-
-        # Build lines
-        lines = [f"{i+1}. `{name}` — 💧 +{mana:,}" for i, (name, mana) in enumerate(top_rows)]
-
-        # Chunked sending (<=2000 chars per message)
-        header = f"📊 **Top {top_n} Mana Gains** (≥25M Power)\n`{previous.title}` → `{latest.title}`:\n"
-        chunk = header
-        for line in lines:
-            if len(chunk) + len(line) + 1 > 2000:
-                await ctx.send(chunk.rstrip())
-                chunk = "(cont.)\n"
-            chunk += line + "\n"
-        if chunk.strip():
-            await ctx.send(chunk.rstrip())
-
-    except discord.HTTPException as e:
-        # Friendly message on length/validation errors
-        if getattr(e, "code", None) == 50035:
-            await ctx.send("⚠️ Character limit reached — result was too long for Discord (2000 chars). Try a smaller range.")
-        else:
-            await ctx.send(f"❌ Discord error: {e}")
-    except Exception as e:
-        await ctx.send(f"❌ Error: {e}")
-
-
 @bot.command()
 async def groupstats(ctx, season: str = DEFAULT_SEASON):
     allowed_channels = {1378735765827358791, 1383515877793595435, 1236059889411952690}
@@ -595,274 +724,39 @@ async def groupstats(ctx, season: str = DEFAULT_SEASON):
             channels_mentions = ", ".join([f"<#{channel_id}>" for channel_id in ALLOWED_COMMAND_CHANNEL_ID])
             await ctx.send(f"❌ Commands are only allowed in {channels_mentions}.")
             return
-
-    TEAM_ROSTER = {
-        "15165964": "Sun",
-        "12857281": "Moon",
-        "4000088": "Sun",
-        "3569766": "Moon",
-        "6420073": "Sun",
-        "12907861": "Moon",
-        "15309669": "Sun",
-        "12600393": "Moon",
-        "15168167": "Sun",
-        "2604968": "Moon",
-        "14931101": "Sun",
-        "14986396": "Moon",
-        "15137525": "Sun",
-        "15859464": "Moon",
-        "14920281": "Sun",
-        "15416591": "Moon",
-        "16007668": "Moon",
-        "15140100": "Sun",
-        "14685384": "Moon",
-        "15880004": "Sun",
-        "12564527": "Moon",
-        "12042542": "Sun",
-        "2404030": "Moon",
-        "11659353": "Sun",
-        "10046314": "Moon",
-        "1015374": "Sun",
-        "4188458": "Moon",
-        "13484309": "Sun",
-        "3246823": "Moon",
-        "13848161": "Sun",
-        "4352097": "Moon",
-        "12386205": "Sun",
-        "12391559": "Moon",
-        "11769711": "Sun",
-        "11589778": "Moon",
-        "2774776": "Sun",
-        "15719441": "Moon",
-        "8498158": "Sun",
-        "15727504": "Moon",
-        "9093069": "Sun",
-        "4188659": "Moon",
-        "1301820": "Sun",
-        "15203473": "Moon",
-        "9089694": "Sun",
-        "4781116": "Moon",
-        "11487055": "Sun",
-        "4475636": "Moon",
-        "10339011": "Sun",
-        "8532169": "Moon",
-        "15292305": "Sun",
-        "8654500": "Moon",
-        "4123943": "Sun",
-        "2069785": "Moon",
-        "2382626": "Sun",
-        "8167052": "Moon",
-        "93496": "Sun",
-        "14645040": "Moon",
-        "15344782": "Sun",
-        "12121490": "Moon",
-        "1157541": "Sun",
-        "15253936": "Moon",
-        "1207595": "Sun",
-        "14534389": "Moon",
-        "11648388": "Sun",
-        "9076185": "Moon",
-        "14841316": "Sun",
-        "1358230": "Moon",
-        "11498431": "Sun",
-        "1038031": "Moon",
-        "16072454": "Sun",
-        "12239902": "Moon",
-        "10870772": "Sun",
-        "1191528": "Moon",
-        "3568431": "Sun",
-        "1480794": "Moon",
-        "15137458": "Sun",
-        "15872187": "Moon",
-        "14860406": "Sun",
-        "3452794": "Moon",
-        "3911741": "Sun",
-        "14454676": "Moon",
-        "7871135": "Sun",
-        "921581": "Moon",
-        "11597010": "Sun",
-        "1363017": "Moon",
-        "12451416": "Sun",
-        "14894521": "Moon",
-        "3788189": "Sun",
-        "14991669": "Moon",
-        "12581309": "Sun",
-        "1177659": "Moon",
-        "472059": "Sun",
-        "15673802": "Moon",
-        "12049853": "Sun",
-        "12913373": "Moon",
-        "12861502": "Sun",
-        "11699043": "Moon",
-        "15888878": "Sun",
-        "15017853": "Moon",
-        "15592594": "Sun",
-        "7741397": "Moon",
-        "1288862": "Sun",
-        "4508150": "Moon",
-        "15639051": "Sun",
-        "3446240": "Moon",
-        "2355170": "Sun",
-        "14892554": "Moon",
-        "8218786": "Sun",
-        "12467111": "Moon",
-        "1475373": "Sun",
-        "15029841": "Moon",
-        "1129896": "Sun",
-        "9561066": "Moon",
-        "12426797": "Sun",
-        "11529501": "Moon",
-        "124604": "Sun",
-        "3937721": "Moon",
-        "1652362": "Sun",
-        "11516385": "Moon",
-        "3763091": "Sun",
-        "5306715": "Moon",
-        "14893533": "Sun",
-        "3238703": "Moon",
-        "12993192": "Sun",
-        "6409636": "Moon",
-        "3383792": "Sun",
-        "767323": "Moon",
-        "1327811": "Sun",
-        "14835271": "Moon",
-        "1696957": "Sun",
-        "15384392": "Moon",
-        "15138989": "Sun",
-        "14625955": "Moon",
-        "9011380": "Sun",
-        "14840981": "Moon",
-        "3884083": "Sun",
-        "13255722": "Moon",
-        "10403218": "Sun",
-        "5949871": "Moon",
-        "15039904": "Sun",
-        "3566602": "Moon",
-        "8347543": "Sun",
-        "3221838": "Moon",
-        "1902775": "Sun",
-        "1292270": "Moon",
-        "9298611": "Sun",
-        "15240107": "Moon",
-        "15808179": "Sun",
-        "4942738": "Moon",
-        "15665516": "Sun",
-        "11434627": "Moon",
-        "1896011": "Sun",
-        "3282829": "Moon",
-        "14868918": "Sun",
-        "6554196": "Moon",
-        "19117667": "Sun",
-        "1186483": "Moon",
-        "14859151": "Sun",
-        "14855893": "Moon",
-        "4213197": "Sun",
-        "12909862": "Moon",
-        "5465713": "Sun",
-        "1209648": "Moon",
-        "12049278": "Sun",
-        "1987541": "Moon",
-        "9900242": "Sun",
-        "2554608": "Moon",
-        "1485262": "Sun",
-        "37360": "Moon",
-        "15406991": "Sun",
-        "1666865": "Moon",
-        "16457327": "Sun",
-        "5501734": "Moon",
-        "14990715": "Sun",
-        "14891433": "Moon",
-        "13756181": "Sun",
-        "1426605": "Moon",
-        "14249731": "Sun",
-        "15238376": "Moon",
-        "9947044": "Sun",
-        "1771679": "Moon",
-        "14840896": "Sun",
-        "15985931": "Moon",
-        "15138403": "Sun",
-        "14322410": "Moon",
-        "8350805": "Sun",
-        "14697698": "Moon"
-    }
     
     try:
         season = season.lower()
         sheet_name = SEASON_SHEETS.get(season, season)
-        tabs = client.open(sheet_name).worksheets()
-        scan_tabs = [tab for tab in tabs if tab.title.lower() != "roster"]
+        tabs = await open_worksheets(sheet_name)
+        scans = scan_tabs(tabs)
         
-        if len(scan_tabs) < 2:
+        if len(scans) < 2:
             await ctx.send("❌ Not enough scan sheets to compare.")
             return
 
-        latest = scan_tabs[-1]
-        previous = scan_tabs[-2]
-        data_latest = latest.get_all_values()
-        data_prev   = previous.get_all_values()
-        headers = data_latest[0]
-
-        def find_idx(name, fallback):
-            if name in headers: return headers.index(name)
-            for i, h in enumerate(headers):
-                if name.lower() in h.lower(): return i
-            return fallback
-
-        def to_int(val):
-            try:
-                v = str(val).replace(',', '').replace(' ', '').strip()
-                return int(v) if v not in ("", "-") else 0
-            except: return 0
-
-        # Indices
-        id_idx     = find_idx("lord_id", 0)
-        name_idx   = find_idx("name", 1)
-        power_idx  = find_idx("highest_power", 2)
-        kills_idx  = find_idx("units_killed", 9) 
-        merits_idx = find_idx("merits", 11) 
-        heal_idx   = find_idx("units_healed", 18)
-        dead_idx   = find_idx("units_dead", 17)
-
-        max_needed_idx = max(heal_idx, kills_idx, merits_idx, power_idx, dead_idx)
-
-        prev_map = {
-            row[id_idx].strip(): row for row in data_prev[1:]
-            if len(row) > max_needed_idx and row[id_idx].strip()
-        }
-
-        group_data = {
-            "Sun":  {"power": 0, "kills": 0, "deads": 0, "heals": 0, "merits": 0, "players": []},
-            "Moon": {"power": 0, "kills": 0, "deads": 0, "heals": 0, "merits": 0, "players": []}
-        }
+        latest = scans[-1]
+        previous = scans[-2]
+        stat_cols = ["units_killed", "units_dead", "units_healed", "merits"]
+        snap_prev, snap_latest = await load_tabs(
+            season, [previous, latest], ["lord_id", "name", "highest_power"] + stat_cols
+        )
 
-        for row in data_latest[1:]:
-            if len(row) <= max_needed_idx: continue
-            lid = (row[id_idx] or "").strip()
-            group = TEAM_ROSTER.get(lid)
-            if not group: continue 
-
-            prev_row = prev_map.get(lid)
-            if prev_row is None: continue
-
-            p_gain = {
-                "name": row[name_idx],
-                "power": to_int(row[power_idx]),
-                "kills": to_int(row[kills_idx]) - to_int(prev_row[kills_idx]),
-                "deads": to_int(row[dead_idx]) - to_int(prev_row[dead_idx]),
-                "heals": to_int(row[heal_idx]) - to_int(prev_row[heal_idx]),
-                "merits": to_int(row[merits_idx]) - to_int(prev_row[merits_idx])
-            }
-
-            g_stats = group_data[group]
-            g_stats["power"]  += p_gain["power"]
-            g_stats["kills"]  += p_gain["kills"]
-            g_stats["deads"]  += p_gain["deads"]
-            g_stats["heals"]  += p_gain["heals"]
-            g_stats["merits"] += p_gain["merits"]
-            g_stats["players"].append(p_gain)
+        frame = gain_frame(snap_prev, snap_latest)
+        roster = await load_roster(SUN_MOON_ROSTER, tabs)
+        group_data = group_by(frame, roster, {
+            "power": frame.col("highest_power"),
+            "kills": frame.gain("units_killed"),
+            "deads": frame.gain("units_dead"),
+            "heals": frame.gain("units_healed"),
+            "merits": frame.gain("merits"),
+        }, top_by="merits", k=3)
+        names = frame.col("name")
+        empty = GroupStats(0, dict.fromkeys(("power", "kills", "deads", "heals", "merits"), 0), [])
 
         # UI FORMATTING
-        def format_group_section(name, emoji, stats):
+        def format_group_section(name, emoji, group):
+            stats = group.sums
             power = stats["power"]
             merits = stats["merits"]
             efficiency = (merits / power * 100) if power > 0 else 0
@@ -887,15 +781,14 @@ async def groupstats(ctx, season: str = DEFAULT_SEASON):
             )
 
             # Top Performers Block
-            top_players = sorted(stats["players"], key=lambda x: x["merits"], reverse=True)[:3]
             medals = ["🥇", "🥈", "🥉"]
             top_str = ""
-            for i, p in enumerate(top_players):
+            for i, (row, merits_gain) in enumerate(group.top):
                 # Force long names to be shorter to protect the layout width
-                display_name = p['name'][:13] + ".." if len(p['name']) > 13 else p['name']
+                display_name = names[row][:13] + ".." if len(names[row]) > 13 else names[row]
                 
                 # Removed the word " merits" at the end to save even more space!
-                top_str += f"{medals[i]} **{display_name}**\n└ `{fmt(p['merits'])}` Merits\n"
+                top_str += f"{medals[i]} **{display_name}**\n└ `{fmt(merits_gain)}` Merits\n"
 
             return f"{emoji} __**GROUP {name.upper()}**__", stats_block, top_str
 
@@ -907,7 +800,7 @@ async def groupstats(ctx, season: str = DEFAULT_SEASON):
         )
 
         # Sun Group Fields
-        title_s, stats_s, top_s = format_group_section("Sun", "☀️", group_data["Sun"])
+        title_s, stats_s, top_s = format_group_section("Sun", "☀️", group_data.get("Sun", empty))
         embed.add_field(name=title_s, value=stats_s, inline=True)
         embed.add_field(name="⭐ TOP PERFORMERS", value=top_s, inline=True)
         
@@ -915,7 +808,7 @@ async def groupstats(ctx, season: str = DEFAULT_SEASON):
         embed.add_field(name="\u200b", value="▬" * 30, inline=False)
 
         # Moon Group Fields
-        title_m, stats_m, top_m = format_group_section("Moon", "🌙", group_data["Moon"])
+        title_m, stats_m, top_m = format_group_section("Moon", "🌙", group_data.get("Moon", empty))
         embed.add_field(name=title_m, value=stats_m, inline=True)
         embed.add_field(name="⭐ TOP PERFORMERS", value=top_m, inline=True)
 
@@ -937,293 +830,55 @@ async def groupleaderboard(ctx, season: str = DEFAULT_SEASON):
         channels_mentions = ", ".join([f"<#{channel_id}>" for channel_id in ALLOWED_COMMAND_CHANNEL_ID])
         await ctx.send(f"❌ Commands are only allowed in {channels_mentions}.")
         return
-        
-    TEAM_ROSTER = {
-        "15165964": "Sun",
-        "12857281": "Moon",
-        "4000088": "Sun",
-        "3569766": "Moon",
-        "6420073": "Sun",
-        "12907861": "Moon",
-        "15309669": "Sun",
-        "12600393": "Moon",
-        "15168167": "Sun",
-        "2604968": "Moon",
-        "14931101": "Sun",
-        "14986396": "Moon",
-        "15137525": "Sun",
-        "15859464": "Moon",
-        "14920281": "Sun",
-        "15416591": "Moon",
-        "16007668": "Moon",
-        "15140100": "Sun",
-        "14685384": "Moon",
-        "15880004": "Sun",
-        "12564527": "Moon",
-        "12042542": "Sun",
-        "2404030": "Moon",
-        "11659353": "Sun",
-        "10046314": "Moon",
-        "1015374": "Sun",
-        "4188458": "Moon",
-        "13484309": "Sun",
-        "3246823": "Moon",
-        "13848161": "Sun",
-        "4352097": "Moon",
-        "12386205": "Sun",
-        "12391559": "Moon",
-        "11769711": "Sun",
-        "11589778": "Moon",
-        "2774776": "Sun",
-        "15719441": "Moon",
-        "8498158": "Sun",
-        "15727504": "Moon",
-        "9093069": "Sun",
-        "4188659": "Moon",
-        "1301820": "Sun",
-        "15203473": "Moon",
-        "9089694": "Sun",
-        "4781116": "Moon",
-        "11487055": "Sun",
-        "4475636": "Moon",
-        "10339011": "Sun",
-        "8532169": "Moon",
-        "15292305": "Sun",
-        "8654500": "Moon",
-        "4123943": "Sun",
-        "2069785": "Moon",
-        "2382626": "Sun",
-        "8167052": "Moon",
-        "93496": "Sun",
-        "14645040": "Moon",
-        "15344782": "Sun",
-        "12121490": "Moon",
-        "1157541": "Sun",
-        "15253936": "Moon",
-        "1207595": "Sun",
-        "14534389": "Moon",
-        "11648388": "Sun",
-        "9076185": "Moon",
-        "14841316": "Sun",
-        "1358230": "Moon",
-        "11498431": "Sun",
-        "1038031": "Moon",
-        "16072454": "Sun",
-        "12239902": "Moon",
-        "10870772": "Sun",
-        "1191528": "Moon",
-        "3568431": "Sun",
-        "1480794": "Moon",
-        "15137458": "Sun",
-        "15872187": "Moon",
-        "14860406": "Sun",
-        "3452794": "Moon",
-        "3911741": "Sun",
-        "14454676": "Moon",
-        "7871135": "Sun",
-        "921581": "Moon",
-        "11597010": "Sun",
-        "1363017": "Moon",
-        "12451416": "Sun",
-        "14894521": "Moon",
-        "3788189": "Sun",
-        "14991669": "Moon",
-        "12581309": "Sun",
-        "1177659": "Moon",
-        "472059": "Sun",
-        "15673802": "Moon",
-        "12049853": "Sun",
-        "12913373": "Moon",
-        "12861502": "Sun",
-        "11699043": "Moon",
-        "15888878": "Sun",
-        "15017853": "Moon",
-        "15592594": "Sun",
-        "7741397": "Moon",
-        "1288862": "Sun",
-        "4508150": "Moon",
-        "15639051": "Sun",
-        "3446240": "Moon",
-        "2355170": "Sun",
-        "14892554": "Moon",
-        "8218786": "Sun",
-        "12467111": "Moon",
-        "1475373": "Sun",
-        "15029841": "Moon",
-        "1129896": "Sun",
-        "9561066": "Moon",
-        "12426797": "Sun",
-        "11529501": "Moon",
-        "124604": "Sun",
-        "3937721": "Moon",
-        "1652362": "Sun",
-        "11516385": "Moon",
-        "3763091": "Sun",
-        "5306715": "Moon",
-        "14893533": "Sun",
-        "3238703": "Moon",
-        "12993192": "Sun",
-        "6409636": "Moon",
-        "3383792": "Sun",
-        "767323": "Moon",
-        "1327811": "Sun",
-        "14835271": "Moon",
-        "1696957": "Sun",
-        "15384392": "Moon",
-        "15138989": "Sun",
-        "14625955": "Moon",
-        "9011380": "Sun",
-        "14840981": "Moon",
-        "3884083": "Sun",
-        "13255722": "Moon",
-        "10403218": "Sun",
-        "5949871": "Moon",
-        "15039904": "Sun",
-        "3566602": "Moon",
-        "8347543": "Sun",
-        "3221838": "Moon",
-        "1902775": "Sun",
-        "1292270": "Moon",
-        "9298611": "Sun",
-        "15240107": "Moon",
-        "15808179": "Sun",
-        "4942738": "Moon",
-        "15665516": "Sun",
-        "11434627": "Moon",
-        "1896011": "Sun",
-        "3282829": "Moon",
-        "14868918": "Sun",
-        "6554196": "Moon",
-        "19117667": "Sun",
-        "1186483": "Moon",
-        "14859151": "Sun",
-        "14855893": "Moon",
-        "4213197": "Sun",
-        "12909862": "Moon",
-        "5465713": "Sun",
-        "1209648": "Moon",
-        "12049278": "Sun",
-        "1987541": "Moon",
-        "9900242": "Sun",
-        "2554608": "Moon",
-        "1485262": "Sun",
-        "37360": "Moon",
-        "15406991": "Sun",
-        "1666865": "Moon",
-        "16457327": "Sun",
-        "5501734": "Moon",
-        "14990715": "Sun",
-        "14891433": "Moon",
-        "13756181": "Sun",
-        "1426605": "Moon",
-        "14249731": "Sun",
-        "15238376": "Moon",
-        "9947044": "Sun",
-        "1771679": "Moon",
-        "14840896": "Sun",
-        "15985931": "Moon",
-        "15138403": "Sun",
-        "14322410": "Moon",
-        "8350805": "Sun",
-        "14697698": "Moon"
-    }            
     
     try:
-        # 1. FETCH SEASON DATA (For Merits & Deads Gains)
+        # 1. FETCH SEASON DATA (For Merits & Deads Gains), Server 375 data downloads in parallel
         season = season.lower()
         sheet_name = SEASON_SHEETS.get(season, season)
+        fetch_375 = prefetch(get_375_snapshot(["Character ID", "Infantry Only"]))
         
-        # We need asyncio.to_thread if you are using it elsewhere to prevent blocking
-        tabs = client.open(sheet_name).worksheets()
-        scan_tabs = [tab for tab in tabs if tab.title.lower() != "roster"]
+        tabs = await open_worksheets(sheet_name)
+        scans = scan_tabs(tabs)
         
-        if len(scan_tabs) < 2:
+        if len(scans) < 2:
             await ctx.send("❌ Not enough scan sheets to calculate leaderboard gains.")
             return
 
-        latest = scan_tabs[-1]
-        previous = scan_tabs[-2]
-        data_latest = latest.get_all_values()
-        data_prev   = previous.get_all_values()
-        headers = data_latest[0]
+        latest = scans[-1]
+        previous = scans[-2]
+        snap_prev, snap_latest = await load_tabs(season, [previous, latest], ["lord_id", "name", "merits", "units_dead"])
 
-        def find_idx(name, fallback):
-            if name in headers: return headers.index(name)
-            for i, h in enumerate(headers):
-                if name.lower() in h.lower(): return i
-            return fallback
-
-        def to_int(val):
-            try:
-                v = str(val).replace(',', '').replace(' ', '').strip()
-                return int(v) if v not in ("", "-") else 0
-            except: return 0
-
-        id_idx     = find_idx("lord_id", 0)
-        name_idx   = find_idx("name", 1)
-        merits_idx = find_idx("merits", 11) 
-        dead_idx   = find_idx("units_dead", 17)
-        max_needed_idx = max(id_idx, name_idx, merits_idx, dead_idx)
-
-        prev_map = {
-            row[id_idx].strip(): row for row in data_prev[1:]
-            if len(row) > max_needed_idx and row[id_idx].strip()
-        }
+        frame = gain_frame(snap_prev, snap_latest)
 
-        # 2. FETCH SERVER 375 DATA (For Infantry Merits)
-        sheet_375 = client.open(SERVER_375_SHEET)
-        data_375 = sheet_375.sheet1.get_all_values()
-        headers_375 = data_375[0]
-        
-        id_col_375 = headers_375.index("Character ID")
-        inf_col_375 = headers_375.index("Infantry Only")
-        
-        # Create a dictionary mapping Lord ID to their Infantry Merits
-        inf_map = {}
-        for r in data_375[1:]:
-            if len(r) > max(id_col_375, inf_col_375):
-                inf_map[str(r[id_col_375]).strip()] = to_int(r[inf_col_375])
+        # 2. SERVER 375 DATA (For Infantry Merits)
+        snap_375 = await fetch_375
+        inf_col = snap_375.col("Infantry Only")
 
         # 3. CALCULATE SCORES
-        sun_players = []
-        moon_players = []
-
-        for row in data_latest[1:]:
-            if len(row) <= max_needed_idx: continue
-            
-            lid = (row[id_idx] or "").strip()
-            group = TEAM_ROSTER.get(lid)
-            if not group: continue
-
-            prev_row = prev_map.get(lid)
-            if prev_row is None: continue
-
-            # Gains from Season Sheet
-            merits_gain = to_int(row[merits_idx]) - to_int(prev_row[merits_idx])
-            deads_gain  = to_int(row[dead_idx]) - to_int(prev_row[dead_idx])
-            
-            # Static Total from 375 Sheet
-            inf_val = inf_map.get(lid, 0)
-            
-            # Scoring Formula: Merits (1x) + Infantry (2x) + Deads (5x)
-            score = (merits_gain * 1) + (inf_val * 2) + (deads_gain * 5)
-            
-            p_data = {
-                "name": row[name_idx],
-                "score": score,
-                "merits": merits_gain,
-                "infantry": inf_val,
-                "deads": deads_gain
-            }
-            
-            if group == "Sun":
-                sun_players.append(p_data)
-            elif group == "Moon":
-                moon_players.append(p_data)
-
-        # Sort both teams highest score to lowest
-        sun_players.sort(key=lambda x: x["score"], reverse=True)
-        moon_players.sort(key=lambda x: x["score"], reverse=True)
+        roster = await load_roster(SUN_MOON_ROSTER, tabs)
+        lord_ids = frame.col("lord_id")
+        infantry = {}
+        for rows in roster.rows(frame).values():
+            for i in rows:
+                row_375 = snap_375.find(lord_ids[i])
+                # Static Total from 375 Sheet
+                infantry[i] = inf_col[row_375] if row_375 is not None else 0
+
+        # Scoring Formula: Merits (1x) + Infantry (2x) + Deads (5x)
+        columns = {"merits": frame.gain("merits"), "infantry": infantry, "deads": frame.gain("units_dead")}
+        groups = group_by(frame, roster, columns, weights={"merits": 1, "infantry": 2, "deads": 5}, top_by="score", k=10)
+        names = frame.col("name")
+
+        def team(group):
+            stats = groups.get(group)
+            if stats is None:
+                return [], 0
+            players = [
+                {"name": names[i], "score": score, "merits": columns["merits"][i],
+                 "infantry": infantry[i], "deads": columns["deads"][i]}
+                for i, score in stats.top
+            ]
+            return players, stats.sums["score"]
 
         # UI FORMATTING HELPER
         def fmt(num):
@@ -1244,9 +899,9 @@ async def groupleaderboard(ctx, season: str = DEFAULT_SEASON):
                 lines.append(f"> M: {fmt(p['merits'])} | Inf: {fmt(p['infantry'])} | D: {fmt(p['deads'])}")
             
             return "\n".join(lines)
-        # Calculate Total Points for each team
-        sun_total = sum(p["score"] for p in sun_players)
-        moon_total = sum(p["score"] for p in moon_players)
+        # Top 10 and total points for each team
+        sun_players, sun_total = team("Sun")
+        moon_players, moon_total = team("Moon")
 
         # Create the Embed
         embed = discord.Embed(
@@ -1258,6 +913,7 @@ async def groupleaderboard(ctx, season: str = DEFAULT_SEASON):
         
         embed.add_field(name=f"☀️ TEAM SUN — {fmt(sun_total)} pts", value=build_lb_text(sun_players, 10), inline=True)
         embed.add_field(name=f"🌙 TEAM MOON — {fmt(moon_total)} pts", value=build_lb_text(moon_players, 10), inline=True)
+        embed.set_footer(text=f"👥 Roster {roster.version} · {len(roster)} players · {roster.origin}")
         
         embed.timestamp = datetime.now(UTC) 
         await ctx.send(embed=embed)
@@ -1265,78 +921,6 @@ async def groupleaderboard(ctx, season: str = DEFAULT_SEASON):
     except Exception as e:
         await ctx.send(f"❌ **Error:** {e}")
 
-@bot.command()
-async def topheal(ctx, top_n: int = 10, season: str = DEFAULT_SEASON):
-    async with ctx.typing():
-        
-        if ctx.channel.id not in ALLOWED_COMMAND_CHANNEL_ID:
-            # This creates a nicely formatted string of clickable channel links for the error message
-            channels_mentions = ", ".join([f"<#{channel_id}>" for channel_id in ALLOWED_COMMAND_CHANNEL_ID])
-            await ctx.send(f"❌ Commands are only allowed in {channels_mentions}.")
-            return
-
-    try:
-        season = season.lower()
-        sheet_name = SEASON_SHEETS.get(season)
-        if not sheet_name:
-            await ctx.send(f"❌ Invalid season. Available: {', '.join(SEASON_SHEETS.keys())}")
-            return
-
-        tabs = await asyncio.to_thread(client.open(sheet_name).worksheets)
-        if len(tabs) < 2:
-            await ctx.send("❌ Not enough sheets to compare.")
-            return
-
-        latest = tabs[-1]
-        previous = tabs[-2]
-
-        data_latest = latest.get_all_values()
-        data_prev = previous.get_all_values()
-        headers = data_latest[0]
-
-        id_index = headers.index("lord_id")
-        name_index = 1
-        alliance_index = 3
-        heal_idx = 18   # Column S
-        power_idx = 12  # Column M
-
-        def to_int(val):
-            try: return int(val.replace(',', '').replace('-', '').strip())
-            except: return 0
-
-        # Clean and map previous sheet IDs
-        prev_map = {}
-        for row in data_prev[1:]:
-            if len(row) > heal_idx:
-                raw_id = row[id_index].strip() if row[id_index] else ""
-                if raw_id:
-                    prev_map[raw_id] = to_int(row[heal_idx])
-
-        gains = []
-        for row in data_latest[1:]:
-            if len(row) > max(heal_idx, power_idx):
-                raw_id = row[id_index].strip() if row[id_index] else ""
-                if raw_id not in prev_map:
-                    continue  # skip if not in both
-
-                alliance = row[alliance_index].strip() if len(row) > alliance_index else ""
-                name = f"[{alliance}] {row[name_index].strip()}"
-                healed_now = to_int(row[heal_idx])
-                healed_prev = prev_map[raw_id]
-                gain = healed_now - healed_prev
-                power = to_int(row[power_idx])
-
-                if power >= 25_000_000:
-                    gains.append((name, gain))
-
-        gains.sort(key=lambda x: x[1], reverse=True)
-        result = "\n".join([f"{i+1}. `{name}` — ❤️‍🩹 +{heal:,}" for i, (name, heal) in enumerate(gains[:top_n])])
-
-        await ctx.send(f"📊 **Top {top_n} Healers (Gain)** (≥25M Power)\n`{previous.title}` → `{latest.title}`:\n{result}")
-
-    except Exception as e:
-        await ctx.send(f"❌ Error: {e}")
-        
 @bot.command()
 async def kills(ctx, lord_id: str, season: str = DEFAULT_SEASON):
     try:
@@ -1346,7 +930,7 @@ async def kills(ctx, lord_id: str, season: str = DEFAULT_SEASON):
             await ctx.send(f"❌ Invalid season. Options: {', '.join(SEASON_SHEETS.keys())}")
             return
 
-        tabs = await asyncio.to_thread(client.open(sheet_name).worksheets)
+        tabs = await open_scan_tabs(sheet_name)
         if len(tabs) < 2:
             await ctx.send("❌ Not enough sheets to compare.")
             return
@@ -1354,68 +938,50 @@ async def kills(ctx, lord_id: str, season: str = DEFAULT_SEASON):
         latest = tabs[-1]
         previous = tabs[-2]
 
-        data_latest = latest.get_all_values()
-        data_prev = previous.get_all_values()
-        headers = data_latest[0]
-
-        id_index = headers.index("lord_id")
-        name_index = 1
-        alliance_index = 3
-        power_index = 12
-
-        total_idx = 9    # Column J
-        t5_idx = 36      # Column AK
-        t4_idx = 37      # Column AL
-        t3_idx = 38      # Column AM
-        t2_idx = 39      # Column AN
-        t1_idx = 40      # Column AO
-
-        def to_int(val):
-            try:
-                return int(val.replace(',', '').replace('-', '').strip())
-            except:
-                return 0
-
-        def find_row(data):
-            for row in data[1:]:
-                if row[id_index] == lord_id:
-                    return row
-            return None
+        columns = [
+            "lord_id", "name", "alliance", "power",
+            "units_killed",  # Column J
+            "killcount_t5", "killcount_t4", "killcount_t3", "killcount_t2", "killcount_t1",  # Columns AK..AO
+        ]
+        snap_prev, snap_latest = await load_tabs(season, [previous, latest], columns)
 
-        row_latest = find_row(data_latest)
-        row_prev = find_row(data_prev)
+        row_latest = snap_latest.row(lord_id, *columns)
+        row_prev = snap_prev.row(lord_id, *columns)
 
         if not row_latest or not row_prev:
             await ctx.send("❌ Lord ID not found in both sheets.")
             return
 
-        power = to_int(row_latest[power_index])
+        row_latest = dict(zip(columns, row_latest))
+        row_prev = dict(zip(columns, row_prev))
+
+        power = row_latest["power"]
         if power < 25_000_000:
             await ctx.send("❌ Player is below 25M power.")
             return
 
-        name = row_latest[name_index].strip()
-        alliance = row_latest[alliance_index].strip()
+        name = row_latest["name"].strip()
+        alliance = row_latest["alliance"].strip()
         tag = f"[{alliance}] {name}"
 
-        def get_diff(idx):
-            return to_int(row_latest[idx]) - to_int(row_prev[idx])
-
-        def get_now(idx):
-            return to_int(row_latest[idx])
-
-        total = get_now(total_idx)
-        total_diff = get_diff(total_idx)
-        t5 = get_now(t5_idx)
-        t5_diff = get_diff(t5_idx)
-        t4 = get_now(t4_idx)
-        t4_diff = get_diff(t4_idx)
-        t3 = get_now(t3_idx)
-        t3_diff = get_diff(t3_idx)
-        t2 = get_now(t2_idx)
-        t2_diff = get_diff(t2_idx)
-        t1 = get_now(t1_idx)
-        t1_diff = get_diff(t1_idx)
+        def get_diff(col):
+            return row_latest[col] - row_prev[col]
+
+        def get_now(col):
+            return row_latest[col]
+
+        total = get_now("units_killed")
+        total_diff = get_diff("units_killed")
+        t5 = get_now("killcount_t5")
+        t5_diff = get_diff("killcount_t5")
+        t4 = get_now("killcount_t4")
+        t4_diff = get_diff("killcount_t4")
+        t3 = get_now("killcount_t3")
+        t3_diff = get_diff("killcount_t3")
+        t2 = get_now("killcount_t2")
+        t2_diff = get_diff("killcount_t2")
+        t1 = get_now("killcount_t1")
+        t1_diff = get_diff("killcount_t1")
 
         await ctx.send(
             f"📊 **Kill Stats for `{tag}`**\n"
@@ -1432,7 +998,8 @@ async def kills(ctx, lord_id: str, season: str = DEFAULT_SEASON):
         await ctx.send(f"❌ Error: {e}")
 
 @bot.command()
-async def topkills(ctx, top_n: int = 10, season: str = DEFAULT_SEASON):
+async def allmana(ctx, season: str = DEFAULT_SEASON):
+    """Shows the total mana gathered by the entire alliance and its dollar value."""
     async with ctx.typing():
         
         if ctx.channel.id not in ALLOWED_COMMAND_CHANNEL_ID:
@@ -1440,676 +1007,66 @@ async def topkills(ctx, top_n: int = 10, season: str = DEFAULT_SEASON):
             channels_mentions = ", ".join([f"<#{channel_id}>" for channel_id in ALLOWED_COMMAND_CHANNEL_ID])
             await ctx.send(f"❌ Commands are only allowed in {channels_mentions}.")
             return
-
     try:
         season = season.lower()
         sheet_name = SEASON_SHEETS.get(season)
         if not sheet_name:
-            await ctx.send(f"❌ Invalid season. Available: {', '.join(SEASON_SHEETS.keys())}")
+            await ctx.send(f"❌ Invalid season. Options: {', '.join(SEASON_SHEETS.keys())}")
             return
 
-        tabs = await asyncio.to_thread(client.open(sheet_name).worksheets)
+        tabs = await open_scan_tabs(sheet_name)
         if len(tabs) < 2:
-            await ctx.send("❌ Not enough sheets to compare.")
+            await ctx.send("❌ Need at least two tabs to calculate gain.")
             return
 
         latest = tabs[-1]
         previous = tabs[-2]
-        data_latest = latest.get_all_values()
-        data_prev = previous.get_all_values()
-        headers = data_latest[0]
-
-        id_index = headers.index("lord_id")
-        name_index = 1  # Column B
-        alliance_index = 3  # Column D
-        power_index = 12  # Column M
-        kills_index = 9   # Column J
-
-        def to_int(val):
-            try: return int(val.replace(",", "").replace("-", "").strip())
-            except: return 0
-
-        # Build map from previous sheet
-        prev_map = {
-            row[id_index].strip(): to_int(row[kills_index])
-            for row in data_prev[1:]
-            if len(row) > kills_index and row[id_index].strip()
-        }
+        
+        snap_prev, snap_latest = await load_tabs(season, [previous, latest], ["lord_id", "home_server", "mana"])
 
-        gains = []
-        for row in data_latest[1:]:
-            if len(row) <= kills_index:
-                continue
+        # Players present in both tabs; new arrivals count as 0 gain (to be safe)
+        frame = gain_frame(snap_prev, snap_latest)
 
-            raw_id = row[id_index].strip()
-            if not raw_id or raw_id not in prev_map:
-                continue
+        total_mana_gain = 0
+        player_count = 0
 
-            power = to_int(row[power_index])
-            if power < 25_000_000:
+        for server_val, gain in zip(frame.col("home_server"), frame.gain("mana")):
+            # 1. STRICT LATEST SERVER FILTER: Only proceed if they are 375 NOW
+            if server_val != "375":
                 continue
 
-            name = row[name_index].strip()
-            alliance = row[alliance_index].strip()
-            kills_now = to_int(row[kills_index])
-            kills_then = prev_map[raw_id]
-            gain = kills_now - kills_then
-
-            full_name = f"[{alliance}] {name}"
-            gains.append((full_name, gain))
-
-        gains.sort(key=lambda x: x[1], reverse=True)
+            # 2. GAIN CALCULATION
+            if gain > 0:
+                total_mana_gain += gain
+                player_count += 1
 
-        lines = [
-            f"{i+1}. `{name}` — ⚔️ +{gain:,}"
-            for i, (name, gain) in enumerate(gains[:top_n])
-        ]
+        # Calculate Dollar Value ($100 per 250M)
+        total_value = round((total_mana_gain / 250_000_000) * 100)
 
-        await ctx.send("**🏆 Top Kill Gains:**\n" + "\n".join(lines))
+        # Build the Embed
+        embed = discord.Embed(
+            title=f"🏰 Alliance Mana Report: {season.upper()}",
+            description=f"Gain From **{previous.title}** to **{latest.title}**",
+            color=discord.Color.blue()
+        )
+        
+        embed.add_field(name="💧 Total Mana Gathered", value=f"**{total_mana_gain:,}**", inline=False)
+        embed.add_field(
+            name="💰 Value", 
+            value=f"The alliance gathered mana worth **{total_value:,}$**", 
+            inline=False
+        )
+        
+        await ctx.send(embed=embed)
 
     except Exception as e:
-        await ctx.send(f"❌ Error: {e}")
+        await ctx.send(f"❌ Error calculating alliance mana: {e}")
 
-@bot.command()
-async def lowdeads(ctx, *args):
-    """
-    Lowest dead gains between the last two tabs.
-
-    Usage examples:
-      !lowdeads                         -> Bottom 10 overall (≥50M power)
-      !lowdeads 25                     -> Bottom 25 overall
-      !lowdeads sos5                   -> Bottom 10 for season 'sos5'
-      !lowdeads sos5 30                -> Bottom 30 for 'sos5'
-      !lowdeads NVR 50                 -> Bottom 50 for NVR on Server 375
-      !lowdeads NVR sos5 30            -> NVR+S375, season 'sos5', bottom 30
-      !lowdeads all 50                 -> Remove NVR filter and show bottom 50
-    """
+@bot.command(aliases=['checkfarm', 'farm'])
+async def farmcheck(ctx, farm_id: str):
     async with ctx.typing():
         
-        if ctx.channel.id not in ALLOWED_COMMAND_CHANNEL_ID:
-            # This creates a nicely formatted string of clickable channel links for the error message
-            channels_mentions = ", ".join([f"<#{channel_id}>" for channel_id in ALLOWED_COMMAND_CHANNEL_ID])
-            await ctx.send(f"❌ Commands are only allowed in {channels_mentions}.")
-            return
-
-    # Defaults
-    top_n = 10
-    season = DEFAULT_SEASON
-    filter_NVR = False       # [NVR*] AND server == 77
-    MIN_POWER = 50_000_000   # >= 50M only
-
-    # ---- Parse args (any order) ----
-    for arg in args:
-        a = str(arg).strip().lower()
-        if a.isdigit():
-            top_n = max(1, min(100, int(a)))
-            continue
-        if a in ("NVR", "NVR375", "NVR"):
-            filter_NVR = True
-            continue
-        if a in ("all", "*"):
-            filter_NVR = False
-            continue
-        if a in SEASON_SHEETS:
-            season = a
-            continue
-        await ctx.send(
-            f"❌ Invalid argument '{arg}'. Seasons: {', '.join(SEASON_SHEETS.keys())} | Filters: 'NVR', 'all'."
-        )
-        return
-
-    try:
-        sheet_name = SEASON_SHEETS.get(season.lower())
-        if not sheet_name:
-            await ctx.send(f"❌ Invalid season. Available: {', '.join(SEASON_SHEETS.keys())}")
-            return
-
-        tabs = await asyncio.to_thread(client.open(sheet_name).worksheets)
-        if len(tabs) < 2:
-            await ctx.send("❌ Not enough sheets to compare.")
-            return
-
-        latest = tabs[-1]
-        previous = tabs[-2]
-
-        data_latest = latest.get_all_values()
-        data_prev   = previous.get_all_values()
-        if not data_latest or not data_prev:
-            await ctx.send("❌ Sheet data is empty.")
-            return
-
-        headers = data_latest[0]
-
-        # Column indices
-        id_index      = headers.index("lord_id")        if "lord_id" in headers        else 0
-        name_index    = 1
-        alliance_idx  = 3
-        server_idx    = headers.index("home_server")    if "home_server" in headers    else 5
-        power_idx     = 12   # M
-        dead_idx      = 17   # R
-
-        def to_int(val):
-            try:
-                return int(str(val).replace(",", "").replace("-", "").strip())
-            except:
-                return 0
-
-        # Build prev map (id -> deads then)
-        prev_map = {}
-        for row in data_prev[1:]:
-            if len(row) > max(dead_idx, id_index):
-                rid = (row[id_index] or "").strip()
-                if rid:
-                    prev_map[rid] = to_int(row[dead_idx])
-
-        # Collect gains for IDs present in BOTH sheets, ≥50M, optional NVR+S77
-        rows = []
-        for row in data_latest[1:]:
-            if len(row) <= max(dead_idx, power_idx, alliance_idx, server_idx, id_index):
-                continue
-
-            rid = (row[id_index] or "").strip()
-            if not rid or rid not in prev_map:
-                continue
-
-            power = to_int(row[power_idx])
-            if power < MIN_POWER:
-                continue
-
-            tag = (row[alliance_idx] or "").strip()
-            # ... (Inside your data_latest loop)
-            if filter_NVR:
-                # We only check the server ID, ignoring the alliance tag entirely
-                server_val = str(row[server_idx] or "").strip()
-                
-                # If the server isn't 375, skip this player
-                # Note: We use "375" because sheets often store numbers as strings
-                if server_val != "375":
-                    continue
-
-            dead_then = prev_map.get(rid, 0)
-            dead_now  = to_int(row[dead_idx])
-            gain = dead_now - dead_then
-            if gain < 0:
-                gain = 0  # guard against corrections
-
-            name = (row[name_index] or "?").strip()
-            display = f"[{tag}] {name}"
-            rows.append((display, gain))
-
-        if not rows:
-            sscope = "Server 375 (All Alliances)" if filter_NVR else "All Servers"
-            await ctx.send(
-                f"**🔻 Lowest {top_n} Dead Gains — {scope} (≥50M Power)**\n"
-                f"`{previous.title}` → `{latest.title}`:\n_No eligible players found._"
-            )
-            return
-
-        # Sort ASC by gain (lowest first), then by name for stability
-        rows.sort(key=lambda x: (x[1], x[0]))
-        bottom = rows[:top_n]
-
-        # Build lines
-        lines = [f"{i+1}. `{name}` — 💀 +{gain:,}" for i, (name, gain) in enumerate(bottom)]
-
-        # Header + chunked send
-        scope = "NVR (S375)" if filter_NVR else "All"
-        header = (
-            f"**🔻 Lowest {top_n} Dead Gains — {scope} (≥50M Power)**\n"
-            f"`{previous.title}` → `{latest.title}`:\n"
-        )
-
-        chunk = header
-        chunks = []
-        for line in lines:
-            if len(chunk) + len(line) + 1 > 2000:
-                chunks.append(chunk.rstrip())
-                chunk = "(cont.)\n"
-            chunk += line + "\n"
-        if chunk.strip():
-            chunks.append(chunk.rstrip())
-
-        for ch in chunks:
-            try:
-                await ctx.send(ch)
-            except discord.HTTPException as e:
-                if getattr(e, "code", None) == 50035 or getattr(e, "status", None) == 400:
-                    await ctx.send("⚠️ Character limit reached — result was too long for Discord (2000 chars). Try a smaller N.")
-                    return
-                if getattr(e, "status", None) == 429:
-                    await ctx.send("⏳ Rate limited. Try again in a moment.")
-                    return
-                await ctx.send(f"❌ Discord error: {e}")
-                return
-
-    except Exception as e:
-        await ctx.send(f"❌ Error: {e}")
-
-@bot.command()
-async def lowmerits(ctx, *args):
-    """
-    Lowest merit gains between the last two tabs (IDs must be in both).
-    Uses merits in column 12 and power in column 13 (1-based).
-    Supports NVR (S375) filter. Requires power >= 50M.
-    """
-    async with ctx.typing():
-        
-        if ctx.channel.id not in ALLOWED_COMMAND_CHANNEL_ID:
-            # This creates a nicely formatted string of clickable channel links for the error message
-            channels_mentions = ", ".join([f"<#{channel_id}>" for channel_id in ALLOWED_COMMAND_CHANNEL_ID])
-            await ctx.send(f"❌ Commands are only allowed in {channels_mentions}.")
-            return
-    # Defaults
-    top_n = 10
-    season = DEFAULT_SEASON
-    filter_NVR = False
-    MIN_POWER = 50_000_000
-
-    # Parse args
-    for arg in args:
-        a = str(arg).strip().lower()
-        if a.isdigit():
-            top_n = max(1, min(100, int(a)))
-        elif a in ("NVR", "NVR375", "NVR"):
-            filter_NVR = True
-        elif a in ("all", "*"):
-            filter_NVR = False
-        elif a in SEASON_SHEETS:
-            season = a
-        else:
-            await ctx.send(f"❌ Invalid argument '{arg}'. Seasons: {', '.join(SEASON_SHEETS.keys())} | Filters: 'NVR', 'all'.")
-            return
-
-    try:
-        sheet_name = SEASON_SHEETS.get(season.lower())
-        if not sheet_name:
-            await ctx.send(f"❌ Invalid season. Available: {', '.join(SEASON_SHEETS.keys())}")
-            return
-
-        tabs = await asyncio.to_thread(client.open(sheet_name).worksheets)
-        if len(tabs) < 2:
-            await ctx.send("❌ Not enough sheets to compare.")
-            return
-
-        latest = tabs[-1]
-        previous = tabs[-2]
-        data_latest = latest.get_all_values()
-        data_prev   = previous.get_all_values()
-        if not data_latest or not data_prev:
-            await ctx.send("❌ Sheet data is empty.")
-            return
-
-        headers = data_latest[0]
-        hmap = {h.strip().lower(): i for i, h in enumerate(headers)}
-
-        # Fixed positions you specified (1-based -> 0-based), with safe fallback to header if present
-        id_index     = hmap.get("lord_id", 0)         # A by default
-        name_index   = 1                               # B
-        alliance_idx = 3                               # D
-        server_idx   = hmap.get("home_server", 5)      # F
-        merits_idx   = 11                              # column 12 (1-based)
-        power_idx    = 12                              # column 13 (1-based)
-
-        # robust int parser: keep digits only (handles 21.734.811, 21,734,811, spaces, NBSP)
-        def to_int(val):
-            s = str(val).replace("\u00A0", "").strip()
-            digits = "".join(ch for ch in s if ch.isdigit())
-            try:
-                return int(digits) if digits else 0
-            except:
-                return 0
-                
-        # prev map (id -> merits then)
-        prev_map = {}
-        for row in data_prev[1:]:
-            if len(row) > max(merits_idx, id_index):
-                rid = (row[id_index] or "").strip()
-                if rid:
-                    prev_map[rid] = to_int(row[merits_idx])
-
-        # gather (IDs in both, >=50M, optional NVR S375)
-        rows = []
-        for row in data_latest[1:]:
-            if len(row) <= max(merits_idx, power_idx, alliance_idx, server_idx, id_index):
-                continue
-            rid = (row[id_index] or "").strip()
-            if not rid or rid not in prev_map:
-                continue
-
-            power = to_int(row[power_idx])
-            if power < MIN_POWER:
-                continue
-
-            tag = (row[alliance_idx] or "").strip()
-            # ... (Inside your data_latest loop)
-            if filter_NVR:
-                # We only check the server ID, ignoring the alliance tag entirely
-                server_val = str(row[server_idx] or "").strip()
-                
-                # If the server isn't 375, skip this player
-                # Note: We use "375" because sheets often store numbers as strings
-                if server_val != "375":
-                    continue
-
-            m_then = prev_map.get(rid, 0)
-            m_now  = to_int(row[merits_idx])
-            gain = m_now - m_then
-            if gain < 0:
-                gain = 0  # clamp corrections
-
-            name = (row[name_index] or "?").strip()
-            display = f"[{tag}] {name}".strip()
-            rows.append((display, gain))
-
-        if not rows:
-            scope = "Server 375 (All Alliances)" if filter_NVR else "All Servers"
-            await ctx.send(f"**🔻 Lowest {top_n} Merits Gained — {scope} (≥50M Power)!**\n`{previous.title}` → `{latest.title}`:\n_No eligible players found._")
-            return
-
-        # sort ascending by gain (lowest first), then name for stability
-        rows.sort(key=lambda x: (x[1], x[0]))
-        bottom = rows[:top_n]
-
-        lines = [f"{i+1}. `{name}` — 🧠 +{gain:,}" for i, (name, gain) in enumerate(bottom)]
-
-        scope = "NVR (S375)" if filter_NVR else "All"
-        header = f"**🔻 Lowest {top_n} Merits Gained — {scope} (≥50M Power)**\n`{previous.title}` → `{latest.title}`:\n"
-
-        chunk = header
-        chunks = []
-        for line in lines:
-            if len(chunk) + len(line) + 1 > 2000:
-                chunks.append(chunk.rstrip())
-                chunk = "(cont.)\n"
-            chunk += line + "\n"
-        if chunk.strip():
-            chunks.append(chunk.rstrip())
-
-        for ch in chunks:
-            try:
-                await ctx.send(ch)
-            except discord.HTTPException as e:
-                if getattr(e, "code", None) == 50035 or getattr(e, "status", None) == 400:
-                    await ctx.send("⚠️ Character limit reached — result was too long (2000 chars). Try a smaller N.")
-                    return
-                if getattr(e, "status", None) == 429:
-                    await ctx.send("⏳ Rate limited. Try again in a moment.")
-                    return
-                await ctx.send(f"❌ Discord error: {e}")
-                return
-
-    except Exception as e:
-        await ctx.send(f"❌ Error: {e}")
-
-@bot.command()
-async def allmana(ctx, season: str = DEFAULT_SEASON):
-    """Shows the total mana gathered by the entire alliance and its dollar value."""
-    async with ctx.typing():
-        
-        if ctx.channel.id not in ALLOWED_COMMAND_CHANNEL_ID:
-            # This creates a nicely formatted string of clickable channel links for the error message
-            channels_mentions = ", ".join([f"<#{channel_id}>" for channel_id in ALLOWED_COMMAND_CHANNEL_ID])
-            await ctx.send(f"❌ Commands are only allowed in {channels_mentions}.")
-            return
-    try:
-        season = season.lower()
-        sheet_name = SEASON_SHEETS.get(season)
-        if not sheet_name:
-            await ctx.send(f"❌ Invalid season. Options: {', '.join(SEASON_SHEETS.keys())}")
-            return
-
-        tabs = await asyncio.to_thread(client.open(sheet_name).worksheets)
-        if len(tabs) < 2:
-            await ctx.send("❌ Need at least two tabs to calculate gain.")
-            return
-
-        latest = tabs[-1]
-        previous = tabs[-2]
-        
-        data_latest = latest.get_all_values()
-        data_prev = previous.get_all_values()
-        headers = data_latest[0]
-
-        # Find the Mana column (Change "S" to your actual column letter if different)
-        def col_to_idx(col):
-            return sum((ord(c) - 64) * 26**i for i, c in enumerate(reversed(col.upper()))) - 1
-            
-        id_idx = headers.index("lord_id")
-        mana_idx = col_to_idx("AA")
-        serv_idx = col_to_idx("F")
-
-        # Map previous data for quick lookup
-        prev_map = {row[id_idx]: row[mana_idx] for row in data_prev[1:] if len(row) > mana_idx}
-
-        total_mana_gain = 0
-        player_count = 0
-
-        for row in data_latest[1:]:
-            # 1. Basic length check
-            if len(row) <= mana_idx or len(row) <= serv_idx: 
-                continue
-            
-            # 2. STRICT LATEST SERVER FILTER: Only proceed if they are 375 NOW
-            server_val = str(row[serv_idx]).strip()
-            if server_val != "375":
-                continue
-
-            lid = row[id_idx].strip()
-            
-            # 3. GAIN CALCULATION
-            # If they were in the previous sheet, we subtract. 
-            # If they are new to the alliance, we count their gain as 0 (to be safe)
-            if lid in prev_map:
-                try:
-                    curr_mana = int(str(row[mana_idx]).replace(",", "").strip() or 0)
-                    old_mana = int(str(prev_map[lid]).replace(",", "").strip() or 0)
-                    
-                    gain = curr_mana - old_mana
-                    if gain > 0:
-                        total_mana_gain += gain
-                        player_count += 1
-                except ValueError:
-                    continue
-
-        # Calculate Dollar Value ($100 per 250M)
-        total_value = round((total_mana_gain / 250_000_000) * 100)
-
-        # Build the Embed
-        embed = discord.Embed(
-            title=f"🏰 Alliance Mana Report: {season.upper()}",
-            description=f"Gain From **{previous.title}** to **{latest.title}**",
-            color=discord.Color.blue()
-        )
-        
-        embed.add_field(name="💧 Total Mana Gathered", value=f"**{total_mana_gain:,}**", inline=False)
-        embed.add_field(
-            name="💰 Value", 
-            value=f"The alliance gathered mana worth **{total_value:,}$**", 
-            inline=False
-        )
-        
-        await ctx.send(embed=embed)
-
-    except Exception as e:
-        await ctx.send(f"❌ Error calculating alliance mana: {e}")
-
-@bot.command()
-async def topdeads(ctx, *args):
-    """
-    Usage examples:
-      !topdeads                         -> Top 10 overall, default season
-      !topdeads 25                     -> Top 25 overall
-      !topdeads sos5                   -> Top 10 for season 'sos5'
-      !topdeads sos5 25                -> Top 25 for season 'sos5'
-      !topdeads NVR 50                 -> Top 50 for NVR on Server 375 (your alliance)
-      !topdeads NVR sos5 30            -> NVR+S375, season 'sos5', top 30
-      !topdeads all 50                 -> Explicitly remove NVR filter and show top 50
-    """
-    async with ctx.typing():
-        
-        if ctx.channel.id not in ALLOWED_COMMAND_CHANNEL_ID:
-            # This creates a nicely formatted string of clickable channel links for the error message
-            channels_mentions = ", ".join([f"<#{channel_id}>" for channel_id in ALLOWED_COMMAND_CHANNEL_ID])
-            await ctx.send(f"❌ Commands are only allowed in {channels_mentions}.")
-            return
-
-    # Defaults
-    top_n = 10
-    season = DEFAULT_SEASON
-    filter_NVR = False  # toggle for [NVR*] + server 375
-
-    # --- Parse args in any order ---
-    # digits -> top_n
-    # season key -> season
-    # 'NVR' -> filter to NVR on server 375
-    # 'all' or '*' -> remove NVR filter explicitly
-    for arg in args:
-        a = str(arg).strip().lower()
-        if a.isdigit():
-            top_n = max(1, min(100, int(a)))  # clamp a bit
-            continue
-        if a in ("NVR", "NVR375", "nvr"):
-            filter_NVR = True
-            continue
-        if a in ("all", "*"):
-            filter_NVR = False
-            continue
-        # season?
-        if a in SEASON_SHEETS:
-            season = a
-            continue
-        # Unknown token -> treat as invalid season token for clarity
-        await ctx.send(f"❌ Invalid argument '{arg}'. Seasons: {', '.join(SEASON_SHEETS.keys())} | Filters: 'NVR', 'all'.")
-        return
-
-    try:
-        sheet_name = SEASON_SHEETS.get(season.lower())
-        if not sheet_name:
-            await ctx.send(f"❌ Invalid season. Available: {', '.join(SEASON_SHEETS.keys())}")
-            return
-
-        tabs = await asyncio.to_thread(client.open(sheet_name).worksheets)
-        if len(tabs) < 2:
-            await ctx.send("❌ Not enough sheets to compare.")
-            return
-
-        latest = tabs[-1]
-        previous = tabs[-2]
-
-        data_latest = latest.get_all_values()
-        data_prev = previous.get_all_values()
-        if not data_latest or not data_prev:
-            await ctx.send("❌ Sheet data is empty.")
-            return
-
-        headers = data_latest[0]
-
-        # Column indices (prefer header lookups where possible)
-        id_index = headers.index("lord_id")      if "lord_id"      in headers else 0
-        name_index = 1                           # Column B (Name)
-        alliance_index = 3                       # Column D (Alliance/tag)
-        power_index = 12                         # Column M (Power)
-        dead_index = 17                          # Column R (Deads total)
-        server_idx = headers.index("home_server") if "home_server" in headers else 5  # Column F fallback
-
-        def to_int(val):
-            try:
-                return int(str(val).replace(",", "").replace("-", "").strip())
-            except:
-                return 0
-
-        # Build previous map: lord_id -> deads_then
-        prev_map = {}
-        for row in data_prev[1:]:
-            if len(row) > dead_index and len(row) > id_index:
-                raw_id = (row[id_index] or "").strip()
-                if raw_id:
-                    prev_map[raw_id] = to_int(row[dead_index])
-
-        # Collect gains (only players present in both sheets, ≥25M power, optional NVR+S375 filter)
-        results = []
-        for row in data_latest[1:]:
-            if len(row) <= max(dead_index, power_index, alliance_index, server_idx, id_index):
-                continue
-
-            raw_id = (row[id_index] or "").strip()
-            if not raw_id or raw_id not in prev_map:
-                continue
-
-            power = to_int(row[power_index])
-            if power < 25_000_000:
-                continue
-
-            alliance = (row[alliance_index] or "").strip()
-           # ... (Inside your data_latest loop)
-            if filter_NVR:
-                # We only check the server ID, ignoring the alliance tag entirely
-                server_val = str(row[server_idx] or "").strip()
-                
-                # If the server isn't 375, skip this player
-                # Note: We use "375" because sheets often store numbers as strings
-                if server_val != "375":
-                    continue
-                    
-            dead_now = to_int(row[dead_index])
-            dead_then = prev_map.get(raw_id, 0)
-            gain = dead_now - dead_then
-            if gain < 0:
-                # Guard against sheet corrections; treat negatives as zero gain
-                gain = 0
-
-            name = (row[name_index] or "?").strip()
-            full_name = f"[{alliance}] {name}"
-            results.append((full_name, gain))
-
-        if not results:
-            scope = "Server 375 (All Alliances)" if filter_NVR else "All Servers"
-            await ctx.send(f"**🏆 Top {top_n} Dead Units Gained — {scope}**\n`{previous.title}` → `{latest.title}`:\n_No eligible players found (≥25M power and present in both sheets)._")
-            return
-
-        # Sort and slice
-        results.sort(key=lambda x: x[1], reverse=True)
-        top_rows = results[:top_n]
-
-        # Build lines
-        lines = [f"{i+1}. `{name}` — 💀 +{gain:,}" for i, (name, gain) in enumerate(top_rows)]
-
-        # Header + chunked send (<=2000 chars)
-        scope = "NVR (S375)" if filter_NVR else "All"
-        header = f"**🏆 Top {top_n} Dead Units Gained — {scope}**\n`{previous.title}` → `{latest.title}`:\n"
-
-        chunk = header
-        chunks = []
-        for line in lines:
-            if len(chunk) + len(line) + 1 > 2000:
-                chunks.append(chunk.rstrip())
-                chunk = "(cont.)\n"
-            chunk += line + "\n"
-        if chunk.strip():
-            chunks.append(chunk.rstrip())
-
-        # Send chunks with friendly errors
-        for ch in chunks:
-            try:
-                await ctx.send(ch)
-            except discord.HTTPException as e:
-                if getattr(e, "code", None) == 50035 or getattr(e, "status", None) == 400:
-                    await ctx.send("⚠️ Character limit reached — result was too long for Discord (2000 chars). Try a smaller N.")
-                    return
-                if getattr(e, "status", None) == 429:
-                    await ctx.send("⏳ Rate limited. Try again in a moment.")
-                    return
-                await ctx.send(f"❌ Discord error: {e}")
-                return
-
-    except Exception as e:
-        await ctx.send(f"❌ Error: {e}")
-
-@bot.command(aliases=['checkfarm', 'farm'])
-async def farmcheck(ctx, farm_id: str):
-    async with ctx.typing():
-        
-        # 1. Channel Restriction Check
+        # 1. Channel Restriction Check
         if ctx.channel.id not in ALLOWED_COMMAND_CHANNEL_ID:
             channels_mentions = ", ".join([f"<#{channel_id}>" for channel_id in ALLOWED_COMMAND_CHANNEL_ID])
             await ctx.send(f"❌ Commands are only allowed in {channels_mentions}.")
@@ -2123,38 +1080,22 @@ async def farmcheck(ctx, farm_id: str):
                 return
 
             # 3. Fetch Data Asynchronously
-            tabs = await asyncio.to_thread(client.open(sheet_name).worksheets)
+            tabs = await open_scan_tabs(sheet_name)
             if not tabs:
                 await ctx.send("❌ No worksheets found in the NVR Farms sheet.")
                 return
 
             latest = tabs[-1]
-            data = await asyncio.to_thread(latest.get_all_values)
-            if not data:
+            # 4. Only the "ID" (Col A) and "Whos Farm" (Col B) columns are needed
+            snap, = await load_tabs("farms", [latest], ["id", "whos farm"])
+            if not len(snap):
                 await ctx.send("❌ The worksheet is empty.")
                 return
 
-            headers = [str(h).strip().lower() for h in data[0]]
-
-            # 4. Find Column Indexes ("ID" in Col A, "Whos Farm" in Col B)
-            try:
-                id_idx = headers.index("id")
-            except ValueError:
-                id_idx = 0  # Fallback to Column A
-
-            try:
-                owner_idx = headers.index("whos farm")
-            except ValueError:
-                owner_idx = 1  # Fallback to Column B
-
-            # 5. Search for the Farm ID in Column A
+            # 5. Look up the Farm ID (Column A is the tab's row key)
             search_id = farm_id.strip()
-            found_owner = None
-
-            for row in data[1:]:
-                if len(row) > id_idx and row[id_idx].strip() == search_id:
-                    found_owner = row[owner_idx].strip() if len(row) > owner_idx else "Unknown Owner"
-                    break
+            row = snap.row(search_id, "whos farm")
+            found_owner = row[0] if row is not None else None
 
             # 6. Build & Send Embed Response
             if found_owner is not None:
@@ -2180,146 +1121,6 @@ async def farmcheck(ctx, farm_id: str):
         except Exception as e:
             await ctx.send(f"❌ Error: {e}")
 
-async def generate_375_leaderboard(ctx, stat_name, embed_title, is_top=True, limit=10):
-    """Helper function to generate Top/Bottom leaderboards for Server 375 with multi-message support."""
-    # Cap limit between 1 and 100
-    limit = min(max(limit, 1), 100)
-
-    async with ctx.typing():
-        if ctx.channel.id not in ALLOWED_COMMAND_CHANNEL_ID:
-            channels_mentions = ", ".join([f"<#{c}>" for c in ALLOWED_COMMAND_CHANNEL_ID])
-            await ctx.send(f"❌ Commands are only allowed in {channels_mentions}.")
-            return
-
-        try:
-            # 1. Fetch Data
-            sheet_375 = await asyncio.to_thread(client.open, SERVER_375_SHEET)
-            ws_375 = sheet_375.sheet1
-            data_375 = await asyncio.to_thread(ws_375.get_all_values)
-
-            headers = data_375[0]
-            name_col = headers.index("Character Name")
-            power_col = headers.index("Historical Highest Power")
-            stat_col = headers.index(stat_name)
-
-            def to_int_local(v):
-                try:
-                    return int(str(v).replace(",", "").strip()) if v not in ("-", "") else 0
-                except:
-                    return 0
-
-            # 2. Filter for Accounts >= 50M Power
-            valid_players = []
-            for row in data_375[1:]:
-                if len(row) > max(power_col, stat_col):
-                    power = to_int_local(row[power_col])
-                    if power >= 50000000:
-                        val = to_int_local(row[stat_col])
-                        valid_players.append((row[name_col], val))
-
-            # 3. Sort list
-            valid_players.sort(key=lambda x: x[1], reverse=is_top)
-
-            # 4. Slice requested amount
-            sliced_players = valid_players[:limit]
-            
-            if not sliced_players:
-                await ctx.send("❌ No matching players found.")
-                return
-
-            # 5. Chunk players into groups of 50 to fit inside separate messages
-            chunk_size = 50
-            chunks = [sliced_players[i:i + chunk_size] for i in range(0, len(sliced_players), chunk_size)]
-
-            direction = "Top" if is_top else "Bottom"
-            color = discord.Color.gold() if is_top else discord.Color.red()
-
-            # 6. Send each chunk as its own embed message
-            for index, chunk in enumerate(chunks):
-                start_rank = (index * chunk_size) + 1
-                end_rank = start_rank + len(chunk) - 1
-
-                desc = ""
-                for i, (p_name, p_val) in enumerate(chunk, start_rank):
-                    desc += f"**{i}.** {p_name} — `{p_val:,}`\n"
-
-                # Subtitle indicates range (e.g. "Top 100 (1-50)" and "Top 100 (51-100)")
-                chunk_title = f"{embed_title} ({direction} {len(sliced_players)} — #{start_rank} to #{end_rank})"
-                
-                embed = discord.Embed(title=chunk_title, description=desc, color=color)
-                
-                # Footer on the last chunk
-                if index == len(chunks) - 1:
-                    embed.set_footer(text="Filtered for accounts ≥ 50M Highest Power")
-
-                await ctx.send(embed=embed)
-
-        except Exception as e:
-            await ctx.send(f"❌ Error loading leaderboard: {e}")
-
-# --- INFANTRY ---
-@bot.command(aliases=['topinfantry'])
-async def topinf(ctx, amount: int = 10):
-    await generate_375_leaderboard(ctx, "Infantry Only", "⚔️ Infantry Merits", is_top=True, limit=amount)
-
-@bot.command(aliases=['lowinfantry'])
-async def lowinf(ctx, amount: int = 10):
-    await generate_375_leaderboard(ctx, "Infantry Only", "⚔️ Infantry Merits", is_top=False, limit=amount)
-
-# --- CAVALRY ---
-@bot.command(aliases=['topcavalry'])
-async def topcav(ctx, amount: int = 10):
-    await generate_375_leaderboard(ctx, "Cavalry Only", "🐎 Cavalry Merits", is_top=True, limit=amount)
-
-@bot.command(aliases=['lowcavalry'])
-async def lowcav(ctx, amount: int = 10):
-    await generate_375_leaderboard(ctx, "Cavalry Only", "🐎 Cavalry Merits", is_top=False, limit=amount)
-
-# --- ARCHER ---
-@bot.command(aliases=['topmarksman', 'toparchers'])
-async def toparcher(ctx, amount: int = 10):
-    await generate_375_leaderboard(ctx, "Marksman Only", "🏹 Archer Merits", is_top=True, limit=amount)
-
-@bot.command(aliases=['lowmarksman', 'lowarchers'])
-async def lowarcher(ctx, amount: int = 10):
-    await generate_375_leaderboard(ctx, "Marksman Only", "🏹 Archer Merits", is_top=False, limit=amount)
-
-# --- MAGE ---
-@bot.command(aliases=['topmagic', 'topmages'])
-async def topmage(ctx, amount: int = 10):
-    await generate_375_leaderboard(ctx, "Magic Only", "🪄 Magic Merits", is_top=True, limit=amount)
-
-@bot.command(aliases=['lowmagic', 'lowmages'])
-async def lowmage(ctx, amount: int = 10):
-    await generate_375_leaderboard(ctx, "Magic Only", "🪄 Magic Merits", is_top=False, limit=amount)
-
-# --- HEALING ---
-@bot.command(aliases=['toprsshealing', 'toprssheals'])
-async def toprssheal(ctx, amount: int = 10):
-    await generate_375_leaderboard(ctx, "Healing (T4/T5)", "❤️ RSS Healing", is_top=True, limit=amount)
-
-@bot.command(aliases=['lowrsshealing', 'lowrssheals'])
-async def lowrssheal(ctx, amount: int = 10):
-    await generate_375_leaderboard(ctx, "Healing (T4/T5)", "❤️ RSS Healing", is_top=False, limit=amount)
-
-# --- BUILD TIME ---
-@bot.command(aliases=['topbuildtime'])
-async def topbuild(ctx, amount: int = 10):
-    await generate_375_leaderboard(ctx, "Build Time", "🔨 Build Time", is_top=True, limit=amount)
-
-@bot.command(aliases=['lowbuildtime'])
-async def lowbuild(ctx, amount: int = 10):
-    await generate_375_leaderboard(ctx, "Build Time", "🔨 Build Time", is_top=False, limit=amount)
-
-# --- DESTRUCTION TIME ---
-@bot.command(aliases=['topdestruction', 'topdestruct'])
-async def topdest(ctx, amount: int = 10):
-    await generate_375_leaderboard(ctx, "Destruction Time", "🧨 Destruction", is_top=True, limit=amount)
-
-@bot.command(aliases=['lowdestruction', 'lowdestruct'])
-async def lowdest(ctx, amount: int = 10):
-    await generate_375_leaderboard(ctx, "Destruction Time", "🧨 Destruction", is_top=False, limit=amount)
-
 @bot.command(aliases=['stats'])
 async def progress(ctx, lord_id: str, season: str = DEFAULT_SEASON):
     async with ctx.typing():
@@ -2336,7 +1137,15 @@ async def progress(ctx, lord_id: str, season: str = DEFAULT_SEASON):
             await ctx.send(f"❌ Invalid season. Options: {', '.join(SEASON_SHEETS.keys())}")
             return
 
-        tabs = await asyncio.to_thread(client.open(sheet_name).worksheets)
+        # Server 375 stats are needed for 375 players; download them alongside the season tabs
+        COLUMNS_375 = [
+            "Character ID", "Historical Highest Power",
+            "Infantry Only", "Cavalry Only", "Marksman Only", "Magic Only",
+            "Healing (T4/T5)", "Build Time", "Destruction Time",
+        ]
+        fetch_375 = prefetch(get_375_snapshot(COLUMNS_375))
+
+        tabs = await open_scan_tabs(sheet_name)
         if len(tabs) < 2:
             await ctx.send("❌ Not enough sheets to compare.")
             return
@@ -2344,178 +1153,73 @@ async def progress(ctx, lord_id: str, season: str = DEFAULT_SEASON):
         latest = tabs[-1]
         previous = tabs[-2]
 
-        data_latest = latest.get_all_values()
-        data_prev = previous.get_all_values()
-        headers = data_latest[0]
-
-        def col_idx(col): return headers.index(col)
-
-        id_idx = col_idx("lord_id")
-        name_idx = 1
-        alliance_idx = 3
-        power_idx = headers.index("highest_power")
-        kills_idx = headers.index("units_killed")
-        dead_idx = headers.index("units_dead")
-        healed_idx = headers.index("units_healed")
-        gold_idx = headers.index("gold_spent")
-        wood_idx = headers.index("wood_spent")
-        ore_idx = headers.index("stone_spent")
-        mana_idx = headers.index("mana_spent")
-        t5_idx = headers.index("killcount_t5")
-        t4_idx = headers.index("killcount_t4")
-        t3_idx = headers.index("killcount_t3")
-        t2_idx = headers.index("killcount_t2")
-        t1_idx = headers.index("killcount_t1")
-        gold_gathered_idx = headers.index("gold")
-        wood_gathered_idx = headers.index("wood")
-        ore_gathered_idx = headers.index("ore")
-        mana_gathered_idx = headers.index("mana")
-        home_server_idx = headers.index("home_server")
-        merit_idx = headers.index("merits")  # L
-
-        def idx_any(*names):
-            for n in names:
-                if n in headers:
-                    return headers.index(n)
-            raise ValueError(f"Missing column; tried: {names}")
-        
-        def to_int(v):
-            try:
-                return int(v.replace(",", "").strip()) if v not in ("-", "") else 0
-            except:
-                return 0
-
-        def find_row(data):
-            for row in data[1:]:
-                if row[id_idx] == lord_id:
-                    return row
-            return None
+        columns = [
+            "lord_id", "name", "alliance", "home_server", "highest_power", "merits",
+            "units_killed", "units_dead", "units_healed",
+            "gold_spent", "wood_spent", "stone_spent", "mana_spent",
+            "killcount_t5", "killcount_t4", "killcount_t3", "killcount_t2", "killcount_t1",
+            "gold", "wood", "ore", "mana",
+        ]
+        snap_prev, snap_latest = await load_tabs(season, [previous, latest], columns)
+        frame = gain_frame(snap_prev, snap_latest)
 
-        row_latest = find_row(data_latest)
-        row_prev = find_row(data_prev)
+        row_latest = snap_latest.row(lord_id, *columns)
+        row_prev = snap_prev.row(lord_id, *columns)
 
         if not row_latest or not row_prev:
             await ctx.send("❌ Lord ID not found in both sheets. That's likely because you recently migrated in and don't show up in the first scan at the start of the season because of that.")
             return
 
-        name = row_latest[name_idx]
-        alliance = row_latest[alliance_idx]
-        player_server = str(row_latest[home_server_idx]).strip() # Define player server for global use
-        power_gain = to_int(row_latest[power_idx]) - to_int(row_prev[power_idx])
-        power_latest = to_int(row_latest[power_idx])
-        merit_latest = to_int(row_latest[merit_idx])
-        merit_ratio = (merit_latest / to_int(row_latest[power_idx]) * 100) if to_int(row_latest[power_idx]) > 0 else 0
-        kills_gain = to_int(row_latest[kills_idx]) - to_int(row_prev[kills_idx])
-        dead_gain = to_int(row_latest[dead_idx]) - to_int(row_prev[dead_idx])
-        healed_gain = to_int(row_latest[healed_idx]) - to_int(row_prev[healed_idx])
-        gold = to_int(row_latest[gold_idx]) - to_int(row_prev[gold_idx])
-        wood = to_int(row_latest[wood_idx]) - to_int(row_prev[wood_idx])
-        ore = to_int(row_latest[ore_idx]) - to_int(row_prev[ore_idx])
-        mana = to_int(row_latest[mana_idx]) - to_int(row_prev[mana_idx])
+        row_latest = dict(zip(columns, row_latest))
+        row_prev = dict(zip(columns, row_prev))
+
+        name = row_latest["name"]
+        alliance = row_latest["alliance"]
+        player_server = str(row_latest["home_server"]).strip() # Define player server for global use
+        power_gain = row_latest["highest_power"] - row_prev["highest_power"]
+        power_latest = row_latest["highest_power"]
+        merit_latest = row_latest["merits"]
+        merit_ratio = (merit_latest / row_latest["highest_power"] * 100) if row_latest["highest_power"] > 0 else 0
+        kills_gain = row_latest["units_killed"] - row_prev["units_killed"]
+        dead_gain = row_latest["units_dead"] - row_prev["units_dead"]
+        healed_gain = row_latest["units_healed"] - row_prev["units_healed"]
+        gold = row_latest["gold_spent"] - row_prev["gold_spent"]
+        wood = row_latest["wood_spent"] - row_prev["wood_spent"]
+        ore = row_latest["stone_spent"] - row_prev["stone_spent"]
+        mana = row_latest["mana_spent"] - row_prev["mana_spent"]
         total_rss = gold + wood + ore + mana
-        gold_gathered = to_int(row_latest[gold_gathered_idx]) - to_int(row_prev[gold_gathered_idx])
-        wood_gathered = to_int(row_latest[wood_gathered_idx]) - to_int(row_prev[wood_gathered_idx])
-        ore_gathered = to_int(row_latest[ore_gathered_idx]) - to_int(row_prev[ore_gathered_idx])
-        mana_gathered = to_int(row_latest[mana_gathered_idx]) - to_int(row_prev[mana_gathered_idx])
+        gold_gathered = row_latest["gold"] - row_prev["gold"]
+        wood_gathered = row_latest["wood"] - row_prev["wood"]
+        ore_gathered = row_latest["ore"] - row_prev["ore"]
+        mana_gathered = row_latest["mana"] - row_prev["mana"]
         total_gathered = gold_gathered + wood_gathered + ore_gathered + mana_gathered
 
-        # Create lookup from previous sheet
-        prev_map = {row[id_idx]: row for row in data_prev[1:] if len(row) > mana_idx and row[id_idx].strip()}
-
-        def get_merit_ratio_rank():
-            ratios = []
-            for row in data_latest[1:]:
-                if len(row) <= max(merit_idx, power_idx, home_server_idx):
-                    continue
-                if str(row[home_server_idx]).strip() != player_server:
-                    continue
-                p_power = to_int(row[power_idx])
-                if p_power <= 0:
-                    continue
-                p_merit = to_int(row[merit_idx])
-                p_ratio = (p_merit / p_power) * 100
-                ratios.append((row[id_idx], p_ratio))
-
-            ratios.sort(key=lambda x: x[1], reverse=True)
-            for rank, (lid, _) in enumerate(ratios, 1):
-                if lid == lord_id:
-                    return rank
-            return None
-        
-        rank_merit_ratio = get_merit_ratio_rank()
-
-        # New helper to rank total cumulative stats (instead of gains)
-        def get_total_rank(col_index):
-            totals = []
-            for row in data_latest[1:]:
-                if len(row) <= max(col_index, home_server_idx):
-                    continue
-                if str(row[home_server_idx]).strip() != player_server:
-                    continue
-                
-                lid_current = str(row[id_idx]).strip()
-                if not lid_current:
-                    continue
-                
-                val = to_int(row[col_index])
-                totals.append((lid_current, val))
-                
-            totals.sort(key=lambda x: x[1], reverse=True)
-            for rank, (lid_curr, _) in enumerate(totals, 1):
-                if lid_curr == str(lord_id):
-                    return rank
-            return None
-
-        rank_total_merit = get_total_rank(merit_idx)
+        # Ranks among players of the same server; each table is sorted once per scan and shared
+        rank_merit_ratio = snap_latest.ratio_rank_index("merits", "highest_power", player_server).rank(lord_id)
+        rank_total_merit = snap_latest.rank_index("merits", player_server).rank(lord_id)
         
-        def get_rank(col_index):
-            player_row = next((r for r in data_latest[1:] if r[id_idx].strip() == lord_id), None)
-            if not player_row or len(player_row) <= home_server_idx:
-                return None
-
+        def get_rank(col):
             if not player_server:
                 return None
-
-            gains = []
-            for row in data_latest[1:]:
-                if len(row) <= col_index or len(row) <= home_server_idx:
-                    continue
-                if str(row[home_server_idx]).strip() != player_server:
-                    continue
-
-                lid = row[id_idx].strip()
-                prev_row = prev_map.get(lid)
-                if not prev_row:
-                    continue
-
-                val = to_int(row[col_index]) - to_int(prev_row[col_index])
-                gains.append((lid, val))
-
-            gains.sort(key=lambda x: x[1], reverse=True)
-
-            for rank, (lid, _) in enumerate(gains, 1):
-                if lid == lord_id:
-                    return rank
-
-            return None
-
-        rank_power = get_rank(power_idx)
-        rank_kills = get_rank(kills_idx)
-        rank_dead = get_rank(dead_idx)
-        rank_healed = get_rank(healed_idx)
-        rank_merit = get_rank(merit_idx)
-
-        t5_total = to_int(row_latest[t5_idx])
-        t4_total = to_int(row_latest[t4_idx])
-        t3_total = to_int(row_latest[t3_idx])
-        t2_total = to_int(row_latest[t2_idx])
-        t1_total = to_int(row_latest[t1_idx])
-
-        t5_gain = t5_total - to_int(row_prev[t5_idx])
-        t4_gain = t4_total - to_int(row_prev[t4_idx])
-        t3_gain = t3_total - to_int(row_prev[t3_idx])
-        t2_gain = t2_total - to_int(row_prev[t2_idx])
-        t1_gain = t1_total - to_int(row_prev[t1_idx])
+            return frame.rank_index(col, player_server).rank(lord_id)
+
+        rank_power = get_rank("highest_power")
+        rank_kills = get_rank("units_killed")
+        rank_dead = get_rank("units_dead")
+        rank_healed = get_rank("units_healed")
+        rank_merit = get_rank("merits")
+
+        t5_total = row_latest["killcount_t5"]
+        t4_total = row_latest["killcount_t4"]
+        t3_total = row_latest["killcount_t3"]
+        t2_total = row_latest["killcount_t2"]
+        t1_total = row_latest["killcount_t1"]
+
+        t5_gain = t5_total - row_prev["killcount_t5"]
+        t4_gain = t4_total - row_prev["killcount_t4"]
+        t3_gain = t3_total - row_prev["killcount_t3"]
+        t2_gain = t2_total - row_prev["killcount_t2"]
+        t1_gain = t1_total - row_prev["killcount_t1"]
 
         embed = discord.Embed(title=f"📈 Progress Report for [{alliance}] {name} for season `{season.upper()}`", color=discord.Color.green())
         
@@ -2548,71 +1252,42 @@ async def progress(ctx, lord_id: str, season: str = DEFAULT_SEASON):
         # -------------------------------------------------------------
         if player_server == "375":
             try:
-                # 1. Open the Server 375 specific Google Sheet
-                sheet_375 = await asyncio.to_thread(client.open, SERVER_375_SHEET)
-                ws_375 = sheet_375.sheet1
-                data_375 = await asyncio.to_thread(ws_375.get_all_values)
-                
-                headers_375 = data_375[0]
-                
-                # 2. Dynamically find the column indexes
-                id_col = headers_375.index("Character ID")
-                hist_power_col = headers_375.index("Historical Highest Power") # <--- DEFINED HERE
-                inf_col = headers_375.index("Infantry Only")
-                cav_col = headers_375.index("Cavalry Only")
-                arch_col = headers_375.index("Marksman Only")
-                magic_col = headers_375.index("Magic Only")
-                heal_col = headers_375.index("Healing (T4/T5)")
-                build_col = headers_375.index("Build Time")
-                dest_col = headers_375.index("Destruction Time")
-
-                # 3. Filter the 375 data to ONLY include players with >= 50M Highest Power
-                server_375_data = []
-                player_row_375 = None
-                
-                for r in data_375[1:]:
-                    if len(r) > dest_col:
-                        r_id = str(r[id_col]).strip()
-                        
-                        # Only include if Historical Highest Power is at least 50,000,000
-                        if to_int(r[hist_power_col]) >= 50000000:
-                            server_375_data.append(r)
-                        
-                        # Always grab the requested player's stats to display them
-                        if r_id == str(lord_id):
-                            player_row_375 = r
-                            # Guarantee the player is in the ranking pool even if they are somehow under 50m
-                            if to_int(r[hist_power_col]) < 50000000:
-                                server_375_data.append(r)
-                
-                # 4. Helper function to calculate server rank for a specific column
-                def get_375_rank(col_index):
-                    # Sort server members descending based on the column value
-                    sorted_members = sorted(server_375_data, key=lambda x: to_int(x[col_index]), reverse=True)
-                    for rank, row in enumerate(sorted_members, 1):
-                        if str(row[id_col]).strip() == str(lord_id):
-                            return rank
-                    return None
-
-                # 5. If they exist in the 375 sheet, calculate ranks and inject the embed
+                # 1. Server 375 specific Google Sheet (prefetched above)
+                snap_375 = await fetch_375
+
+                # 2. Always grab the requested player's stats to display them
+                player_row_375 = snap_375.row(lord_id, *COLUMNS_375)
                 if player_row_375:
-                    inf_val = to_int(player_row_375[inf_col])
-                    cav_val = to_int(player_row_375[cav_col])
-                    arch_val = to_int(player_row_375[arch_col])
-                    magic_val = to_int(player_row_375[magic_col])
+                    player_row_375 = dict(zip(COLUMNS_375, player_row_375))
+
+                # 3. Server rank among accounts with >= 50M Highest Power (sorted once per 375 snapshot)
+                def get_375_rank(col):
+                    index = snap_375.rank_index(col, floor=("Historical Highest Power", 50000000))
+                    rank = index.rank(lord_id)
+                    if rank is None:
+                        # Players somehow under 50m are still ranked as if they were in the pool
+                        rank = index.rank_of_value(player_row_375[col])
+                    return rank
+
+                # 4. If they exist in the 375 sheet, calculate ranks and inject the embed
+                if player_row_375:
+                    inf_val = player_row_375["Infantry Only"]
+                    cav_val = player_row_375["Cavalry Only"]
+                    arch_val = player_row_375["Marksman Only"]
+                    magic_val = player_row_375["Magic Only"]
                     
-                    heal_val = to_int(player_row_375[heal_col])
-                    build_val = to_int(player_row_375[build_col])
-                    dest_val = to_int(player_row_375[dest_col])
+                    heal_val = player_row_375["Healing (T4/T5)"]
+                    build_val = player_row_375["Build Time"]
+                    dest_val = player_row_375["Destruction Time"]
 
                     # Field 1: Troop Merits
                     embed.add_field(
                         name="Troop Merits (Server Rank)",
                         value=(
-                            f"⚔️ **Infantry:** {inf_val:,} `(#{get_375_rank(inf_col)})`\n"
-                            f"🐎 **Cavalry:** {cav_val:,} `(#{get_375_rank(cav_col)})`\n"
-                            f"🏹 **Archer:** {arch_val:,} `(#{get_375_rank(arch_col)})`\n"
-                            f"🪄 **Magic:** {magic_val:,} `(#{get_375_rank(magic_col)})`"
+                            f"⚔️ **Infantry:** {inf_val:,} `(#{get_375_rank('Infantry Only')})`\n"
+                            f"🐎 **Cavalry:** {cav_val:,} `(#{get_375_rank('Cavalry Only')})`\n"
+                            f"🏹 **Archer:** {arch_val:,} `(#{get_375_rank('Marksman Only')})`\n"
+                            f"🪄 **Magic:** {magic_val:,} `(#{get_375_rank('Magic Only')})`"
                         ),
                         inline=True
                     )
@@ -2621,9 +1296,9 @@ async def progress(ctx, lord_id: str, season: str = DEFAULT_SEASON):
                     embed.add_field(
                         name="Utility (Server Rank)",
                         value=(
-                            f"❤️ **RSS Healing:** {heal_val:,} `(#{get_375_rank(heal_col)})`\n"
-                            f"🔨 **Build Time:** {build_val:,} `(#{get_375_rank(build_col)})`\n"
-                            f"🔨 **Destruction:** {dest_val:,} `(#{get_375_rank(dest_col)})`"
+                            f"❤️ **RSS Healing:** {heal_val:,} `(#{get_375_rank('Healing (T4/T5)')})`\n"
+                            f"🔨 **Build Time:** {build_val:,} `(#{get_375_rank('Build Time')})`\n"
+                            f"🔨 **Destruction:** {dest_val:,} `(#{get_375_rank('Destruction Time')})`"
                         ),
                         inline=True
                     )
@@ -2662,28 +1337,20 @@ async def matchups2(ctx, season: str = "test"):
         season = season.lower()
         sheet_name = SEASON_SHEETS.get(season, season)
 
-        tabs = await asyncio.to_thread(client.open(sheet_name).worksheets)
+        tabs = await open_scan_tabs(sheet_name)
         if len(tabs) < 2:
             await ctx.send("❌ Not enough sheets to compare.")
             return
 
         latest = tabs[-1]
         previous = tabs[-2]
-        data_latest = latest.get_all_values()
-        data_prev   = previous.get_all_values()
-        headers = data_latest[0]
-
-        # header lookups with safe fallback to known positions (0-based)
-        def find_idx(name, fallback):
-            return headers.index(name) if name in headers else fallback
-
-        def to_int(val):
-            try:
-                v = str(val).replace(',', '').replace(' ', '').strip()
-                if v in ("", "-"): return 0
-                return int(v)
-            except:
-                return 0
+        columns = [
+            "lord_id", "home_server", "units_dead", "units_healed",
+            "gold_spent", "wood_spent", "stone_spent", "mana_spent", "merits",
+            "killcount_t5", "killcount_t4", "killcount_t3", "killcount_t2", "killcount_t1",
+        ]
+        snap_prev, snap_latest = await load_tabs(season, [previous, latest], columns)
+        frame = gain_frame(snap_prev, snap_latest)
 
         def fmt_gain(n): return f"+{n:,}" if n > 0 else f"{n:,}"
         def format_title_with_dates(prev_name, latest_name):
@@ -2701,104 +1368,26 @@ async def matchups2(ctx, season: str = "test"):
         }
         matchups = [("375", "40"), ("99", "92"), ("249", "49")]
 
-        # indices
-        id_idx     = find_idx("lord_id",        0)
-        server_idx = find_idx("home_server",    5)
-        dead_idx   = find_idx("units_dead",     17)
-        heal_idx   = find_idx("units_healed",   18)
-        gold_idx   = find_idx("gold_spent",     31)
-        wood_idx   = find_idx("wood_spent",     32)
-        ore_idx    = find_idx("stone_spent",    33)
-        mana_idx   = find_idx("mana_spent",     34)
-        merits_idx = find_idx("merits (only 50m+ power)", 11)  # fallback near K/L if header missing
-
-        # tiers (AK..AO → 36..40 fallback)
-        t5_idx = find_idx("t5_kills", 36)
-        t4_idx = find_idx("t4_kills", 37)
-        t3_idx = find_idx("t3_kills", 38)
-        t2_idx = find_idx("t2_kills", 39)
-        t1_idx = find_idx("t1_kills", 40)
-
-        max_needed_idx = max(mana_idx, t1_idx, merits_idx)
-
-        # prev rows by lord_id (keep last occurrence)
-        prev_map = {
-            row[id_idx]: row for row in data_prev[1:]
-            if len(row) > max_needed_idx and row[id_idx]
+        # stat key -> per-server aggregate: totals are the latest tab's, "_gain" the change since the previous tab
+        stat_keys = {
+            "dead": "units_dead", "dead_gain": "units_dead_gain",
+            "healed": "units_healed", "healed_gain": "units_healed_gain",
+            "gold": "gold_spent_gain", "wood": "wood_spent_gain", "ore": "stone_spent_gain", "mana": "mana_spent_gain",
+            "merits": "merits", "merits_gain": "merits_gain",
+            "t5": "killcount_t5", "t5_gain": "killcount_t5_gain",
+            "t4": "killcount_t4", "t4_gain": "killcount_t4_gain",
+            "t3": "killcount_t3", "t3_gain": "killcount_t3_gain",
+            "t2": "killcount_t2", "t2_gain": "killcount_t2_gain",
+            "t1": "killcount_t1", "t1_gain": "killcount_t1_gain",
         }
 
-        # aggregate
-        stat_map = {s: {
-            "kills": 0, "kills_gain": 0,
-            "dead": 0,  "dead_gain": 0,
-            "healed": 0,"healed_gain": 0,
-            "gold": 0, "wood": 0, "ore": 0, "mana": 0,
-            "merits": 0, "merits_gain": 0,
-            "t5": 0, "t5_gain": 0,
-            "t4": 0, "t4_gain": 0,
-            "t3": 0, "t3_gain": 0,
-            "t2": 0, "t2_gain": 0,
-            "t1": 0, "t1_gain": 0,
-        } for s in SERVER_MAP}
-
-        for row in data_latest[1:]:
-            if len(row) <= max_needed_idx:
-                continue
-
-            # MUST exist in both sheets
-            lid = (row[id_idx] or "").strip()
-            prev_row = prev_map.get(lid)
-            if not lid or prev_row is None:
-                continue
-
-            # server (use latest, normalized to digits)
-            sid_raw = (row[server_idx] or "").strip()
-            sid = "".join(ch for ch in sid_raw if ch.isdigit())
-            if sid not in SERVER_MAP:
-                continue
-
-            # current
-            dead = to_int(row[dead_idx]);   heal = to_int(row[heal_idx])
-            gold = to_int(row[gold_idx]);   wood = to_int(row[wood_idx])
-            ore  = to_int(row[ore_idx]);    mana = to_int(row[mana_idx])
-            merits = to_int(row[merits_idx])
-            t5 = to_int(row[t5_idx]); t4 = to_int(row[t4_idx]); t3 = to_int(row[t3_idx])
-            t2 = to_int(row[t2_idx]); t1 = to_int(row[t1_idx])
-
-            # previous
-            dead_prev = to_int(prev_row[dead_idx]);   heal_prev = to_int(prev_row[heal_idx])
-            gold_prev = to_int(prev_row[gold_idx]);   wood_prev = to_int(prev_row[wood_idx])
-            ore_prev  = to_int(prev_row[ore_idx]);    mana_prev = to_int(prev_row[mana_idx])
-            merits_prev = to_int(prev_row[merits_idx])
-            t5_prev = to_int(prev_row[t5_idx]); t4_prev = to_int(prev_row[t4_idx]); t3_prev = to_int(prev_row[t3_idx])
-            t2_prev = to_int(prev_row[t2_idx]); t1_prev = to_int(prev_row[t1_idx])
-
-            s = stat_map[sid]
-            # totals (restricted to IDs present in both)
-            s["dead"]   += dead
-            s["healed"] += heal
-            s["merits"] += merits
-            s["t5"]     += t5; s["t4"] += t4; s["t3"] += t3; s["t2"] += t2; s["t1"] += t1
-            # deltas
-            s["dead_gain"]    += (dead   - dead_prev)
-            s["healed_gain"]  += (heal   - heal_prev)
-            s["gold"]         += (gold   - gold_prev)
-            s["wood"]         += (wood   - wood_prev)
-            s["ore"]          += (ore    - ore_prev)
-            s["mana"]         += (mana   - mana_prev)
-            s["merits_gain"]  += (merits - merits_prev)
-            s["t5_gain"]      += (t5 - t5_prev)
-            s["t4_gain"]      += (t4 - t4_prev)
-            s["t3_gain"]      += (t3 - t3_prev)
-            s["t2_gain"]      += (t2 - t2_prev)
-            s["t1_gain"]      += (t1 - t1_prev)
-
-        # derive kills from tiers so totals match breakdown
-        for sid, s in stat_map.items():
-            tier_total = s["t5"] + s["t4"] + s["t3"] + s["t2"] + s["t1"]
-            tier_gain  = s["t5_gain"] + s["t4_gain"] + s["t3_gain"] + s["t2_gain"] + s["t1_gain"]
-            s["kills"] = tier_total
-            s["kills_gain"] = tier_gain
+        def side_stats(team):
+            totals = frame.team_totals(team, columns[2:])
+            stats = {key: totals[agg] for key, agg in stat_keys.items()}
+            # derive kills from tiers so totals match breakdown
+            stats["kills"] = sum(stats[t] for t in ("t5", "t4", "t3", "t2", "t1"))
+            stats["kills_gain"] = sum(stats[t + "_gain"] for t in ("t5", "t4", "t3", "t2", "t1"))
+            return stats
 
         def format_side(name, stats):
             return (
@@ -2829,8 +1418,8 @@ async def matchups2(ctx, season: str = "test"):
         for a, b in matchups:
             name_a = f"{emoji_bracket(a)}{SERVER_MAP[a]}"
             name_b = f"{emoji_bracket(b)}{SERVER_MAP[b]}"
-            stats_a = stat_map[a]
-            stats_b = stat_map[b]
+            stats_a = side_stats((a,))
+            stats_b = side_stats((b,))
 
             block = (
                 f"{name_a} vs {name_b}\n\n"
@@ -2862,28 +1451,16 @@ async def matchups(ctx, season: str = DEFAULT_SEASON):
         season = season.lower()
         sheet_name = SEASON_SHEETS.get(season, season)
 
-        tabs = await asyncio.to_thread(client.open(sheet_name).worksheets)
+        tabs = await open_scan_tabs(sheet_name)
         if len(tabs) < 2:
             await ctx.send("❌ Not enough sheets to compare.")
             return
 
         latest = tabs[-1]
         previous = tabs[-2]
-        data_latest = latest.get_all_values()
-        data_prev   = previous.get_all_values()
-        headers = data_latest[0]
-
-        # header lookups with safe fallback to known positions (0-based)
-        def find_idx(name, fallback):
-            return headers.index(name) if name in headers else fallback
-
-        def to_int(val):
-            try:
-                v = str(val).replace(',', '').replace(' ', '').strip()
-                if v in ("", "-"): return 0
-                return int(v)
-            except:
-                return 0
+        columns = ["lord_id", "home_server", "units_killed", "merits", "units_dead", "units_healed"]
+        snap_prev, snap_latest = await load_tabs(season, [previous, latest], columns)
+        frame = gain_frame(snap_prev, snap_latest)
 
         def fmt_gain(n): return f"+{n:,}" if n > 0 else f"{n:,}"
         def format_title_with_dates(prev_name, latest_name):
@@ -2907,72 +1484,8 @@ async def matchups(ctx, season: str = DEFAULT_SEASON):
             (("17", "428"), ("110", "247")),           # 1v1
         ]
 
-        # indices
-        id_idx     = find_idx("lord_id",        0)
-        server_idx = find_idx("home_server",    5)
-        kills_idx  = find_idx("units_killed",   9)  # Column J is index 9
-        merits_idx = find_idx("merits (only 50m+ power)", 11) 
-        dead_idx   = find_idx("units_dead",     17)
-        heal_idx   = find_idx("units_healed",   18)
-
-        # max_needed_idx ensures we only process rows that have enough columns
-        max_needed_idx = max(heal_idx, kills_idx, merits_idx)
-
-        # prev rows by lord_id (keep last occurrence)
-        prev_map = {
-            row[id_idx]: row for row in data_prev[1:]
-            if len(row) > max_needed_idx and row[id_idx]
-        }
-
-        # aggregate
-        stat_map = {s: {
-            "kills": 0, "kills_gain": 0,
-            "dead": 0,  "dead_gain": 0,
-            "healed": 0,"healed_gain": 0,
-            "merits": 0, "merits_gain": 0
-        } for s in SERVER_MAP}
-
-        for row in data_latest[1:]:
-            if len(row) <= max_needed_idx:
-                continue
-
-            # MUST exist in both sheets
-            lid = (row[id_idx] or "").strip()
-            prev_row = prev_map.get(lid)
-            if not lid or prev_row is None:
-                continue
-
-            # server (use latest, normalized to digits)
-            sid_raw = (row[server_idx] or "").strip()
-            sid = "".join(ch for ch in sid_raw if ch.isdigit())
-            if sid not in SERVER_MAP:
-                continue
-
-            # current
-            kills  = to_int(row[kills_idx])
-            dead   = to_int(row[dead_idx])
-            heal   = to_int(row[heal_idx])
-            merits = to_int(row[merits_idx])
-
-            # previous
-            kills_prev  = to_int(prev_row[kills_idx])
-            dead_prev   = to_int(prev_row[dead_idx])
-            heal_prev   = to_int(prev_row[heal_idx])
-            merits_prev = to_int(prev_row[merits_idx])
-
-            s = stat_map[sid]
-            
-            # totals (restricted to IDs present in both)
-            s["kills"]  += kills
-            s["dead"]   += dead
-            s["healed"] += heal
-            s["merits"] += merits
-            
-            # deltas
-            s["kills_gain"]  += (kills  - kills_prev)
-            s["dead_gain"]   += (dead   - dead_prev)
-            s["healed_gain"] += (heal   - heal_prev)
-            s["merits_gain"] += (merits - merits_prev)
+        # stat key -> column; "_gain" keys are the change since the previous tab
+        stat_cols = {"kills": "units_killed", "dead": "units_dead", "healed": "units_healed", "merits": "merits"}
 
         def format_side(name, stats):
             return (
@@ -2986,16 +1499,13 @@ async def matchups(ctx, season: str = DEFAULT_SEASON):
             )
 
         def merge_stats(team_servers):
-            merged = {
-                "kills": 0, "kills_gain": 0,
-                "dead": 0, "dead_gain": 0,
-                "healed": 0, "healed_gain": 0,
-                "merits": 0, "merits_gain": 0
-            }
-            for server in team_servers:
-                for key in merged:
-                    merged[key] += stat_map[server][key]
-            return merged
+            # Multi-server teams add up the precomputed per-server aggregates
+            totals = frame.team_totals(team_servers, columns[2:])
+            stats = {}
+            for key, col in stat_cols.items():
+                stats[key] = totals[col]
+                stats[key + "_gain"] = totals[col + "_gain"]
+            return stats
 
         title = format_title_with_dates(previous.title, latest.title)
 
@@ -3047,17 +1557,62 @@ def role_check():
         return False
     return commands.check(predicate)
 
+@bot.command(aliases=['refreshstats'])
+@role_check()
+async def refreshcache(ctx, season: str = None):
+    """Drop cached scan tabs so the next command re-downloads them (e.g. after fixing a sheet by hand)."""
+    season = season.lower() if season else None
+    if season and season not in SEASON_SHEETS and season != SERVER_375_KEY:
+        await ctx.send(f"❌ Invalid season. Options: {', '.join(SEASON_SHEETS.keys())}, {SERVER_375_KEY}")
+        return
+    removed = snapshot_cache.invalidate(season)
+    stored = snapshot_store.remove(season)
+    invalidate_rosters()
+    scope = f"`{season}`" if season else "all seasons"
+    await ctx.send(f"🔄 Cleared {removed} cached tab(s) and {stored} stored tab(s) for {scope}.")
+
+@bot.command(aliases=['sheetsstatus'])
+@role_check()
+async def sheetstatus(ctx):
+    """Shows how busy the Google Sheets I/O pool is."""
+    io = sheets_io.stats()
+    quota = sheets_io.quota.stats()
+    cache = snapshot_cache.stats()
+    await ctx.send(
+        f"📡 **Sheets I/O** — workers: {io['workers']} | running: {io['running']} | "
+        f"queued: {io['queued']} (peak {io['peak_queued']}) | completed: {io['completed']:,}\n"
+        f"🚦 **Read quota** — {quota['used']}/{quota['budget']} in the last minute | waiting: {quota['waiting']} | "
+        f"429s: {quota['throttled']} | queued for {quota['waited']:.1f}s total (peak {quota['peak_wait']:.1f}s)\n"
+        f"🔗 **Coalesced reads** — {sheets_flight.coalesced:,} joined an in-flight download "
+        f"({sheets_flight.fetched:,} fetched, {len(sheets_flight)} in flight)\n"
+        f"📑 **Tab listings** — {len(spreadsheets)} spreadsheet(s) open | {spreadsheets.hits:,} reused, "
+        f"{spreadsheets.misses:,} fetched\n"
+        f"🗃️ **Snapshot cache** — {cache['tabs']} tab(s), ~{cache['bytes'] / 1_048_576:.1f} of "
+        f"{cache['budget'] / 1_048_576:.0f} MiB | pinned: {cache['pinned']} | hits: {cache['hits']:,} | "
+        f"misses: {cache['misses']:,} | evictions: {cache['evictions']:,}\n"
+        f"💾 **Snapshot store** — {snapshot_store.nbytes() / 1_048_576:.1f} MiB on disk | "
+        f"{snapshot_store.loaded:,} tab(s) loaded ({snapshot_store.mapped:,} memory-mapped), {snapshot_store.saved:,} saved"
+    )
+
 
 @bot.event
 async def on_ready():
-    await bot.load_extension("spydetect")
-    await bot.load_extension("dashboard")
-    print(f"✅ Bot is online as {bot.user}")
+    print(f"✅ Bot is online as {bot.user} ({time.perf_counter() - BOOT_STARTED:.2f}s after start)")
+
+async def connect_source():
+    start = time.perf_counter()
+    try:
+        await snapshot_source.connect()
+        print(f"🔑 Snapshot source ready in {time.perf_counter() - start:.2f}s")
+    except Exception as e:
+        print(f"Error connecting to the snapshot source: {e}")
+
+async def warm_cache():
+    # Parsed tabs of active seasons from the previous run (archived ones are mapped on demand)
+    start = time.perf_counter()
+    loaded = await snapshot_store.load_all(DEFAULT_SEASON)
+    print(f"💾 Loaded {loaded} stored tab(s) in {(time.perf_counter() - start) * 1000:.0f} ms")
 
-    # Start the UTC channel updater loop
-    if not update_utc_channels.is_running():
-        update_utc_channels.start()
-    
 @bot.command(aliases=['help', 'info', 'guide'])
 async def commands(ctx):
     async with ctx.typing():
@@ -3086,6 +1641,7 @@ You DONT need the [].
 - `!lowdeads` — Lowest dead units
 - `!topmerits [X]` — Top X by merits gain (optional season or alliance filter)
 - `!lowmerits [X]` — Bottom X by merits gain (optional season or alliance filter)
+- `!query <stat> [filters]` — Any stat, any filter. Example: `!query low merits gain alliance=NVR2 power>80m`
 
 **👑 Server 375 Leaderboards (≥ 50M Power)**
 *Optional limit `[amount]` up to 100 (default: 10). Example: `!topinf 50`*
@@ -0,0 +1,183 @@
+import operator
+import re
+from functools import lru_cache
+from typing import NamedTuple
+
+from leaderboards import select
+from snapshots import COLUMN_FALLBACKS, COLUMN_ALIASES, TEXT_COLUMNS
+
+# --- CONFIGURATION ---
+QUERY_DEFAULT_N = 10
+QUERY_MAX_N = 100
+
+# Short names officers type for stat columns.
+STAT_SHORTHANDS = {
+    "kills": "units_killed",
+    "killed": "units_killed",
+    "deads": "units_dead",
+    "dead": "units_dead",
+    "deaths": "units_dead",
+    "heals": "units_healed",
+    "healed": "units_healed",
+    "merit": "merits",
+    "hp": "highest_power",
+    "t5": "killcount_t5",
+    "t4": "killcount_t4",
+    "t3": "killcount_t3",
+    "t2": "killcount_t2",
+    "t1": "killcount_t1",
+    "server": "home_server",
+}
+
+QUERY_HELP = (
+    "Usage: `!query [top|low] [N] <stat> [gain|total] [filters...] [season]`\n"
+    "Filters: `alliance=NVR2`, `alliance=NVR*`, `server=249`, `power>=80m`, `<stat><op><value>` "
+    "(ops `= != > >= < <=`, values like `250k`, `80m`, `1.5b`).\n"
+    "Example: `!query low merits gain alliance=NVR2 power>80m` · `!query top 20 t5 server=249`"
+)
+
+OPS = {
+    ">=": operator.ge,
+    "<=": operator.le,
+    "!=": operator.ne,
+    "=": operator.eq,
+    ">": operator.gt,
+    "<": operator.lt,
+}
+FILTER_RE = re.compile(r"^([a-z0-9_]+)(>=|<=|!=|=|>|<)(.+)$")
+NUMBER_RE = re.compile(r"^(-?\d+(?:\.\d+)?)([kmb]?)$")
+SUFFIXES = {"": 1, "k": 1_000, "m": 1_000_000, "b": 1_000_000_000}
+
+
+class QueryError(ValueError):
+    """A !query that does not parse; the message says which token is wrong."""
+
+
+class QueryPlan(NamedTuple):
+    """A compiled query: what to rank, how, and which row filters to apply (column, op, value)."""
+    stat: str
+    gain: bool
+    descending: bool
+    k: int
+    season: str
+    filters: tuple
+
+    def columns(self):
+        """Columns to load; the first is the row key."""
+        names = ["lord_id", "name", "alliance", "home_server", "power", self.stat]
+        names += [col for col, _, _ in self.filters]
+        return list(dict.fromkeys(names))
+
+
+# --- COMPILATION ---
+def column_name(token):
+    """Logical column for a typed name, or None if it is not one."""
+    name = STAT_SHORTHANDS.get(token, token)
+    for logical, aliases in COLUMN_ALIASES.items():
+        if name in aliases:
+            return logical
+    if name in COLUMN_FALLBACKS or name in COLUMN_ALIASES:
+        return name
+    return None
+
+
+def parse_number(text):
+    match = NUMBER_RE.match(text)
+    if not match:
+        raise QueryError(f"'{text}' is not a number (use e.g. 250k, 80m, 1.5b)")
+    return int(float(match.group(1)) * SUFFIXES[match.group(2)])
+
+
+def normalize(text):
+    """Canonical query text: case, spacing and spaces around operators do not matter."""
+    text = re.sub(r"\s*(>=|<=|!=|=|>|<)\s*", r"\1", text.strip().lower())
+    return " ".join(text.split())
+
+
+@lru_cache(maxsize=256)
+def compile_query(text, seasons, default_season):
+    """
+    QueryPlan of a normalized query. Tokens may come in any order: top/low, a count,
+    gain/total, a season key, filters (column op value) and exactly one stat to rank by.
+    """
+    stat, gain, descending, k, season, filters = None, True, True, QUERY_DEFAULT_N, default_season, []
+    for token in text.split():
+        if token in ("top", "high", "highest"):
+            descending = True
+        elif token in ("low", "bottom", "lowest"):
+            descending = False
+        elif token in ("gain", "gains", "delta"):
+            gain = True
+        elif token in ("total", "totals", "now"):
+            gain = False
+        elif token.isdigit():
+            k = max(1, min(QUERY_MAX_N, int(token)))
+        elif token in seasons:
+            season = token
+        elif FILTER_RE.match(token):
+            filters.append(compile_filter(*FILTER_RE.match(token).groups()))
+        elif column_name(token) is not None and not stat:
+            stat = column_name(token)
+        else:
+            raise QueryError(f"Don't understand '{token}'.")
+    if stat is None:
+        raise QueryError("Say which stat to rank by (e.g. merits, kills, deads, t5, power).")
+    if stat in TEXT_COLUMNS:
+        raise QueryError(f"'{stat}' is text and cannot be ranked.")
+    return QueryPlan(stat, gain, descending, k, season, tuple(filters))
+
+
+def plan_query(text, seasons, default_season):
+    """(QueryPlan, True if it came from the plan cache) for raw query text; `seasons` is a frozenset of keys."""
+    hits = compile_query.cache_info().hits
+    plan = compile_query(normalize(text), seasons, default_season)
+    return plan, compile_query.cache_info().hits > hits
+
+
+def compile_filter(field, op, value):
+    """(column, op, value) with the value converted to the column's type."""
+    col = column_name(field)
+    if col is None:
+        raise QueryError(f"Unknown column '{field}'.")
+    if col in TEXT_COLUMNS:
+        if op not in ("=", "!="):
+            raise QueryError(f"'{field}' is text; use = or !=.")
+        return (col, op, value.upper())
+    return (col, op, parse_number(value))
+
+
+# --- EXECUTION ---
+def row_filter(column, op, value):
+    """Predicate on row positions for one filter; text compares case-insensitively, 'x*' is a prefix."""
+    if isinstance(value, str):
+        if value.endswith("*"):
+            prefix = value[:-1]
+            match = lambda i: column[i].upper().startswith(prefix)
+        else:
+            match = lambda i: column[i].upper() == value
+        return match if op == "=" else (lambda i: not match(i))
+    compare = OPS[op]
+    return lambda i: compare(column[i], value)
+
+
+def execute(plan, source):
+    """
+    (rows matched, [(row, value)]) of a plan over a GainFrame (gain plans) or Snapshot (totals).
+    Filters run one column at a time over the candidate rows; the top k come from a bounded heap.
+    """
+    keys = source.col("lord_id")
+    rows = [i for i in range(len(source)) if keys[i]]
+    for col, op, value in plan.filters:
+        keep = row_filter(source.col(col), op, value)
+        rows = [i for i in rows if keep(i)]
+    values = source.gain(plan.stat) if plan.gain else source.col(plan.stat)
+    chosen = select(values, source.col("name"), rows, plan.k, plan.descending)
+    return len(rows), [(i, values[i]) for i in chosen]
+
+
+def describe(plan):
+    """One-line reading of a plan, e.g. 'lowest 10 merits gain · alliance=NVR2 · power>80,000,000 · sos7'."""
+    parts = [f"{'top' if plan.descending else 'lowest'} {plan.k} {plan.stat} {'gain' if plan.gain else 'total'}"]
+    parts += [f"{col}{op}{value:,}" if isinstance(value, int) else f"{col}{op}{value}" for col, op, value in plan.filters]
+    parts.append(plan.season)
+    return " · ".join(parts)
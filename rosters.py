@@ -0,0 +1,152 @@
+import json
+import os
+import time
+import zlib
+from array import array
+from typing import NamedTuple
+
+from leaderboards import select
+from snapshots import parse_text, snapshot_cache, SNAPSHOT_TTL
+from sources import active_source
+
+# --- CONFIGURATION ---
+# Roster files: <ROSTER_DIR>/<name>.json = {"groups": {"Sun": ["lord id", ...], "Moon": [...]}}
+ROSTER_DIR = os.getenv("ROSTER_DIR", "rosters")
+# A tab with this title in a season sheet overrides the file (columns: lord id, group).
+ROSTER_TAB = "roster"
+ROSTER_ID_HEADERS = ("lord_id", "lord id", "id", "character id")
+ROSTER_GROUP_HEADERS = ("group", "team")
+# Seconds a roster tab is reused before it is read again (edits do not change its size, so nothing else tells).
+ROSTER_TAB_TTL = int(os.getenv("ROSTER_TAB_TTL", str(SNAPSHOT_TTL)))
+
+
+# --- ROSTERS ---
+class Roster:
+    """
+    Lord id -> group assignments. The version is a checksum of the assignments, so anything
+    indexed against a roster (see rows) is rebuilt exactly when the roster's content changes.
+    """
+
+    def __init__(self, name, assignments, origin):
+        self.name = name
+        self.origin = origin  # where it was loaded from, for footers and logs
+        self.groups = {}  # lord id -> group
+        for lord_id, group in assignments:
+            lord_id, group = parse_text(lord_id), parse_text(group)
+            if lord_id and group:
+                self.groups[lord_id] = group
+        self.group_names = list(dict.fromkeys(self.groups.values()))
+        canonical = "\n".join(f"{k}\t{g}" for k, g in sorted(self.groups.items()))
+        self.version = f"{zlib.crc32(canonical.encode('utf-8')):08x}"
+
+    def rows(self, source):
+        """
+        {group: row positions in `source`} (a Snapshot or GainFrame), in roster order.
+        Built once per (source, roster version) with one index lookup per rostered lord.
+        """
+        rows = source.group_rows.get(self.version)
+        if rows is None:
+            rows = {group: array("q") for group in self.group_names}
+            for lord_id, group in self.groups.items():
+                i = source.find(lord_id)
+                if i is not None:
+                    rows[group].append(i)
+            source.group_rows[self.version] = rows
+            snapshot_cache.grew(getattr(source, "latest", source))
+        return rows
+
+    def __len__(self):
+        return len(self.groups)
+
+
+def is_roster_tab(tab):
+    return tab.title.strip().lower() == ROSTER_TAB
+
+
+def scan_tabs(tabs):
+    """A season sheet's scan tabs, in order: every tab but a roster tab, wherever it was added."""
+    return [tab for tab in tabs if not is_roster_tab(tab)]
+
+
+_rosters = {}  # (name, path, size, mtime) of a roster file -> Roster
+_tab_rosters = {}  # (name, spreadsheet id, tab id) -> (monotonic time read, Roster)
+
+
+def _file_roster(name):
+    path = os.path.join(ROSTER_DIR, f"{name}.json")
+    stat = os.stat(path)
+    cache_key = (name, path, stat.st_size, stat.st_mtime_ns)
+    roster = _rosters.get(cache_key)
+    if roster is None:
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        assignments = [(lord_id, group) for group, ids in data["groups"].items() for lord_id in ids]
+        roster = _rosters[cache_key] = Roster(name, assignments, path)
+    return roster
+
+
+async def _tab_roster(name, tab, source):
+    cache_key = (name, tab.spreadsheet.id, tab.id)
+    read_at, roster = _tab_rosters.get(cache_key, (0.0, None))
+    if roster is None or time.monotonic() - read_at > ROSTER_TAB_TTL:
+        headers = [str(h).strip().lower() for h in (await source.read_headers([tab]))[0]]
+        positions = []
+        for wanted in (ROSTER_ID_HEADERS, ROSTER_GROUP_HEADERS):
+            found = [headers.index(h) for h in wanted if h in headers]
+            if not found:
+                raise ValueError(f"Roster tab '{tab.title}' needs one of the columns: {', '.join(wanted)}")
+            positions.append(found[0])
+        ids, groups = await source.read_columns([(tab, positions[0]), (tab, positions[1])])
+        fresh = Roster(name, zip(ids, groups), f"tab '{tab.title}'")
+        if roster is None or fresh.version != roster.version:
+            roster = fresh  # same content keeps the old object, and the row maps built for its version
+        _tab_rosters[cache_key] = (time.monotonic(), roster)
+    return roster
+
+
+async def load_roster(name, tabs=(), source=None):
+    """
+    Roster `name`: from the season sheet's roster tab if `tabs` has one, otherwise from its file.
+    A file is re-read when it changes, a tab every ROSTER_TAB_TTL seconds.
+    """
+    for tab in tabs:
+        if is_roster_tab(tab):
+            return await _tab_roster(name, tab, source or active_source())
+    return _file_roster(name)
+
+
+def invalidate_rosters():
+    """Forget loaded rosters so the next command reads them again."""
+    count = len(_rosters) + len(_tab_rosters)
+    _rosters.clear()
+    _tab_rosters.clear()
+    return count
+
+
+# --- GROUP-BY ---
+class GroupStats(NamedTuple):
+    players: int
+    sums: dict  # column -> total over the group's rows
+    top: list  # (row position, value) of the group's best players by the top_by column, best first
+
+
+def group_by(source, roster, columns, weights=None, top_by=None, k=3):
+    """
+    {group: GroupStats} of the roster's groups over `source` (a Snapshot or GainFrame).
+    `columns` maps a name to values indexed by source row (e.g. frame.gain("merits"), or a dict
+    holding just the rostered rows).
+    `weights` adds a composite "score" column, sum(weight * column); `top_by` names the column
+    the k best players per group are picked by (bounded heap, ties by name).
+    """
+    groups = roster.rows(source)
+    columns = dict(columns)
+    if weights:
+        parts = [(columns[name], weight) for name, weight in weights.items()]
+        columns["score"] = {i: sum(col[i] * w for col, w in parts) for rows in groups.values() for i in rows}
+    names = source.col("name")
+    stats = {}
+    for group, rows in groups.items():
+        sums = {name: sum(values[i] for i in rows) for name, values in columns.items()}
+        top = [(i, columns[top_by][i]) for i in select(columns[top_by], names, rows, k)] if top_by else []
+        stats[group] = GroupStats(len(rows), sums, top)
+    return stats
@@ -0,0 +1,432 @@
+import asyncio
+import heapq
+import itertools
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import ContextVar
+
+from gspread.exceptions import APIError
+from gspread.utils import absolute_range_name
+
+# --- CONFIGURATION ---
+# Number of threads allowed to talk to Google Sheets at the same time.
+SHEETS_IO_WORKERS = int(os.getenv("SHEETS_IO_WORKERS", "4"))
+# Google Sheets read requests allowed per rolling minute (Google's default per-user quota is 60).
+SHEETS_READS_PER_MINUTE = int(os.getenv("SHEETS_READS_PER_MINUTE", "60"))
+# How often a request rejected with 429 is retried, and the longest pause between tries (seconds).
+QUOTA_RETRIES = 5
+QUOTA_MAX_BACKOFF = 64
+# Seconds a spreadsheet's tab listing is reused before it is fetched again.
+WORKSHEET_LIST_TTL = int(os.getenv("WORKSHEET_LIST_TTL", "300"))
+
+# Request priorities: lower goes first.
+INTERACTIVE = 0
+BACKGROUND = 1
+
+# Priority of Sheets requests made from the current task; background jobs set BACKGROUND.
+sheets_priority = ContextVar("sheets_priority", default=INTERACTIVE)
+# QuotaWaitMeter of the command being run, if any (set before each command).
+quota_wait = ContextVar("quota_wait", default=None)
+# Flight a shared download runs for (set inside SingleFlight tasks).
+current_flight = ContextVar("current_flight", default=None)
+
+
+# --- QUOTA SCHEDULER ---
+class QuotaWaitMeter:
+    """Seconds one command spent waiting for Sheets quota (queueing and 429 backoff)."""
+
+    def __init__(self):
+        self.seconds = 0.0
+        self._reported = 0.0
+
+    def take(self):
+        """Wait not reported yet, so a multi-message reply only mentions it once."""
+        unreported = self.seconds - self._reported
+        self._reported = self.seconds
+        return unreported
+
+
+class QuotaScheduler:
+    """
+    Admits Sheets requests against a rolling one-minute read budget.
+    Waiting requests are served by priority (interactive commands before background refreshes),
+    then in arrival order. A 429 from Google pauses every request until the backoff has passed.
+    """
+
+    def __init__(self, per_minute=SHEETS_READS_PER_MINUTE, window=60.0):
+        self.per_minute = max(1, per_minute)
+        self.window = window
+        self._admitted = deque()  # monotonic times of requests admitted within the window
+        self._waiting = []  # heap of (priority, seq, future)
+        self._seq = itertools.count()
+        self._paused_until = 0.0
+        self._timer = None
+        self.throttled = 0  # 429 responses received
+        self.waited = 0.0  # total seconds requests spent queued
+        self.peak_wait = 0.0
+
+    def used(self):
+        now = time.monotonic()
+        while self._admitted and now - self._admitted[0] >= self.window:
+            self._admitted.popleft()
+        return len(self._admitted)
+
+    async def acquire(self, priority=INTERACTIVE, flight=None):
+        """
+        Wait for a slot in the read budget. Returns the seconds spent waiting.
+        A request made for a Flight is re-queued if a more urgent caller joins that flight.
+        """
+        start = time.monotonic()
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiting, (priority, next(self._seq), future))
+        if flight is not None:
+            flight.queued.add((self, future))
+        try:
+            self._pump()
+            await future
+        finally:
+            if flight is not None:
+                flight.queued.discard((self, future))
+        waited = time.monotonic() - start
+        self.waited += waited
+        self.peak_wait = max(self.peak_wait, waited)
+        return waited
+
+    def requeue(self, future, priority):
+        """Queue a waiting request again at a more urgent priority; its old entry is skipped once served."""
+        if not future.done():
+            heapq.heappush(self._waiting, (priority, next(self._seq), future))
+            self._pump()
+
+    def pause(self, seconds):
+        """Hold every request for `seconds` (after a 429)."""
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+        self._pump()
+
+    def _pump(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        now = time.monotonic()
+        while self._waiting and now >= self._paused_until and self.used() < self.per_minute:
+            _, _, future = heapq.heappop(self._waiting)
+            if future.done():  # caller was cancelled while queued
+                continue
+            self._admitted.append(now)
+            future.set_result(None)
+        if self._waiting:
+            # Wake up when the pause ends or the oldest admitted request leaves the window
+            if now < self._paused_until:
+                wake = self._paused_until
+            else:
+                wake = self._admitted[0] + self.window
+            self._timer = asyncio.get_running_loop().call_later(max(0.0, wake - now), self._pump)
+
+    def stats(self):
+        return {
+            "budget": self.per_minute,
+            "used": self.used(),
+            "waiting": len({id(f) for *_, f in self._waiting if not f.done()}),
+            "throttled": self.throttled,
+            "waited": self.waited,
+            "peak_wait": self.peak_wait,
+        }
+
+
+def is_quota_error(e):
+    """True for Google's 429 'Quota exceeded' responses."""
+    code = getattr(e, "code", None)
+    if code is None:
+        code = getattr(getattr(e, "response", None), "status_code", None)
+    return code == 429
+
+
+# --- SHEETS I/O EXECUTOR ---
+class SheetsExecutor:
+    """
+    Bounded thread pool that every blocking gspread call goes through,
+    so a slow download never freezes the event loop.
+    """
+
+    def __init__(self, workers=SHEETS_IO_WORKERS, quota=None):
+        self.workers = max(1, workers)
+        self.quota = quota or QuotaScheduler()
+        self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="sheets-io")
+        self._lock = threading.Lock()
+        self.submitted = 0
+        self.started = 0
+        self.finished = 0
+        self.peak_queue_depth = 0
+
+    @property
+    def queue_depth(self):
+        """Calls waiting for a free worker."""
+        with self._lock:
+            return max(0, self.submitted - self.finished - self.workers)
+
+    @property
+    def running(self):
+        with self._lock:
+            return self.started - self.finished
+
+    def _call(self, fn, args, kwargs):
+        with self._lock:
+            self.started += 1
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            with self._lock:
+                self.finished += 1
+
+    async def run(self, fn, *args, **kwargs):
+        """
+        Run a blocking gspread call on the Sheets pool and await its result.
+        The call first waits for read quota; a 429 is retried with exponential backoff instead of failing.
+        """
+        flight = current_flight.get()
+        meter = quota_wait.get()
+        backoff = 1
+        for attempt in range(QUOTA_RETRIES + 1):
+            if flight is not None:
+                # A shared download: every caller waiting on it is charged, at the most urgent caller's priority
+                flight.charge(await self.quota.acquire(flight.priority, flight))
+            else:
+                waited = await self.quota.acquire(sheets_priority.get())
+                if meter is not None:
+                    meter.seconds += waited
+            try:
+                return await self._execute(fn, args, kwargs)
+            except APIError as e:
+                if not is_quota_error(e) or attempt == QUOTA_RETRIES:
+                    raise
+                self.quota.throttled += 1
+                print(f"⏳ Sheets quota exceeded; pausing reads for {backoff}s (retry {attempt + 1}/{QUOTA_RETRIES})")
+                self.quota.pause(backoff)
+                backoff = min(backoff * 2, QUOTA_MAX_BACKOFF)
+
+    async def _execute(self, fn, args, kwargs):
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            self.submitted += 1
+            depth = self.submitted - self.finished - self.workers
+            if depth > self.peak_queue_depth:
+                self.peak_queue_depth = depth
+        if depth > 0:
+            print(f"⏳ Sheets I/O saturated: {depth} call(s) queued behind {self.workers} worker(s)")
+        return await loop.run_in_executor(self._pool, self._call, fn, args, kwargs)
+
+    def stats(self):
+        return {
+            "workers": self.workers,
+            "running": self.running,
+            "queued": self.queue_depth,
+            "peak_queued": self.peak_queue_depth,
+            "completed": self.finished,
+        }
+
+
+sheets_io = SheetsExecutor()
+
+
+# --- SINGLE-FLIGHT ---
+class Flight:
+    """
+    The callers sharing one in-flight download. Its Sheets requests run at the most urgent
+    caller's priority, and quota waits are charged to every caller's QuotaWaitMeter
+    (from the moment that caller joined).
+    """
+
+    def __init__(self, priority):
+        self.priority = priority
+        self.meters = {}  # QuotaWaitMeter -> monotonic time its caller joined
+        self.queued = set()  # (QuotaScheduler, future) of requests waiting for quota
+
+    def join(self, priority, meters):
+        now = time.monotonic()
+        for meter in meters:
+            self.meters.setdefault(meter, now)
+        if priority < self.priority:
+            self.priority = priority
+            for scheduler, future in list(self.queued):
+                scheduler.requeue(future, priority)
+
+    def join_current(self):
+        """Join the calling task: its own flight's callers if it runs for one, otherwise its priority and meter."""
+        outer = current_flight.get()
+        if outer is not None:
+            self.join(outer.priority, list(outer.meters))
+        else:
+            meter = quota_wait.get()
+            self.join(sheets_priority.get(), [] if meter is None else [meter])
+
+    def charge(self, waited):
+        now = time.monotonic()
+        for meter, joined in self.meters.items():
+            meter.seconds += min(waited, now - joined)
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent identical Sheets reads: while a key is being downloaded,
+    later callers wait on the same task instead of downloading it again.
+    """
+
+    def __init__(self):
+        self._inflight = {}  # key -> task fetching it
+        self._flights = {}  # task -> Flight of its callers
+        self.fetched = 0
+        self.coalesced = 0
+
+    def _start(self, keys, fetch):
+        flight = Flight(sheets_priority.get())
+        flight.join_current()
+
+        async def run():
+            current_flight.set(flight)
+            return await fetch(keys)
+
+        task = asyncio.ensure_future(run())
+        self._flights[task] = flight
+
+        def _done(t):
+            for key in keys:
+                if self._inflight.get(key) is t:
+                    del self._inflight[key]
+            self._flights.pop(t, None)
+            # Retrieve failures so a task whose callers were cancelled never logs "exception was never retrieved"
+            t.cancelled() or t.exception()
+
+        task.add_done_callback(_done)
+        for key in keys:
+            self._inflight[key] = task
+        self.fetched += len(keys)
+        return task
+
+    async def fetch(self, keys, fetch):
+        """
+        Results for `keys` as {key: value}. `fetch(missing_keys)` is awaited once for the keys
+        nobody is downloading yet and must return a dict for them; the others join the calls in flight.
+        """
+        joined = {key: self._inflight.get(key) for key in keys}
+        for task in set(joined.values()) - {None}:
+            # An interactive caller joining a background download makes it interactive
+            self._flights[task].join_current()
+        todo = [key for key, task in joined.items() if task is None]
+        results = {}
+        if todo:
+            results.update(await asyncio.shield(self._start(todo, fetch)))
+        for key, task in joined.items():
+            if task is not None:
+                self.coalesced += 1
+                results[key] = (await asyncio.shield(task))[key]
+        return results
+
+    async def do(self, key, fn):
+        """Result of the coroutine function `fn()`, shared by every concurrent caller using the same key."""
+        async def fetch(keys):
+            return {key: await fn()}
+        return (await self.fetch([key], fetch))[key]
+
+    def __len__(self):
+        return len(self._inflight)
+
+
+sheets_flight = SingleFlight()
+
+
+# --- SPREADSHEET REGISTRY ---
+class SpreadsheetRegistry:
+    """
+    Spreadsheet handles by title and their tab listings (ids, titles, sizes).
+    A title is resolved with a Drive search only once; a listing is reused for `ttl` seconds,
+    or until a read from that spreadsheet fails, so a command normally costs no metadata calls.
+    """
+
+    def __init__(self, ttl=WORKSHEET_LIST_TTL):
+        self.ttl = ttl
+        self._handles = {}  # title -> Spreadsheet
+        self._listings = {}  # spreadsheet id -> (fetched_at, [Worksheet])
+        self.hits = 0
+        self.misses = 0
+
+    async def open(self, client, title):
+        """Spreadsheet handle for a title (client.open searches Drive, so it is done once)."""
+        handle = self._handles.get(title)
+        if handle is None:
+            handle = await sheets_flight.do(("open", title), lambda: sheets_io.run(client.open, title))
+            self._handles[title] = handle
+        return handle
+
+    async def worksheets(self, client, title):
+        """Tabs of a spreadsheet, in sheet order, from the cached listing while it is fresh."""
+        handle = await self.open(client, title)
+        entry = self._listings.get(handle.id)
+        if entry is not None and time.monotonic() - entry[0] <= self.ttl:
+            self.hits += 1
+            return entry[1]
+        self.misses += 1
+        try:
+            tabs = await sheets_flight.do(("worksheets", handle.id), lambda: sheets_io.run(handle.worksheets))
+        except APIError as e:
+            if not is_quota_error(e):
+                # The spreadsheet may have been deleted or replaced: search for the title again next time
+                self._handles.pop(title, None)
+            raise
+        self._listings[handle.id] = (time.monotonic(), tabs)
+        return tabs
+
+    def invalidate(self, title=None, spreadsheet_id=None):
+        """Drop the tab listing of one spreadsheet (by title or id), or every listing, so it is fetched again."""
+        if title is None and spreadsheet_id is None:
+            self._listings.clear()
+            return
+        if title is not None:
+            handle = self._handles.get(title)
+            spreadsheet_id = handle.id if handle is not None else None
+        self._listings.pop(spreadsheet_id, None)
+
+    def __len__(self):
+        return len(self._handles)
+
+
+spreadsheets = SpreadsheetRegistry()
+
+
+# --- BATCHED READS ---
+def column_letter(idx):
+    """0-based column position -> A1 column letters (0 -> 'A', 26 -> 'AA')."""
+    letters = ""
+    idx += 1
+    while idx:
+        idx, rem = divmod(idx - 1, 26)
+        letters = chr(65 + rem) + letters
+    return letters
+
+
+def batch_get_header_rows(worksheets):
+    """Header row of several tabs of one spreadsheet, in a single values.batchGet request."""
+    spreadsheet = worksheets[0].spreadsheet
+    ranges = [absolute_range_name(ws.title, "1:1") for ws in worksheets]
+    response = spreadsheet.values_batch_get(ranges)
+    return [(vr.get("values") or [[]])[0] for vr in response.get("valueRanges", [])]
+
+
+def batch_get_columns(requests):
+    """
+    Values below the header for a list of (worksheet, column position) pairs of one spreadsheet,
+    in a single values.batchGet request. Trailing empty cells are omitted by the API.
+    Cells come back unformatted: numbers as int/float, text as str.
+    """
+    spreadsheet = requests[0][0].spreadsheet
+    ranges = []
+    for ws, idx in requests:
+        letter = column_letter(idx)
+        ranges.append(absolute_range_name(ws.title, f"{letter}2:{letter}"))
+    response = spreadsheet.values_batch_get(ranges, params={
+        "majorDimension": "COLUMNS",
+        "valueRenderOption": "UNFORMATTED_VALUE",
+    })
+    return [(vr.get("values") or [[]])[0] for vr in response.get("valueRanges", [])]
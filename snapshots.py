@@ -0,0 +1,1048 @@
+import asyncio
+import json
+import mmap
+import os
+import sys
+import tempfile
+import time
+from array import array
+from bisect import bisect_right
+from collections import OrderedDict
+
+from sheets import sheets_flight
+from sources import active_source
+
+# --- CONFIGURATION ---
+# How long a downloaded tab is trusted before it is fetched again (seconds).
+SNAPSHOT_TTL = int(os.getenv("SNAPSHOT_TTL", "300"))
+# Directory of the on-disk snapshot store (one binary file per tab).
+SNAPSHOT_DIR = os.getenv("SNAPSHOT_DIR", "snapshot_store")
+# Memory budget of the in-process snapshot cache (MiB); least recently used tabs are evicted past it.
+SNAPSHOT_CACHE_BYTES = int(os.getenv("SNAPSHOT_CACHE_MB", "256")) * 1_048_576
+
+# Seasons that are over: their sheets no longer change, so their tabs never expire once stored.
+ARCHIVED_SEASONS = {"sos2", "sos2_2", "sos2_3", "sos3", "sos4", "sos5", "sos6", "fz", "z2"}
+
+
+# Legacy column positions (0-based) used when a tab has no header for a column.
+COLUMN_FALLBACKS = {
+    "lord_id": 0,          # A
+    "name": 1,             # B
+    "highest_power": 2,    # C
+    "alliance": 3,         # D
+    "home_server": 5,      # F
+    "units_killed": 9,     # J
+    "merits": 11,          # L
+    "power": 12,           # M
+    "units_dead": 17,      # R
+    "units_healed": 18,    # S
+    "mana": 26,            # AA
+    "gold_spent": 31,
+    "wood_spent": 32,
+    "stone_spent": 33,
+    "mana_spent": 34,
+    "killcount_t5": 36,    # AK
+    "killcount_t4": 37,
+    "killcount_t3": 38,
+    "killcount_t2": 39,
+    "killcount_t1": 40,    # AO
+    "id": 0,               # NVR Farms: A
+    "whos farm": 1,        # NVR Farms: B
+}
+
+
+# Other header spellings used by older scan tabs.
+COLUMN_ALIASES = {
+    "merits": ["merits (only 50m+ power)"],
+    "killcount_t5": ["t5_kills"],
+    "killcount_t4": ["t4_kills"],
+    "killcount_t3": ["t3_kills"],
+    "killcount_t2": ["t2_kills"],
+    "killcount_t1": ["t1_kills"],
+}
+
+
+# Columns kept as text; every other column is stored as integers.
+TEXT_COLUMNS = {"lord_id", "name", "alliance", "home_server", "id", "whos farm", "character id", "character name"}
+
+
+# --- CELL PARSING ---
+def parse_int(v):
+    """
+    Integer value of a cell. Unformatted numbers pass straight through; legacy text cells
+    ('21.734.811', '21,734,811', '21 734 811', '-', '') are parsed, keeping a leading minus sign.
+    """
+    if isinstance(v, int):
+        return v
+    if isinstance(v, float):
+        return int(v)
+    s = str(v).replace(".", "").replace(",", "").replace(" ", "").replace("\u00A0", "").strip()
+    if s in ("", "-"):
+        return 0
+    try:
+        return int(s)
+    except ValueError:
+        return 0
+
+
+def parse_text(v):
+    """
+    Text value of a cell; whole numbers (e.g. IDs stored as numbers) lose the trailing '.0'.
+    Strings are interned, so alliance tags and server numbers repeated on every row share one object.
+    """
+    if isinstance(v, float) and v.is_integer():
+        v = int(v)
+    return sys.intern(str(v).strip())
+
+
+def tab_revision(ws):
+    """Cheap revision marker for a worksheet, taken from the metadata returned by .worksheets()."""
+    revision = getattr(ws, "revision", None)
+    if revision is not None:
+        return revision
+    return (ws.title, ws.row_count, ws.col_count)
+
+
+def snapshot_key(season, ws):
+    """Cache key for one scan tab: (season, spreadsheet id, tab id, tab revision)."""
+    return (season, ws.spreadsheet.id, ws.id, tab_revision(ws))
+
+
+# --- SCHEMA ---
+class SchemaError(ValueError):
+    """A tab does not provide a column the bot reads, e.g. because the scan tool changed its layout."""
+
+
+def resolve_schema(title, headers):
+    """
+    ({logical column: position}, {logical column: error}) for every column named in COLUMN_FALLBACKS
+    or COLUMN_ALIASES, resolved once per tab. A header name or alias wins; the legacy position is only
+    used when that cell has no header, so a reordered scan fails loudly instead of being misread.
+    """
+    header_index = {}
+    for i, h in enumerate(headers):
+        header_index.setdefault(str(h).strip().lower(), i)
+    schema, errors = {}, {}
+    for name in COLUMN_FALLBACKS.keys() | COLUMN_ALIASES.keys():
+        idx = header_index.get(name)
+        for alias in COLUMN_ALIASES.get(name, ()):
+            if idx is not None:
+                break
+            idx = header_index.get(alias)
+        if idx is None and name in COLUMN_FALLBACKS:
+            fallback = COLUMN_FALLBACKS[name]
+            found = str(headers[fallback]).strip() if fallback < len(headers) else ""
+            if found:
+                errors[name] = (
+                    f"Column '{name}' not found in tab '{title}' "
+                    f"(its legacy position {fallback + 1} holds '{found}')"
+                )
+                continue
+            idx = fallback
+        if idx is None:
+            errors[name] = f"Column '{name}' not found in tab '{title}'"
+        else:
+            schema[name] = idx
+    return schema, errors
+
+
+# --- SNAPSHOTS ---
+def row_index(keys):
+    """{row key: position} of non-empty keys; a repeated key keeps its first row, as the row scans it replaced did."""
+    index = {}
+    for i, key in enumerate(keys):
+        if key:
+            index.setdefault(key, i)
+    return index
+
+
+class Snapshot:
+    """
+    Column-projected copy of one scan tab.
+    The header row is resolved once; columns are downloaded on demand and kept by header name.
+    Numeric columns are contiguous int64 arrays, text columns are lists of interned strings.
+    """
+
+    def __init__(self, title, headers):
+        self.title = title
+        self.headers = headers
+        self._header_index = {}
+        for i, h in enumerate(headers):
+            self._header_index.setdefault(str(h).strip().lower(), i)
+        self.schema, self._schema_errors = resolve_schema(title, headers)
+        self.columns = {}
+        self._unsized = {}  # columns downloaded before the row key column
+        self.n_rows = None
+        self.key = None
+        self.index = {}  # row key (e.g. lord_id) -> row position
+        self.gain_frames = {}  # id(previous snapshot) -> GainFrame against it
+        self.rank_indexes = {}
+        self._column_bytes = {}
+        self.leaderboards = {}  # see leaderboards.leaderboard
+        self.group_rows = {}  # see rosters.Roster.rows
+
+    def resolve(self, name):
+        """0-based position of a column, from the tab's schema (other columns by exact header, cached)."""
+        idx = self.schema.get(name)
+        if idx is None:
+            error = self._schema_errors.get(name)
+            if error is not None:
+                raise SchemaError(error)
+            idx = self._header_index.get(name.strip().lower())
+            if idx is None:
+                raise SchemaError(f"Column '{name}' not found in tab '{self.title}'")
+            self.schema[name] = idx
+        return idx
+
+    def check(self, names):
+        """Fail fast, before anything is downloaded, if any of `names` cannot be resolved."""
+        errors = []
+        for name in names:
+            try:
+                self.resolve(name)
+            except SchemaError as e:
+                errors.append(str(e))
+        if errors:
+            raise SchemaError("; ".join(errors))
+
+    def has_column(self, name):
+        try:
+            self.resolve(name)
+            return True
+        except ValueError:
+            return False
+
+    def missing(self, names):
+        return [n for n in names if n not in self.columns and n not in self._unsized]
+
+    def add_column(self, name, values, key=False):
+        """
+        Store a downloaded column. The row key column (e.g. lord_id) decides how many rows the tab has;
+        a column that arrives before it (from a concurrent download) waits until the key is in.
+        """
+        if key:
+            self.n_rows = len(values)
+        elif self.n_rows is None:
+            self._unsized[name] = values
+            return
+        pad = self.n_rows - min(len(values), self.n_rows)
+        if self.is_text(name):
+            column = [parse_text(v) for v in values[:self.n_rows]]
+            column.extend([""] * pad)
+        else:
+            column = array("q", (parse_int(v) for v in values[:self.n_rows]))
+            column.extend(array("q", bytes(8 * pad)))
+        self.columns[name] = column
+        if key:
+            self.key = name
+            # Built once from the row key
+            self.index = row_index(column)
+            for early, early_values in self._unsized.items():
+                self.add_column(early, early_values)
+            self._unsized.clear()
+
+    @staticmethod
+    def is_text(name):
+        return name.strip().lower() in TEXT_COLUMNS
+
+    def col(self, name):
+        return self.columns[name]
+
+    def find(self, key):
+        """Row position of a row key such as a lord_id, or None if the tab does not have it."""
+        return self.index.get(str(key).strip())
+
+    def row(self, key, *names):
+        """Values of `names` for one row key, or None if the tab does not have it."""
+        i = self.find(key)
+        if i is None:
+            return None
+        return tuple(self.columns[n][i] for n in names)
+
+    def _pool(self, server=None, floor=None):
+        """Row positions with a key, optionally on one home server and/or with floor=(column, minimum) met."""
+        keys = self.col(self.key)
+        rows = [i for i, key in enumerate(keys) if key]
+        if server is not None:
+            servers = self.col("home_server")
+            rows = [i for i in rows if servers[i] == server]
+        if floor is not None:
+            floor_col, minimum = self.col(floor[0]), floor[1]
+            rows = [i for i in rows if floor_col[i] >= minimum]
+        return rows
+
+    def rank_index(self, name, server=None, floor=None):
+        """RankIndex of a column's totals over the rows selected by `server`/`floor`; built once per snapshot."""
+        cache_key = (name, server, floor)
+        index = self.rank_indexes.get(cache_key)
+        if index is None:
+            keys, values = self.col(self.key), self.col(name)
+            rows = self._pool(server, floor)
+            index = RankIndex([keys[i] for i in rows], [values[i] for i in rows])
+            self.rank_indexes[cache_key] = index
+            snapshot_cache.grew(self)
+        return index
+
+    def ratio_rank_index(self, num, den, server=None):
+        """RankIndex of num / den (as a percentage) over rows with den > 0; built once per snapshot."""
+        cache_key = ("ratio", num, den, server)
+        index = self.rank_indexes.get(cache_key)
+        if index is None:
+            keys, nums, dens = self.col(self.key), self.col(num), self.col(den)
+            rows = [i for i in self._pool(server) if dens[i] > 0]
+            index = RankIndex([keys[i] for i in rows], [nums[i] / dens[i] * 100 for i in rows])
+            self.rank_indexes[cache_key] = index
+            snapshot_cache.grew(self)
+        return index
+
+    def rows(self, *names):
+        """Iterate the requested columns together, one tuple per row."""
+        return zip(*(self.columns[n] for n in names))
+
+    def nbytes(self):
+        """
+        Approximate memory held by the loaded columns, the row index and everything built on them:
+        rank indexes, leaderboards, roster rows and the gain frames kept on this (latest) tab.
+        """
+        total = self._index_nbytes()
+        for name, column in self.columns.items():
+            size = self._column_bytes.get(name)
+            if size is None:
+                # columns never change once stored, so each is measured once
+                size = self._column_bytes[name] = column_nbytes(column, strings=True)
+            total += size
+        total += derived_nbytes(self.rank_indexes.values(), self.leaderboards, self.group_rows)
+        return total + sum(frame.nbytes() for frame in self.gain_frames.values())
+
+    def _index_nbytes(self):
+        return sys.getsizeof(self.index)
+
+    def __len__(self):
+        return self.n_rows or 0
+
+
+def column_nbytes(column, strings=False):
+    """
+    Approximate memory of a column: int64 arrays exactly, text as one pointer per row plus,
+    with `strings`, each distinct string once. File-backed (memoryview) columns count as 0:
+    the OS pages them in on demand.
+    """
+    if isinstance(column, memoryview):
+        return 0
+    if isinstance(column, array):
+        return column.itemsize * len(column)
+    total = 8 * len(column)
+    if strings:
+        distinct = {id(v): v for v in column}
+        total += sum(sys.getsizeof(v) for v in distinct.values())
+    return total
+
+
+def derived_nbytes(rank_indexes, leaderboards, group_rows):
+    """Approximate memory of the rank indexes, cached leaderboards and roster rows built on a tab or frame."""
+    total = sum(index.nbytes() for index in rank_indexes)
+    total += sum(64 * len(board) for _, board in leaderboards.values())  # (row, value) tuples
+    total += sum(column_nbytes(rows) for groups in group_rows.values() for rows in groups.values())
+    return total
+
+
+async def load_tabs(season, worksheets, columns, source=None):
+    """
+    Snapshots of one or more tabs of the same spreadsheet, holding at least `columns`.
+    The first column is the row key. Only columns that are not cached yet are downloaded:
+    header rows in one batchGet, then the missing columns of every tab in a second one.
+    A tab or column another command is already downloading is awaited, not fetched twice.
+    Tabs are read from `source`, by default the active SnapshotSource.
+    """
+    source = source or active_source()
+    keys = [snapshot_key(season, ws) for ws in worksheets]
+    snaps = [snapshot_cache.get(k) for k in keys]
+    snaps = [snapshot_store.load(k) if snap is None else snap for k, snap in zip(keys, snaps)]
+    by_key = dict(zip(keys, worksheets))
+
+    # 1. Header rows, once per tab
+    new = [k for k, snap in zip(keys, snaps) if snap is None]
+    if new:
+        async def fetch_headers(todo):
+            header_rows = await source.read_headers([by_key[k] for k in todo])
+            created = {}
+            for k, headers in zip(todo, header_rows):
+                created[k] = Snapshot(by_key[k].title, headers)
+                snapshot_cache.put(k, created[k])
+            return created
+
+        created = await sheets_flight.fetch(new, fetch_headers)
+        snaps = [snap if snap is not None else created[k] for k, snap in zip(keys, snaps)]
+    by_key = {k: (ws, snap) for k, ws, snap in zip(keys, worksheets, snaps)}
+
+    for snap in snaps:
+        snap.check(columns)
+
+    # 2. Only the requested columns that are still missing
+    wanted = [(k, name) for k, snap in zip(keys, snaps) for name in snap.missing(columns)]
+    if wanted:
+        async def fetch_columns(todo):
+            requests = [(by_key[k][0], by_key[k][1].resolve(name)) for k, name in todo]
+            fetched = await source.read_columns(requests)
+            for (k, name), values in zip(todo, fetched):
+                by_key[k][1].add_column(name, values, key=(name == columns[0]))
+            for k in dict.fromkeys(k for k, _ in todo):
+                snapshot_cache.resize(k)
+                await snapshot_store.save(k, by_key[k][1])
+            return dict.fromkeys(todo)
+
+        await sheets_flight.fetch(wanted, fetch_columns)
+    return snaps
+
+
+# --- RANK INDEXES ---
+class RankIndex:
+    """
+    1-based ranks of one stat over a population, highest value first.
+    Sorted once; ties keep row order (as list.sort did) and a repeated key keeps its best rank.
+    """
+
+    def __init__(self, keys, values):
+        order = sorted(range(len(keys)), key=values.__getitem__, reverse=True)
+        self.ranks = {}
+        for rank, i in enumerate(order, 1):
+            self.ranks.setdefault(keys[i], rank)
+        self._descending = [-values[i] for i in order]  # ascending, for bisect
+
+    def rank(self, key):
+        """Rank of a key in the population, or None if it is not part of it."""
+        return self.ranks.get(str(key).strip())
+
+    def rank_of_value(self, value):
+        """Rank a value from outside the population would get if it were added last."""
+        return bisect_right(self._descending, -value) + 1
+
+    def nbytes(self):
+        # dict entries plus the boxed values of both structures
+        return sys.getsizeof(self.ranks) + sys.getsizeof(self._descending) + 32 * len(self._descending)
+
+    def __len__(self):
+        return len(self._descending)
+
+
+# --- GAIN FRAMES ---
+class GainFrame:
+    """
+    Per-player deltas (latest - previous) between two tabs of one season.
+    Rows are the latest tab's rows whose key is also in the previous tab, in latest-tab order.
+    Each column's gains are computed once and shared by every command reading the pair.
+    """
+
+    def __init__(self, prev, latest):
+        self.prev = prev
+        self.latest = latest
+        self.latest_pos = array("q")
+        self.prev_pos = array("q")
+        for i, key in enumerate(latest.col(latest.key)):
+            j = prev.index.get(key) if key else None
+            if j is not None:
+                self.latest_pos.append(i)
+                self.prev_pos.append(j)
+        self.index = row_index([latest.col(latest.key)[i] for i in self.latest_pos])
+        self._values = {}
+        self._gains = {}
+        self._ranks = {}
+        self._servers = None
+        self._server_totals = {}  # home server -> {column: total, column + "_gain": gain}
+        self._summed = set()
+        self.leaderboards = {}  # see leaderboards.leaderboard
+        self.group_rows = {}  # see rosters.Roster.rows
+
+    def col(self, name):
+        """Latest-tab values of a column, aligned with the frame rows."""
+        values = self._values.get(name)
+        if values is None:
+            column = self.latest.col(name)
+            values = [column[i] for i in self.latest_pos]
+            if isinstance(column, array):
+                values = array("q", values)
+            self._values[name] = values
+            snapshot_cache.grew(self.latest)
+        return values
+
+    def gain(self, name):
+        """latest - previous of a numeric column, aligned with the frame rows."""
+        gains = self._gains.get(name)
+        if gains is None:
+            now, then = self.latest.col(name), self.prev.col(name)
+            gains = array("q", (now[i] - then[j] for i, j in zip(self.latest_pos, self.prev_pos)))
+            self._gains[name] = gains
+            snapshot_cache.grew(self.latest)
+        return gains
+
+    def rows(self, *names):
+        """Latest-tab values of the requested columns, one tuple per frame row."""
+        return zip(*(self.col(n) for n in names))
+
+    def rank_index(self, name, server=None):
+        """RankIndex of a column's gains, optionally among players of one home server; built once per frame."""
+        index = self._ranks.get((name, server))
+        if index is None:
+            keys, gains = self.col(self.latest.key), self.gain(name)
+            if server is None:
+                index = RankIndex(keys, gains)
+            else:
+                rows = [i for i, s in enumerate(self.col("home_server")) if s == server]
+                index = RankIndex([keys[i] for i in rows], [gains[i] for i in rows])
+            self._ranks[(name, server)] = index
+            snapshot_cache.grew(self.latest)
+        return index
+
+    def numeric_columns(self):
+        """Numeric columns loaded in both tabs."""
+        return [n for n in self.latest.columns if n in self.prev.columns and not Snapshot.is_text(n)]
+
+    def server_totals(self, names=None):
+        """
+        {home server: {column: total, column + "_gain": gain}} over the frame rows, for `names`
+        (default: every numeric column loaded in both tabs). Each column is summed once per frame,
+        normally at ingest; server ids are reduced to their digits ("S375" -> "375").
+        """
+        if self._servers is None:
+            self._servers = ["".join(ch for ch in str(sid) if ch.isdigit()) for sid in self.col("home_server")]
+            for sid in self._servers:
+                self._server_totals.setdefault(sid, {})
+        for name in names or self.numeric_columns():
+            if name in self._summed:
+                continue
+            totals, gains = dict.fromkeys(self._server_totals, 0), dict.fromkeys(self._server_totals, 0)
+            for sid, value, gain in zip(self._servers, self.col(name), self.gain(name)):
+                totals[sid] += value
+                gains[sid] += gain
+            for sid, table in self._server_totals.items():
+                table[name] = totals[sid]
+                table[name + "_gain"] = gains[sid]
+            self._summed.add(name)
+        return self._server_totals
+
+    def team_totals(self, servers, names=None):
+        """Aggregates of several home servers added together (a server with no players counts as 0)."""
+        tables = self.server_totals(names)
+        merged = dict.fromkeys(k for name in (names or self._summed) for k in (name, name + "_gain"))
+        for key in merged:
+            merged[key] = sum(tables.get(sid, {}).get(key, 0) for sid in servers)
+        return merged
+
+    def nbytes(self):
+        """Approximate memory of the frame: row maps, aligned columns, gains and what was built on them."""
+        total = column_nbytes(self.latest_pos) + column_nbytes(self.prev_pos) + sys.getsizeof(self.index)
+        total += sum(column_nbytes(values) for values in self._values.values())  # strings belong to the tab
+        total += sum(column_nbytes(gains) for gains in self._gains.values())
+        total += sum(sys.getsizeof(table) for table in self._server_totals.values())
+        return total + derived_nbytes(self._ranks.values(), self.leaderboards, self.group_rows)
+
+    def find(self, key):
+        """Frame row of a row key such as a lord_id, or None if it is not in both tabs."""
+        return self.index.get(str(key).strip())
+
+    def __len__(self):
+        return len(self.latest_pos)
+
+
+def gain_frame(prev, latest):
+    """GainFrame of a (previous, latest) snapshot pair, built once and kept on the latest snapshot."""
+    frame = latest.gain_frames.get(id(prev))
+    if frame is None or frame.prev is not prev:
+        frame = GainFrame(prev, latest)
+        latest.gain_frames[id(prev)] = frame
+        snapshot_cache.grew(latest)
+    return frame
+
+
+# --- SNAPSHOT CACHE ---
+class SnapshotCache:
+    """
+    In-process cache of downloaded scan tabs, shared by every stats command.
+    Held to a byte budget: past it, the least recently used tabs are evicted first, except pinned
+    ones (the current season's previous/latest pair). An evicted tab is reloaded from the store.
+    """
+
+    def __init__(self, ttl=SNAPSHOT_TTL, budget=SNAPSHOT_CACHE_BYTES):
+        self.ttl = ttl
+        self.budget = budget
+        self._entries = OrderedDict()  # key -> (stored_at, Snapshot), least recently used first
+        self._sizes = {}  # key -> estimated bytes
+        self._bytes = 0
+        self._sealed = set()  # keys of complete scan tabs, exempt from the TTL
+        self._pinned = set()  # keys never evicted for space
+        self._key_of = {}  # id(Snapshot) -> its key
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        stored_at, data = entry
+        if key not in self._sealed and time.monotonic() - stored_at > self.ttl:
+            self._drop(key)
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return data
+
+    def seal(self, key):
+        """
+        Exempt a cached tab from the TTL: a scan tab is complete once a newer one was appended.
+        Returns the Snapshot if it was not sealed before, else None.
+        """
+        entry = self._entries.get(key)
+        if entry is None or key in self._sealed:
+            return None
+        self._sealed.add(key)
+        return entry[1]
+
+    def sealed(self, key):
+        return key in self._sealed
+
+    def pin(self, keys):
+        """Keep these tabs in memory whatever the budget (replaces the previous pins)."""
+        self._pinned = set(keys)
+
+    def put(self, key, data, stored_at=None):
+        """Cache a tab; `stored_at` (monotonic) backdates it, e.g. for a tab read from disk."""
+        # A new revision of the same tab replaces the old one
+        for old in [k for k in self._entries if k[:3] == key[:3] and k != key]:
+            self._drop(old)
+        self._entries[key] = (time.monotonic() if stored_at is None else stored_at, data)
+        self._entries.move_to_end(key)
+        self._key_of[id(data)] = key
+        self.resize(key)
+
+    def grew(self, snap):
+        """Re-estimate a cached tab after something was built on it (a gain frame, index or board)."""
+        key = self._key_of.get(id(snap))
+        if key is not None and self._entries.get(key, (None, None))[1] is snap:
+            self.resize(key)
+
+    def resize(self, key):
+        """Re-estimate a tab's size after columns were added to it, evicting others if over budget."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return
+        size = entry[1].nbytes()
+        self._bytes += size - self._sizes.get(key, 0)
+        self._sizes[key] = size
+        self._shrink(keep=key)
+
+    def _shrink(self, keep=None):
+        if self._bytes <= self.budget:
+            return
+        for k in [k for k in self._entries if k != keep and k not in self._pinned]:
+            self._drop(k)
+            self.evictions += 1
+            if self._bytes <= self.budget:
+                return
+
+    def _drop(self, key):
+        _, data = self._entries.pop(key)
+        self._bytes -= self._sizes.pop(key, 0)
+        self._sealed.discard(key)
+        self._key_of.pop(id(data), None)
+        # Gain frames against the dropped tab would keep it alive: let them go with it
+        for other_key, (_, other) in self._entries.items():
+            frames = getattr(other, "gain_frames", {})
+            stale = [fid for fid, frame in frames.items() if frame.prev is data]
+            for fid in stale:
+                del frames[fid]
+            if stale:
+                size = other.nbytes()
+                self._bytes += size - self._sizes.get(other_key, 0)
+                self._sizes[other_key] = size
+
+    def touch(self, season):
+        """Restart the TTL of a season's cached tabs (their sheet is known to be unchanged). Returns their keys."""
+        now = time.monotonic()
+        keys = [k for k in self._entries if k[0] == season]
+        for k in keys:
+            self._entries[k] = (now, self._entries[k][1])
+        return keys
+
+    def discard(self, key):
+        """Drop one cached tab (e.g. one edited in place, whose key did not change)."""
+        if key in self._entries:
+            self._drop(key)
+
+    def invalidate(self, season=None):
+        """Drop every cached tab, or only the tabs of one season. Returns the number removed."""
+        stale = [k for k in self._entries if season is None or k[0] == season]
+        for k in stale:
+            self._drop(k)
+        return len(stale)
+
+    def nbytes(self):
+        return self._bytes
+
+    def stats(self):
+        return {
+            "tabs": len(self._entries),
+            "bytes": self._bytes,
+            "budget": self.budget,
+            "pinned": sum(1 for k in self._pinned if k in self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+    def __len__(self):
+        return len(self._entries)
+
+
+snapshot_cache = SnapshotCache()
+
+
+# --- ON-DISK STORE ---
+# File layout (native byte order, every block 8-byte aligned):
+#   magic (8) | metadata length (8) | metadata JSON, padded | one block per column
+# Numeric columns are raw int64 values. Text columns are uint32 positions into the
+# metadata's string table, so a repeated alliance tag or server is stored once.
+STORE_MAGIC = b"NVRSNAP1"
+
+
+def _pad8(n):
+    return -n % 8
+
+
+def encode_snapshot(key, snap, sealed=False):
+    """Bytes of the store file for a snapshot's loaded columns; `sealed` marks a complete scan tab."""
+    strings, string_ids, blocks, columns = [], {}, [], []
+    offset = 0
+    for name in list(snap.columns):
+        column = snap.columns[name]
+        if isinstance(column, (array, memoryview)):
+            data = column.tobytes()
+            kind = "q"
+        else:
+            ids = array("I")
+            for v in column:
+                i = string_ids.get(v)
+                if i is None:
+                    i = string_ids[v] = len(strings)
+                    strings.append(v)
+                ids.append(i)
+            data = ids.tobytes()
+            kind = "s"
+        columns.append({"name": name, "type": kind, "offset": offset, "length": len(data)})
+        blocks.append(data + bytes(_pad8(len(data))))
+        offset += len(blocks[-1])
+
+    meta = json.dumps({
+        "key": list(key[:3]) + [list(key[3])],
+        "title": snap.title,
+        "headers": snap.headers,
+        "row_key": snap.key,
+        "n_rows": snap.n_rows,
+        "sealed": sealed,
+        "byteorder": sys.byteorder,
+        "strings": strings,
+        "columns": columns,
+    }, ensure_ascii=False).encode("utf-8")
+    meta += b" " * _pad8(len(meta))
+    return b"".join([STORE_MAGIC, len(meta).to_bytes(8, "little"), meta, *blocks])
+
+
+def read_store_meta(buf):
+    """(metadata, offset of the first column block) of a store file's bytes."""
+    if bytes(buf[:8]) != STORE_MAGIC:
+        raise ValueError("not a snapshot store file")
+    size = int.from_bytes(buf[8:16], "little")
+    meta = json.loads(bytes(buf[16:16 + size]).decode("utf-8"))
+    meta["key"] = tuple(meta["key"][:3]) + (tuple(meta["key"][3]),)
+    return meta, 16 + size
+
+
+def decode_snapshot(buf):
+    """(cache key, Snapshot) from the bytes of a store file."""
+    meta, base = read_store_meta(buf)
+    snap = Snapshot(meta["title"], meta["headers"])
+    snap.n_rows = meta["n_rows"]
+    strings = [sys.intern(v) for v in meta["strings"]]
+    swap = meta["byteorder"] != sys.byteorder
+    for c in meta["columns"]:
+        start = base + c["offset"]
+        values = array(c["type"] if c["type"] == "q" else "I")
+        values.frombytes(buf[start:start + c["length"]])
+        if swap:
+            values.byteswap()
+        snap.columns[c["name"]] = values if c["type"] == "q" else [strings[i] for i in values]
+    snap.key = meta["row_key"]
+    snap.index = row_index(snap.columns[snap.key])
+    return meta["key"], snap
+
+
+class MappedColumns(dict):
+    """
+    Columns of a memory-mapped store file. Numeric columns are zero-copy int64 views of the
+    mapping, so only the pages a lookup touches are read; text columns are decoded on first use.
+    """
+
+    def __init__(self, buf, base, meta):
+        super().__init__()
+        self._buf = buf
+        self._base = base
+        self._strings = meta["strings"]
+        self._pending = {}  # name -> column metadata, text not decoded yet
+        for c in meta["columns"]:
+            if c["type"] == "q":
+                self[c["name"]] = self._view(c).cast("q")
+            else:
+                self._pending[c["name"]] = c
+
+    def _view(self, c):
+        start = self._base + c["offset"]
+        return self._buf[start:start + c["length"]]
+
+    def __missing__(self, name):
+        c = self._pending.pop(name)
+        strings = self._strings
+        column = self[name] = [sys.intern(strings[i]) for i in self._view(c).cast("I")]
+        return column
+
+    def __contains__(self, name):
+        return dict.__contains__(self, name) or name in self._pending
+
+    def __iter__(self):
+        yield from dict.__iter__(self)
+        yield from self._pending
+
+    def keys(self):
+        return list(self)
+
+    def __len__(self):
+        return dict.__len__(self) + len(self._pending)
+
+
+class MappedSnapshot(Snapshot):
+    """A Snapshot backed by a memory-mapped store file; the row index is built on first lookup."""
+
+    def __init__(self, buf, base, meta):
+        super().__init__(meta["title"], meta["headers"])
+        self.n_rows = meta["n_rows"]
+        self.key = meta["row_key"]
+        self.columns = MappedColumns(buf, base, meta)
+        self._index = None
+
+    @property
+    def index(self):
+        if self._index is None:
+            self._index = row_index(self.columns[self.key])
+        return self._index
+
+    @index.setter
+    def index(self, value):
+        self._index = value
+
+    def _index_nbytes(self):
+        return sys.getsizeof(self._index) if self._index is not None else 0
+
+
+def map_snapshot(path):
+    """(cache key, MappedSnapshot) of a store file, mapped read-only; None if it needs a byte swap."""
+    with open(path, "rb") as f:
+        buf = memoryview(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+    meta, base = read_store_meta(buf)
+    if meta["byteorder"] != sys.byteorder:
+        return None
+    return meta["key"], MappedSnapshot(buf, base, meta)
+
+
+class SnapshotStore:
+    """
+    Parsed tabs persisted as one file per (spreadsheet, tab), so a restart starts warm.
+    A file holds one revision; a newer revision overwrites it. Complete (sealed) scan tabs of
+    active seasons are trusted at any age, the latest tab for SNAPSHOT_TTL after it was written
+    or last confirmed unchanged; both are loaded at startup. Tabs of ARCHIVED_SEASONS are
+    trusted forever and memory-mapped only when a command asks for them.
+    """
+
+    def __init__(self, directory=SNAPSHOT_DIR, ttl=SNAPSHOT_TTL):
+        self.directory = directory
+        self.ttl = ttl
+        self.loaded = 0
+        self.saved = 0
+        self.mapped = 0
+
+    def path(self, key):
+        return os.path.join(self.directory, f"{key[1]}_{key[2]}.snap")
+
+    def _age(self, path):
+        """Seconds since the file was written, or None if it is missing."""
+        try:
+            return max(0.0, time.time() - os.path.getmtime(path))
+        except OSError:
+            return None
+
+    @staticmethod
+    def _read_meta(path):
+        with open(path, "rb") as f:
+            head = f.read(16)
+            meta, _ = read_store_meta(head + f.read(int.from_bytes(head[8:16], "little")))
+        return meta
+
+    def _trusted(self, season, age, sealed):
+        """A file is trusted if archived, sealed, or written (or touched) within the TTL."""
+        return season in ARCHIVED_SEASONS or sealed or age <= self.ttl
+
+    def _read(self, path, season=None):
+        if season in ARCHIVED_SEASONS:
+            mapped = map_snapshot(path)
+            if mapped is not None:
+                self.mapped += 1
+                return mapped
+        with open(path, "rb") as f:
+            return decode_snapshot(f.read())
+
+    def load(self, key):
+        """Snapshot of a tab from disk if its stored revision matches and is still trusted, else None."""
+        path = self.path(key)
+        age = self._age(path)
+        if age is None:
+            return None
+        try:
+            sealed = bool(self._read_meta(path).get("sealed"))
+            if not self._trusted(key[0], age, sealed):
+                return None
+            stored_key, snap = self._read(path, key[0])
+        except (OSError, ValueError, KeyError) as e:
+            print(f"⚠️ Ignoring unreadable snapshot file {path}: {e}")
+            return None
+        if stored_key != key:
+            return None
+        # An archived tab is as good as new however old its file; an active one keeps its age
+        snapshot_cache.put(key, snap, stored_at=None if key[0] in ARCHIVED_SEASONS else time.monotonic() - age)
+        if sealed:
+            snapshot_cache.seal(key)  # so a later save keeps the file sealed
+        self.loaded += 1
+        return snap
+
+    def _read_all(self, season_first=None):
+        """
+        (key, Snapshot, age, sealed) of the trusted tabs of active seasons on disk, most wanted first:
+        `season_first`'s tabs, latest (unsealed) before complete ones, newest first.
+        Reading stops once the snapshot cache budget is filled.
+        """
+        try:
+            names = [n for n in os.listdir(self.directory) if n.endswith(".snap")]
+        except FileNotFoundError:
+            return []
+        candidates = []
+        for name in names:
+            path = os.path.join(self.directory, name)
+            age = self._age(path)
+            if age is None:
+                continue
+            try:
+                meta = self._read_meta(path)
+            except (OSError, ValueError, KeyError) as e:
+                print(f"⚠️ Ignoring unreadable snapshot file {path}: {e}")
+                continue
+            season, sealed = meta["key"][0], bool(meta.get("sealed"))
+            if season in ARCHIVED_SEASONS or not self._trusted(season, age, sealed):
+                continue  # archived (trusted, but opened lazily) or stale
+            candidates.append((season != season_first, sealed, age, path))
+        found, total = [], 0
+        for _, sealed, age, path in sorted(candidates):
+            try:
+                key, snap = self._read(path)
+            except (OSError, ValueError, KeyError) as e:
+                print(f"⚠️ Ignoring unreadable snapshot file {path}: {e}")
+                continue
+            total += snap.nbytes()
+            if found and total > snapshot_cache.budget:
+                break
+            found.append((key, snap, age, sealed))
+        return found
+
+    async def load_all(self, season_first=None):
+        """
+        Put the trusted tabs of active seasons into the snapshot cache (at startup), as many as the
+        budget holds, `season_first`'s first. Files are read on a worker thread; archived tabs
+        are left on disk until asked for. Returns the number loaded.
+        """
+        found = await asyncio.to_thread(self._read_all, season_first)
+        # Least wanted first, so the most wanted end up most recently used and are evicted last
+        for key, snap, age, sealed in reversed(found):
+            if snapshot_cache.get(key) is None:  # a command may have downloaded it meanwhile
+                snapshot_cache.put(key, snap, stored_at=time.monotonic() - age)
+                if sealed:
+                    snapshot_cache.seal(key)
+        self.loaded += len(found)
+        return len(found)
+
+    def _write(self, path, data):
+        os.makedirs(self.directory, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+
+    async def save(self, key, snap):
+        """
+        Write a tab's loaded columns to disk (encoded here, written on a worker thread).
+        A tab sealed in the snapshot cache is stored sealed.
+        """
+        if snap.key is None:
+            return
+        data = encode_snapshot(key, snap, sealed=snapshot_cache.sealed(key))
+        try:
+            await asyncio.to_thread(self._write, self.path(key), data)
+            self.saved += 1
+        except OSError as e:
+            print(f"⚠️ Could not save snapshot {snap.title}: {e}")
+
+    def discard(self, key):
+        """Delete one stored tab."""
+        try:
+            os.remove(self.path(key))
+        except OSError:
+            pass
+
+    def touch(self, keys):
+        """Restart the TTL of stored tabs confirmed unchanged, so a restart still finds them fresh."""
+        for key in keys:
+            try:
+                os.utime(self.path(key))
+            except OSError:
+                pass
+
+    def remove(self, season=None):
+        """Delete the stored tabs of one season, or all of them. Returns the number removed."""
+        try:
+            names = [n for n in os.listdir(self.directory) if n.endswith(".snap")]
+        except FileNotFoundError:
+            return 0
+        removed = 0
+        for name in names:
+            path = os.path.join(self.directory, name)
+            if season is not None:
+                try:
+                    meta = self._read_meta(path)
+                except (OSError, ValueError, KeyError):
+                    meta = None
+                if meta is not None and meta["key"][0] != season:
+                    continue
+            try:
+                os.remove(path)
+                removed += 1
+            except OSError:
+                pass
+        return removed
+
+    def nbytes(self):
+        """Bytes on disk."""
+        try:
+            return sum(os.path.getsize(os.path.join(self.directory, n))
+                       for n in os.listdir(self.directory) if n.endswith(".snap"))
+        except FileNotFoundError:
+            return 0
+
+
+snapshot_store = SnapshotStore()
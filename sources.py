@@ -0,0 +1,191 @@
+import asyncio
+import csv
+import os
+import re
+import zlib
+from abc import ABC, abstractmethod
+
+from sheets import sheets_io, sheets_flight, spreadsheets, batch_get_header_rows, batch_get_columns, is_quota_error
+
+# --- CONFIGURATION ---
+# Local tab files may start with "<position>_" to set their order; the prefix is not part of the title.
+TAB_ORDER_PREFIX = re.compile(r"^\d+_")
+
+
+# --- SOURCE INTERFACE ---
+class SnapshotSource(ABC):
+    """
+    Where scan tabs come from. Commands list tabs and read them only through a source, so the same
+    code runs against Google Sheets or an offline copy. A tab has .id, .title and .spreadsheet.id
+    like a gspread Worksheet, plus .revision if its size (.row_count, .col_count) does not track edits.
+    """
+
+    @abstractmethod
+    async def worksheets(self, title):
+        """Tabs of a spreadsheet by title, in sheet order."""
+
+    @abstractmethod
+    async def modified_times(self):
+        """{spreadsheet title: last modification stamp}, a cheap signal that a sheet changed."""
+
+    @abstractmethod
+    async def read_headers(self, tabs):
+        """Header row of each tab (all from one spreadsheet)."""
+
+    @abstractmethod
+    async def read_columns(self, requests):
+        """Values below the header for each (tab, column position); trailing empty cells may be omitted."""
+
+    def invalidate(self, title=None, spreadsheet_id=None):
+        """Forget cached tab listings (one spreadsheet's, or all) so they are listed again."""
+
+    async def connect(self):
+        """Do any slow setup (auth) now rather than on the first command."""
+
+
+_active = None
+
+
+def use_source(source):
+    """Make `source` the one load_tabs and the commands read from."""
+    global _active
+    _active = source
+    return source
+
+
+def active_source():
+    if _active is None:
+        raise RuntimeError("No snapshot source configured (call sources.use_source first)")
+    return _active
+
+
+# --- GOOGLE SHEETS ---
+class GoogleSheetsSource(SnapshotSource):
+    """
+    Tabs read from Google Sheets through the Sheets I/O pool and quota scheduler.
+    `authorize` returns a gspread client; it is called once, on first use, off the event loop.
+    """
+
+    def __init__(self, authorize):
+        self._authorize = authorize
+        self._client = None
+
+    async def client(self):
+        if self._client is None:
+            self._client = await sheets_flight.do("authorize", lambda: asyncio.to_thread(self._authorize))
+        return self._client
+
+    async def connect(self):
+        await self.client()
+
+    async def worksheets(self, title):
+        return await spreadsheets.worksheets(await self.client(), title)
+
+    async def modified_times(self):
+        client = await self.client()
+        files = await sheets_io.run(client.list_spreadsheet_files)
+        return {f["name"]: f.get("modifiedTime") for f in files}
+
+    async def _read(self, fn, tabs, *args):
+        try:
+            return await sheets_io.run(fn, *args)
+        except Exception as e:
+            # Anything but quota suggests a stale tab listing (tab renamed, deleted or resized)
+            if not is_quota_error(e):
+                spreadsheets.invalidate(spreadsheet_id=tabs[0].spreadsheet.id)
+            raise
+
+    async def read_headers(self, tabs):
+        return await self._read(batch_get_header_rows, tabs, tabs)
+
+    async def read_columns(self, requests):
+        return await self._read(batch_get_columns, [ws for ws, _ in requests], requests)
+
+    def invalidate(self, title=None, spreadsheet_id=None):
+        spreadsheets.invalidate(title, spreadsheet_id)
+
+
+# --- LOCAL CSV ---
+class LocalSpreadsheet:
+    def __init__(self, title, path):
+        self.title = title
+        self.path = path
+        self.id = f"csv-{zlib.crc32(title.encode('utf-8')):08x}"
+
+
+class LocalTab:
+    """One CSV file standing in for a worksheet. Its revision changes whenever the file is rewritten."""
+
+    def __init__(self, spreadsheet, filename):
+        self.spreadsheet = spreadsheet
+        self.path = os.path.join(spreadsheet.path, filename)
+        self.title = TAB_ORDER_PREFIX.sub("", os.path.splitext(filename)[0])
+        self.id = zlib.crc32(self.title.encode("utf-8"))
+        stat = os.stat(self.path)
+        self.revision = (self.title, stat.st_size, stat.st_mtime_ns)
+
+    def read_rows(self):
+        with open(self.path, newline="", encoding="utf-8-sig") as f:
+            return list(csv.reader(f))
+
+
+class CsvSource(SnapshotSource):
+    """
+    Tabs read from a local directory that mirrors the sheets: <root>/<spreadsheet title>/<tab>.csv.
+    Tabs are ordered by file name. Reads never touch the network or the Sheets quota,
+    so commands, benchmarks and load tests run offline at full speed.
+    """
+
+    def __init__(self, root):
+        self.root = root
+
+    def _list(self, title):
+        path = os.path.join(self.root, title)
+        if not os.path.isdir(path):
+            raise FileNotFoundError(f"No local copy of spreadsheet '{title}' in {self.root}")
+        spreadsheet = LocalSpreadsheet(title, path)
+        return [LocalTab(spreadsheet, name) for name in sorted(os.listdir(path)) if name.lower().endswith(".csv")]
+
+    async def worksheets(self, title):
+        return await asyncio.to_thread(self._list, title)
+
+    def _modified_times(self):
+        stamps = {}
+        for title in os.listdir(self.root):
+            path = os.path.join(self.root, title)
+            if os.path.isdir(path):
+                stamps[title] = max([os.path.getmtime(path)] + [
+                    os.path.getmtime(os.path.join(path, name)) for name in os.listdir(path)
+                ])
+        return stamps
+
+    async def modified_times(self):
+        return await asyncio.to_thread(self._modified_times)
+
+    @staticmethod
+    def _headers(tabs):
+        headers = []
+        for tab in tabs:
+            rows = tab.read_rows()
+            headers.append(rows[0] if rows else [])
+        return headers
+
+    async def read_headers(self, tabs):
+        return await asyncio.to_thread(self._headers, tabs)
+
+    @staticmethod
+    def _columns(requests):
+        rows_by_tab = {}
+        columns = []
+        for tab, idx in requests:
+            rows = rows_by_tab.get(tab.path)
+            if rows is None:
+                rows = rows_by_tab[tab.path] = tab.read_rows()[1:]
+            values = [row[idx] if idx < len(row) else "" for row in rows]
+            while values and values[-1] == "":
+                values.pop()  # like the Sheets API, which omits trailing empty cells
+            columns.append(values)
+        return columns
+
+    async def read_columns(self, requests):
+        return await asyncio.to_thread(self._columns, requests)